@@ -1,6 +1,17 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import RoomType, RoomClass, Room, Booking, PaymentProof
+from fivitel_core.paginators import EstimatedCountPaginator
+from .models import Amenity, RoomType, RoomClass, Room, Booking, PaymentProof
+
+class RoomClassListFilter(admin.RelatedFieldListFilter):
+    """
+    Bộ lọc theo Hạng phòng. Tên hiển thị của RoomClass cần room_type,
+    nên tải kèm bằng select_related thay vì 1 truy vấn cho mỗi hạng phòng.
+    """
+    def field_choices(self, field, request, model_admin):
+        ordering = self.field_admin_ordering(field, request, model_admin)
+        room_classes = RoomClass.objects.select_related('room_type').order_by(*ordering)
+        return [(room_class.pk, str(room_class)) for room_class in room_classes]
 
 @admin.register(RoomType)
 class RoomTypeAdmin(admin.ModelAdmin):
@@ -8,16 +19,28 @@ class RoomTypeAdmin(admin.ModelAdmin):
     list_display = ('name', 'description', 'image')
     search_fields = ('name',)
 
+@admin.register(Amenity)
+class AmenityAdmin(admin.ModelAdmin):
+    """Giao diện quản trị cho Tiện ích."""
+    list_display = ('name',)
+    search_fields = ('name',)
+
 @admin.register(RoomClass)
 class RoomClassAdmin(admin.ModelAdmin):
     """Giao diện quản trị cho Hạng phòng."""
     list_display = ('name', 'room_type', 'base_price', 'area', 'get_amenities_preview')
-    list_filter = ('room_type',)
+    list_filter = ('room_type', 'amenities')
+    list_select_related = ('room_type',)
     search_fields = ('name', 'room_type__name')
+    filter_horizontal = ('amenities',)
+
+    def get_queryset(self, request):
+        # Tải trước tiện ích cho cột xem trước (1 truy vấn cho cả trang)
+        return super().get_queryset(request).prefetch_related('amenities')
 
     def get_amenities_preview(self, obj):
         """Hiển thị một đoạn xem trước ngắn của các tiện ích."""
-        amenities = [amenity.strip() for amenity in obj.amenities.split(',')]
+        amenities = [amenity.name for amenity in obj.amenities.all()]
         # Chỉ hiển thị 3 tiện ích đầu tiên
         return ", ".join(amenities[:3]) + ('...' if len(amenities) > 3 else '')
     get_amenities_preview.short_description = 'Tiện ích (Xem trước)'
@@ -26,7 +49,8 @@ class RoomClassAdmin(admin.ModelAdmin):
 class RoomAdmin(admin.ModelAdmin):
     """Giao diện quản trị cho từng Phòng cụ thể."""
     list_display = ('room_number', 'room_class', 'status')
-    list_filter = ('status', 'room_class__room_type', 'room_class')
+    list_filter = ('status', 'room_class__room_type', ('room_class', RoomClassListFilter))
+    list_select_related = ('room_class__room_type',)
     list_editable = ('status',) # Cho phép sửa trạng thái trực tiếp từ danh sách
     search_fields = ('room_number',)
     list_per_page = 20 # Thêm phân trang
@@ -60,13 +84,20 @@ class BookingAdmin(admin.ModelAdmin):
         'payment_method',
         'total_price'
     )
-    list_filter = ('status', 'payment_method', 'check_in_date', 'room_class')
+    list_filter = ('status', 'payment_method', 'check_in_date', ('room_class', RoomClassListFilter))
+    list_select_related = ('customer', 'room_class__room_type')
     list_editable = ('status',)
     search_fields = ('id', 'customer__username', 'guest_full_name', 'assigned_room__room_number')
-    date_hierarchy = 'check_in_date' # Thêm thanh điều hướng theo ngày ở trên cùng
+    date_hierarchy = 'check_in_date' # Thêm thanh điều hướng theo ngày ở trên cùng (có cache, xem change_list.html)
     ordering = ('-check_in_date',)
     list_per_page = 20
 
+    # Bảng lớn: dùng số dòng ước lượng và bỏ truy vấn đếm toàn bộ thứ hai
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # Không render toàn bộ khách hàng / phòng vào thẻ <select> ở trang chi tiết
+    raw_id_fields = ('customer', 'assigned_room')
+
     # Trang chi tiết sẽ được sắp xếp thành các mục
     fieldsets = (
         ('Thông tin Đơn hàng', {
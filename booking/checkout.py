@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from fivitel_core.db import retry_on_db_lock
+from .models import Booking, Room
+
+
+@retry_on_db_lock()
+def place_booking(booking_details, service_ids):
+    """
+    Tạo đơn đặt phòng trong một giao dịch ghi ngắn (có thử lại khi CSDL báo khóa).
+    Trả về Booking mới, hoặc None nếu hạng phòng vừa hết phòng trống.
+    Trạng thái/khóa đơn được tính trước khi INSERT để chỉ ghi 1 lần;
+    việc gửi email do nơi gọi đảm nhận sau khi giao dịch đã commit.
+    """
+    room_class = booking_details['room_class']
+    with transaction.atomic():
+        # 1. Kiểm tra phòng trống (SQLite: BEGIN IMMEDIATE đã giữ khóa ghi từ đầu giao dịch)
+        if not Room.objects.select_for_update().filter(room_class=room_class, status='AVAILABLE').exists():
+            return None
+
+        # 2. Phân loại và khóa đơn: đơn đặt gấp (< 24h) phải thanh toán ngay
+        booking = Booking(**booking_details)
+        is_urgent_booking = booking.check_in_date - timezone.now().date() < timedelta(days=1)
+        booking.is_locked = is_urgent_booking
+        booking.status = Booking.Status.PENDING_PAYMENT if is_urgent_booking else Booking.Status.PENDING_REVIEW
+        booking.save()
+        booking.additional_services.set(service_ids)
+    return booking
@@ -14,6 +14,10 @@ urlpatterns = [
 
     # URL để nhân viên cập nhật trạng thái phòng
     path('rooms/', views.manage_rooms_view, name='manage_rooms'),
+    # URL cho hàng đợi dọn phòng (buồng phòng)
+    path('rooms/housekeeping/', views.housekeeping_queue_view, name='housekeeping_queue'),
+    # Luồng SSE cập nhật trực tiếp trạng thái phòng
+    path('rooms/stream/', views.room_status_stream_view, name='room_status_stream'),
 
     # URLs CHO QUẢN LÝ LOẠI PHÒNG
     path('room-types/', views.RoomTypeListView.as_view(), name='room_type_list'),
@@ -1,7 +1,7 @@
 from django import forms
 from django.utils import timezone
-from services.models import Service
-from .models import RoomClass, Booking, PaymentProof
+from services.catalog import get_catalog_snapshot
+from .models import Amenity, RoomClass, Booking, PaymentProof
 
 from django_countries.fields import CountryField
 from django.core.exceptions import ValidationError
@@ -10,25 +10,33 @@ class ServiceCheckboxSelectMultiple(forms.CheckboxSelectMultiple):
     """
     Widget tùy chỉnh để tự động thêm thuộc tính `data-price` và `price`
     vào mỗi lựa chọn khi render.
+    Bảng giá (`prices`: id dịch vụ -> giá) được form gán từ snapshot danh mục.
     """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prices = {}
+
     def create_option(self, name, value, label, selected, index, subindex=None, attrs=None):
         # Gọi phương thức gốc để lấy các thuộc tính mặc định
         option = super().create_option(name, value, label, selected, index, subindex, attrs)
         
-        # 'value' ở đây trỏ đến đối tượng Service
-        if value and hasattr(value, 'instance') and hasattr(value.instance, 'price'):
+        # 'value' ở đây là id của Service
+        price = self.prices.get(value)
+        if price is not None:
             # 1. Thêm thuộc tính data-price vào thẻ input
-            option['attrs']['data-price'] = value.instance.price
+            option['attrs']['data-price'] = price
             
             # 2. (QUAN TRỌNG) Gói giá tiền vào chính đối tượng 'option'
             # để template có thể truy cập trực tiếp
-            option['price'] = value.instance.price
+            option['price'] = price
         
         return option
 
 class BookingOptionsForm(forms.Form):
     """
     Form cho Trang Tùy chọn: Khách hàng chọn ngày, số khách và dịch vụ đi kèm.
+    Danh sách dịch vụ lấy từ snapshot danh mục trong bộ nhớ (chỉ dịch vụ đang hoạt động),
+    không truy vấn CSDL khi render hay khi xác thực.
     """
     check_in_date = forms.DateField(
         label="Ngày nhận phòng",
@@ -41,13 +49,19 @@ class BookingOptionsForm(forms.Form):
     adults = forms.IntegerField(label="Người lớn", min_value=1, initial=1, widget=forms.NumberInput(attrs={'class': 'form-control'}))
     children = forms.IntegerField(label="Trẻ em", min_value=0, initial=0, widget=forms.NumberInput(attrs={'class': 'form-control'}))
     
-    additional_services = forms.ModelMultipleChoiceField(
+    additional_services = forms.TypedMultipleChoiceField(
         label="Dịch vụ đi kèm",
-        queryset=Service.objects.all(),
-
+        coerce=int,
         widget=ServiceCheckboxSelectMultiple,
         required=False
     )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        catalog = get_catalog_snapshot()
+        services_field = self.fields['additional_services']
+        services_field.choices = [(service.id, service.name) for service in catalog.active_services]
+        services_field.widget.prices = {service.id: service.price for service in catalog.active_services}
     
 class CheckoutForm(forms.Form):
     """
@@ -164,4 +178,36 @@ class PaymentProofForm(forms.ModelForm):
     
     class Meta:
         model = PaymentProof
-        fields = ['image']
\ No newline at end of file
+        fields = ['image']
+
+class RoomClassForm(forms.ModelForm):
+    """
+    Form thêm/sửa Hạng phòng cho Admin.
+    Tiện ích vẫn được nhập dạng chuỗi cách nhau bởi dấu phẩy, khi lưu sẽ được
+    chuẩn hóa thành các bản ghi Amenity (tạo mới nếu chưa có).
+    """
+    amenity_names = forms.CharField(
+        label="Tiện ích",
+        help_text="Mỗi tiện ích cách nhau bởi dấu phẩy",
+        widget=forms.Textarea(attrs={'rows': 3}),
+        required=False
+    )
+
+    class Meta:
+        model = RoomClass
+        fields = ['room_type', 'name', 'description', 'base_price', 'area', 'image']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields['amenity_names'].initial = ", ".join(
+                amenity.name for amenity in self.instance.amenities.all()
+            )
+
+    def clean_amenity_names(self):
+        return Amenity.parse_names(self.cleaned_data.get('amenity_names', ''))
+
+    def _save_m2m(self):
+        # Được gọi bởi save() (hoặc save_m2m() khi commit=False) sau khi instance đã có pk
+        super()._save_m2m()
+        self.instance.amenities.set(Amenity.get_or_create_many(self.cleaned_data['amenity_names']))
@@ -0,0 +1,231 @@
+import io
+import json
+import math
+import statistics
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from booking.models import Booking, PaymentProof, Room, RoomClass
+from services.models import Service
+from users.models import CustomUser
+
+# ==============================================================================
+# BENCHMARK LUỒNG ĐẶT PHÒNG VÀ DASHBOARD LỄ TÂN
+# Chạy toàn bộ luồng qua django.test.Client trên CSDL đang cấu hình (nên là dữ liệu
+# lớn từ seed_synthetic_data): danh sách hạng phòng -> tùy chọn đặt phòng -> checkout
+# -> tải chứng từ thanh toán, và 2 trang dashboard của lễ tân.
+# Mỗi bước ghi độ trễ (p50/p95) và số truy vấn SQL; kết quả so với baseline JSON
+# (--save-baseline để ghi baseline mới). Đơn và chứng từ tạo ra được xóa sau khi chạy.
+# Email dùng backend locmem (setup_test_environment), giới hạn tần suất được tắt.
+# ==============================================================================
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'booking_funnel_baseline.json'
+STEPS = [
+    'room_class_list', 'booking_options', 'booking_options_submit', 'checkout', 'checkout_submit',
+    'payment_upload', 'manage_bookings', 'manage_rooms',
+]
+
+
+def percentile(values, percent):
+    """Percentile theo nearest-rank trên danh sách đã sắp xếp."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def tiny_png():
+    """Ảnh PNG 8x8 hợp lệ để ImageField chấp nhận (không cần file mẫu)."""
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), (200, 200, 200)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark luồng đặt phòng (room_class_list, booking_options, checkout, tải chứng từ) "
+        "và dashboard lễ tân (manage_bookings, manage_rooms) qua test client: báo cáo p50/p95 "
+        "và số truy vấn mỗi bước, so sánh với baseline đã lưu."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help="Số lượt chạy đo (mặc định 20).")
+        parser.add_argument('--warmup', type=int, default=2, help="Số lượt chạy khởi động, không tính (mặc định 2).")
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help=f"File baseline JSON (mặc định {DEFAULT_BASELINE}).")
+        parser.add_argument('--save-baseline', action='store_true', help="Ghi kết quả lần chạy này làm baseline.")
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help="Mức chậm hơn baseline (tỉ lệ) vẫn chấp nhận được cho p95 (mặc định 0.2 = 20%%).",
+        )
+        parser.add_argument('--fail-on-regression', action='store_true', help="Thoát với lỗi nếu có bước chậm hơn baseline.")
+        parser.add_argument('--skip', nargs='*', default=[], choices=STEPS, help="Bỏ qua các bước (VD: manage_bookings).")
+
+    def handle(self, *args, **options):
+        self.skip = set(options['skip'])
+        customer, staff, room_class, service_ids = self.pick_fixtures()
+        self.stdout.write(
+            f"CSDL: {connection.vendor}, {Booking.objects.count()} đơn đặt phòng, {Room.objects.count()} phòng. "
+            f"Khách: {customer.username}, lễ tân: {staff.username}, hạng phòng: {room_class} (#{room_class.pk})."
+        )
+
+        self.samples = {step: {'latency': [], 'queries': []} for step in STEPS if step not in self.skip}
+        self.created_bookings = []
+        setup_test_environment()
+        try:
+            with override_settings(RATE_LIMIT_ENABLED=False):
+                customer_client, staff_client = Client(), Client()
+                customer_client.force_login(customer)
+                staff_client.force_login(staff)
+                total = options['warmup'] + options['iterations']
+                for iteration in range(total):
+                    self.recording = iteration >= options['warmup']
+                    self.run_funnel(iteration, customer_client, room_class, service_ids)
+                    self.run_dashboards(staff_client)
+        finally:
+            teardown_test_environment()
+            self.cleanup()
+
+        results = self.summarize()
+        baseline_path = Path(options['baseline'])
+        baseline = json.loads(baseline_path.read_text(encoding='utf-8')) if baseline_path.exists() else None
+        regressions = self.report(results, baseline, options['tolerance'])
+        if options['save_baseline']:
+            self.save_baseline(baseline_path, results, options['iterations'])
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f"Chậm hơn baseline ở: {', '.join(regressions)}")
+
+    def pick_fixtures(self):
+        """Ưu tiên tài khoản / hạng phòng giả lập từ seed_synthetic_data."""
+        customers = CustomUser.objects.filter(role=CustomUser.Role.CUSTOMER, is_active=True)
+        customer = customers.filter(username__startswith='synthetic_').order_by('pk').first() or customers.order_by('pk').first()
+        staff = CustomUser.objects.filter(
+            role=CustomUser.Role.RECEPTION, is_active=True, is_staff=True
+        ).order_by('pk').first()
+        room_class = RoomClass.objects.filter(rooms__status=Room.Status.AVAILABLE).select_related('room_type').order_by('-pk').first()
+        if not (customer and staff and room_class):
+            raise CommandError(
+                "Cần ít nhất 1 khách hàng, 1 lễ tân và 1 hạng phòng còn phòng trống. "
+                "Chạy 'python manage.py seed_synthetic_data' trước."
+            )
+        service_ids = list(Service.objects.filter(status=Service.Status.ACTIVE).order_by('pk').values_list('pk', flat=True)[:2])
+        return customer, staff, room_class, service_ids
+
+    def measure(self, step, request, expected=(200, 302), required=False):
+        """
+        Gọi request (hàm không tham số), đo thời gian + số truy vấn (trên mọi CSDL); kiểm tra mã trạng thái.
+        Bước bị --skip không được gọi, trừ bước bắt buộc cho luồng (required) - vẫn gọi nhưng không ghi số liệu.
+        """
+        if step in self.skip and not required:
+            return None
+        # Đếm truy vấn trên mọi alias: view đọc-bản-sao (@read_from_replica) chạy truy vấn trên 'replica'
+        with ExitStack() as stack:
+            captured = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+            started = time.perf_counter()
+            response = request()
+            elapsed = time.perf_counter() - started
+        if response.status_code not in expected:
+            raise CommandError(f"Bước {step}: mã trạng thái {response.status_code} (mong đợi {expected}).")
+        if self.recording and step in self.samples:
+            self.samples[step]['latency'].append(elapsed * 1000)
+            self.samples[step]['queries'].append(sum(len(queries) for queries in captured))
+        return response
+
+    # ===== Luồng đặt phòng của khách =====
+    def run_funnel(self, iteration, client, room_class, service_ids):
+        options_url = reverse('booking_options', args=[room_class.pk])
+        checkout_url = reverse('checkout')
+        check_in = timezone.localdate() + timedelta(days=60 + iteration % 30)
+
+        self.measure('room_class_list', lambda: client.get(reverse('room_class_list', args=[room_class.room_type_id])))
+        self.measure('booking_options', lambda: client.get(options_url))
+        options_data = {
+            'check_in_date': check_in.isoformat(), 'check_out_date': (check_in + timedelta(days=2)).isoformat(),
+            'adults': 1, 'children': 0, 'additional_services': service_ids,
+        }
+        self.measure('booking_options_submit', lambda: client.post(options_url, options_data), expected=(302,), required=True)
+
+        self.measure('checkout', lambda: client.get(checkout_url))
+        checkout_data = {'booking_for': 'SELF', 'payment_method': 'BANK_TRANSFER', 'special_requests': 'benchmark'}
+        response = self.measure('checkout_submit', lambda: client.post(checkout_url, checkout_data), expected=(302,), required=True)
+        match = resolve(urlsplit(response.url).path)
+        booking_pk = match.kwargs.get('pk') or match.kwargs.get('booking_pk')
+        if booking_pk is None:
+            raise CommandError(f"Checkout không tạo được đơn (chuyển hướng tới {response.url}).")
+        self.created_bookings.append(booking_pk)
+
+        upload = SimpleUploadedFile('benchmark-proof.png', tiny_png(), content_type='image/png')
+        self.measure(
+            'payment_upload',
+            lambda: client.post(reverse('payment_guidance', args=[booking_pk]), {'image': upload}),
+            expected=(302,),
+        )
+
+    # ===== Dashboard lễ tân =====
+    def run_dashboards(self, client):
+        self.measure('manage_bookings', lambda: client.get(reverse('manage_bookings')), expected=(200,))
+        self.measure('manage_rooms', lambda: client.get(reverse('manage_rooms')), expected=(200,))
+
+    def cleanup(self):
+        """Xóa đơn do benchmark tạo, kèm file chứng từ đã tải lên."""
+        for proof in PaymentProof.objects.filter(booking_id__in=self.created_bookings):
+            proof.image.delete(save=False)
+        deleted, _ = Booking.objects.filter(pk__in=self.created_bookings).delete()
+        self.stdout.write(f"Đã xóa {len(self.created_bookings)} đơn thử ({deleted} bản ghi liên quan).")
+
+    # ===== Kết quả =====
+    def summarize(self):
+        results = {}
+        for step, sample in self.samples.items():
+            if not sample['latency']:
+                continue
+            results[step] = {
+                'p50_ms': round(statistics.median(sample['latency']), 2),
+                'p95_ms': round(percentile(sample['latency'], 95), 2),
+                'queries': max(sample['queries']),
+            }
+        return results
+
+    def report(self, results, baseline, tolerance):
+        """In bảng kết quả; trả về danh sách bước chậm hơn baseline (p95 hoặc số truy vấn tăng)."""
+        baseline_steps = (baseline or {}).get('steps', {})
+        self.stdout.write(f"{'Bước':<24}{'p50 (ms)':>10}{'p95 (ms)':>10}{'SQL':>6}   So với baseline")
+        regressions = []
+        for step, result in results.items():
+            line = f"{step:<24}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['queries']:>6}   "
+            base = baseline_steps.get(step)
+            if base is None:
+                self.stdout.write(line + "(chưa có baseline)")
+                continue
+            change = (result['p95_ms'] - base['p95_ms']) / base['p95_ms'] if base['p95_ms'] else 0
+            line += f"p95 {change:+.0%} (baseline {base['p95_ms']:.1f}ms), SQL {result['queries'] - base['queries']:+d}"
+            if change > tolerance or result['queries'] > base['queries']:
+                regressions.append(step)
+                self.stdout.write(self.style.ERROR(line + "  CHẬM HƠN"))
+            else:
+                self.stdout.write(self.style.SUCCESS(line))
+        return regressions
+
+    def save_baseline(self, path, results, iterations):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            'meta': {
+                'created_at': timezone.now().isoformat(timespec='seconds'),
+                'database': connection.vendor,
+                'bookings': Booking.objects.count(),
+                'iterations': iterations,
+            },
+            'steps': results,
+        }
+        path.write_text(json.dumps(payload, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(f"Đã lưu baseline vào {path}."))
@@ -0,0 +1,116 @@
+import statistics
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.utils import timezone
+
+from booking.checkout import place_booking
+from booking.models import Booking, Room, RoomClass, RoomType
+
+
+class Command(BaseCommand):
+    help = (
+        "Đo tải ghi đồng thời của luồng checkout trên CSDL đang cấu hình: nhiều luồng cùng tạo đơn "
+        "qua booking.checkout.place_booking, báo cáo thông lượng, độ trễ và số lỗi khóa. "
+        "Dữ liệu thử (loại phòng/hạng phòng/phòng/đơn) được xóa sau khi chạy trừ khi dùng --keep."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help="Số luồng ghi đồng thời (mặc định 8).")
+        parser.add_argument('--bookings', type=int, default=25, help="Số đơn mỗi luồng tạo (mặc định 25).")
+        parser.add_argument(
+            '--no-retry', action='store_true',
+            help="Gọi thẳng giao dịch, không thử lại khi CSDL báo khóa (để so sánh).",
+        )
+        parser.add_argument('--keep', action='store_true', help="Giữ lại dữ liệu thử sau khi chạy.")
+
+    def handle(self, *args, **options):
+        self.describe_database()
+        room_type, room_class = self.create_fixture()
+        create = place_booking.__wrapped__ if options['no_retry'] else place_booking
+
+        latencies, errors, lock = [], [], threading.Lock()
+        check_in = timezone.now().date() + timedelta(days=30)
+
+        def worker(thread_no):
+            try:
+                for i in range(options['bookings']):
+                    details = {
+                        'room_class': room_class,
+                        'check_in_date': check_in,
+                        'check_out_date': check_in + timedelta(days=2),
+                        'room_price': room_class.base_price * 2,
+                        'total_price': room_class.base_price * 2,
+                        'guest_full_name': f"Benchmark {thread_no}-{i}",
+                        'guest_email': f"benchmark{thread_no}@example.invalid",
+                    }
+                    started = time.perf_counter()
+                    try:
+                        create(details, [])
+                    except OperationalError as exc:
+                        with lock:
+                            errors.append(str(exc))
+                        continue
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+            finally:
+                connection.close()  # Mỗi luồng có kết nối riêng
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        self.report(latencies, errors, elapsed)
+        if options['keep']:
+            self.stdout.write(f"Giữ lại dữ liệu thử: loại phòng #{room_type.pk}.")
+        else:
+            deleted, _ = Booking.objects.filter(room_class=room_class).delete()
+            room_type.delete()
+            self.stdout.write(f"Đã xóa {deleted} bản ghi thử.")
+
+    def describe_database(self):
+        settings_dict = connection.settings_dict
+        line = f"CSDL: {connection.vendor} ({settings_dict['NAME']})"
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                journal_mode = cursor.fetchone()[0]
+            options = settings_dict.get('OPTIONS', {})
+            line += (
+                f", journal_mode={journal_mode}, timeout={options.get('timeout', 5)}s, "
+                f"transaction_mode={options.get('transaction_mode', 'DEFERRED')}"
+            )
+        elif 'pool' in settings_dict.get('OPTIONS', {}):
+            line += ", connection pool: bật"
+        self.stdout.write(line)
+
+    def create_fixture(self):
+        room_type = RoomType.objects.create(name="[Benchmark] Loại phòng thử")
+        room_class = RoomClass.objects.create(
+            room_type=room_type, name="[Benchmark] Hạng phòng thử", description="Dữ liệu đo tải",
+            base_price=1000000, area="30m2",
+        )
+        Room.objects.create(room_class=room_class, room_number=f"BM{room_type.pk}")
+        return room_type, room_class
+
+    def report(self, latencies, errors, elapsed):
+        done = len(latencies)
+        self.stdout.write(f"Tạo thành công {done} đơn trong {elapsed:.2f}s ({done / elapsed:.1f} đơn/giây).")
+        if latencies:
+            ordered = sorted(latencies)
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            self.stdout.write(
+                f"Độ trễ mỗi giao dịch: p50={statistics.median(ordered) * 1000:.1f}ms, "
+                f"p95={p95 * 1000:.1f}ms, max={ordered[-1] * 1000:.1f}ms"
+            )
+        if errors:
+            self.stdout.write(self.style.ERROR(f"{len(errors)} giao dịch thất bại do khóa CSDL, ví dụ: {errors[0]}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Không có giao dịch nào thất bại do khóa CSDL."))
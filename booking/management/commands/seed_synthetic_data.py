@@ -0,0 +1,501 @@
+import io
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, time as dt_time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from booking.models import Amenity, Booking, PaymentProof, Room, RoomClass, RoomType
+from crm.models import Ticket, TicketLshBucket, TicketResponse, TicketSignature
+from crm.routing import ensure_agent_profiles, recount_open_tickets
+from crm.search import remove_tickets
+from services.catalog import bump_catalog_version
+from services.models import Service, ServiceCategory
+from users.identity import normalize_email_key, normalize_phone_key
+from users.models import CustomUser
+
+# ==============================================================================
+# SINH DỮ LIỆU GIẢ LẬP QUY MÔ LỚN ĐỂ ĐO HIỆU NĂNG
+# Mọi bản ghi sinh ra đều có dấu nhận biết để xóa riêng (--purge):
+# - Tài khoản: username bắt đầu bằng 'synthetic_', email @synthetic.fivitel.test
+# - Loại phòng / loại dịch vụ: mô tả bắt đầu bằng SYNTHETIC_MARK
+# - Đơn đặt phòng: thuộc hạng phòng giả lập; ticket: của khách/email giả lập
+# Tất cả tài khoản giả lập có mật khẩu SYNTHETIC_PASSWORD (tiện cho benchmark đăng nhập).
+# Ghi bằng bulk_create theo lô (mỗi lô 1 transaction) nên không chạy save()/signal:
+# các cột tính sẵn (email_key, phone_key, tóm tắt phản hồi...) được tính tay tại đây,
+# chỉ mục tìm kiếm / MinHash được dựng lại ở bước cuối.
+# ==============================================================================
+SYNTHETIC_MARK = '[synthetic]'
+SYNTHETIC_USERNAME_PREFIX = 'synthetic_'
+SYNTHETIC_EMAIL_DOMAIN = 'synthetic.fivitel.test'
+SYNTHETIC_PASSWORD = 'synthetic-pass'
+# Ảnh minh họa dùng chung (template trang công khai luôn hiển thị ảnh loại phòng / hạng phòng / dịch vụ)
+PLACEHOLDER_IMAGE = 'media/synthetic/placeholder.jpg'
+
+HOTELS = ['Đà Nẵng', 'Hội An', 'Nha Trang', 'Phú Quốc', 'Hạ Long', 'Đà Lạt']
+ROOM_TYPES = [
+    # (tên, giá cơ bản/đêm, sức chứa, tỉ lệ số phòng)
+    ('Standard', 900_000, 2, 40),
+    ('Superior', 1_300_000, 2, 30),
+    ('Deluxe', 1_900_000, 3, 20),
+    ('Suite', 3_500_000, 4, 10),
+]
+ROOM_VIEWS = [('Hướng phố', Decimal('1.0')), ('Hướng vườn', Decimal('1.1')), ('Hướng biển', Decimal('1.35'))]
+AMENITIES = ['Wifi', 'TV', 'Minibar', 'Điều hòa', 'Bồn tắm', 'Ban công', 'Két sắt', 'Máy sấy tóc']
+SERVICE_CATALOG = {
+    'Spa & Massage': [('Massage body 60 phút', 450_000), ('Xông hơi thảo dược', 250_000), ('Chăm sóc da mặt', 380_000)],
+    'Ẩm thực': [('Buffet sáng', 220_000), ('Set menu hải sản', 890_000), ('Ăn tối lãng mạn', 1_500_000)],
+    'Di chuyển': [('Đón sân bay', 300_000), ('Thuê xe máy theo ngày', 150_000), ('Xe riêng đi tham quan', 1_200_000)],
+    'Tour & Trải nghiệm': [('Tour lặn ngắm san hô', 950_000), ('Lớp học nấu ăn', 600_000)],
+}
+
+FAMILY_NAMES = ['Nguyễn', 'Trần', 'Lê', 'Phạm', 'Hoàng', 'Huỳnh', 'Phan', 'Vũ', 'Võ', 'Đặng', 'Bùi', 'Đỗ', 'Hồ', 'Ngô', 'Dương', 'Lý']
+MIDDLE_NAMES = ['Văn', 'Thị', 'Minh', 'Ngọc', 'Thanh', 'Quốc', 'Hoài', 'Gia', 'Đức', 'Thu']
+GIVEN_NAMES = [
+    'An', 'Bình', 'Châu', 'Dũng', 'Giang', 'Hà', 'Hải', 'Hạnh', 'Hiếu', 'Hòa', 'Hùng', 'Hương', 'Khánh', 'Lan',
+    'Linh', 'Long', 'Mai', 'Nam', 'Nga', 'Phúc', 'Quân', 'Quỳnh', 'Sơn', 'Tâm', 'Thảo', 'Trang', 'Trung', 'Tuấn', 'Vy', 'Yến',
+]
+NATIONALITIES = ['VN'] * 15 + ['KR', 'US', 'JP', 'FR', 'AU']
+STAY_LENGTHS = [1, 1, 2, 2, 2, 3, 3, 4, 5, 7]
+ROOM_STATUSES = [
+    (Room.Status.AVAILABLE, 60), (Room.Status.OCCUPIED, 30), (Room.Status.CLEANING, 7), (Room.Status.MAINTENANCE, 3),
+]
+
+# Tỉ lệ trạng thái đơn theo thời điểm lưu trú so với hôm nay
+PAST_STATUSES = [(Booking.Status.COMPLETED, 82), (Booking.Status.CANCELLED, 12), (Booking.Status.EXPIRED, 6)]
+CURRENT_STATUSES = [(Booking.Status.CHECKED_IN, 90), (Booking.Status.CANCELLED, 10)]
+FUTURE_STATUSES = [
+    (Booking.Status.PENDING_REVIEW, 35), (Booking.Status.READY_FOR_PAYMENT, 10), (Booking.Status.PENDING_PAYMENT, 5),
+    (Booking.Status.PAYMENT_PENDING_VERIFICATION, 10), (Booking.Status.PAID, 15), (Booking.Status.CONFIRMED, 15),
+    (Booking.Status.CANCELLED, 10),
+]
+ROOM_ASSIGNED_STATUSES = {Booking.Status.CONFIRMED, Booking.Status.CHECKED_IN, Booking.Status.COMPLETED}
+
+TICKET_TEMPLATES = {
+    Ticket.Type.CONSULTATION: [
+        ('Hỏi giá {service}', 'Cho mình hỏi giá {service} vào cuối tuần và có ưu đãi cho {guests} người không?'),
+        ('Tư vấn phòng cho gia đình', 'Gia đình mình {guests} người muốn đặt phòng {room} khoảng {nights} đêm, nhờ tư vấn giúp.'),
+    ],
+    Ticket.Type.BOOKING_SUPPORT: [
+        ('Đổi ngày nhận phòng', 'Mình muốn đổi ngày nhận phòng {room} sang tuần sau, đơn đặt {nights} đêm.'),
+        ('Chưa nhận được email xác nhận', 'Mình đã chuyển khoản cho đơn phòng {room} nhưng chưa nhận được email xác nhận.'),
+    ],
+    Ticket.Type.COMPLAINT: [
+        ('Máy lạnh phòng không hoạt động', 'Máy lạnh phòng {room} không mát từ tối qua, đã báo lễ tân nhưng chưa ai xử lý.'),
+        ('Thái độ nhân viên chưa tốt', 'Nhân viên quầy {service} trả lời thiếu lịch sự khi mình hỏi về hóa đơn.'),
+        ('Tính sai tiền dịch vụ', 'Hóa đơn tính {service} 2 lần trong khi mình chỉ dùng 1 lần.'),
+    ],
+    Ticket.Type.OTHER: [
+        ('Quên đồ tại phòng', 'Mình để quên sạc điện thoại ở phòng {room}, nhờ khách sạn giữ giúp.'),
+    ],
+}
+COMPLAINT_TYPES = [choice for choice in Ticket.ComplaintType.values]
+STAFF_REPLIES = [
+    'Cảm ơn anh/chị đã liên hệ, bộ phận liên quan đang kiểm tra và sẽ phản hồi sớm.',
+    'Khách sạn đã ghi nhận yêu cầu, nhân viên sẽ liên hệ lại trong vòng 30 phút.',
+    'Chúng tôi xin lỗi về sự bất tiện, kỹ thuật viên đã được cử đến phòng.',
+]
+CUSTOMER_REPLIES = ['Cảm ơn, mình chờ phản hồi nhé.', 'Đến giờ vẫn chưa được xử lý, nhờ kiểm tra giúp.', 'Ok, đã nhận được.']
+
+
+@contextmanager
+def manual_timestamps(*models):
+    """Tạm tắt auto_now / auto_now_add để bulk_create giữ được thời điểm giả lập trong quá khứ."""
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def weighted_choices(rng, weighted, k):
+    values, weights = zip(*weighted)
+    return rng.choices(values, weights=weights, k=k)
+
+
+class Command(BaseCommand):
+    help = (
+        "Sinh dữ liệu giả lập quy mô lớn (khách sạn, phòng, khách hàng, hàng triệu đơn đặt phòng, "
+        "dịch vụ, ticket và phản hồi) bằng bulk_create theo lô để đo hiệu năng với khối lượng thật. "
+        "Dùng --purge để xóa dữ liệu giả lập."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hotels', type=int, default=3, help=f"Số khách sạn (tối đa {len(HOTELS)}, mặc định 3).")
+        parser.add_argument('--rooms', type=int, default=3000, help="Tổng số phòng (mặc định 3000).")
+        parser.add_argument('--customers', type=int, default=50000, help="Số tài khoản khách hàng (mặc định 50.000).")
+        parser.add_argument('--bookings', type=int, default=1_000_000, help="Số đơn đặt phòng (mặc định 1.000.000).")
+        parser.add_argument('--years', type=int, default=4, help="Số năm lịch sử đặt phòng (mặc định 4).")
+        parser.add_argument('--tickets', type=int, default=50000, help="Số ticket CSKH (mặc định 50.000).")
+        parser.add_argument('--staff', type=int, default=30, help="Số nhân viên lễ tân + CSKH (mặc định 30).")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Số bản ghi mỗi lô bulk_create (mặc định 5000).")
+        parser.add_argument('--seed', type=int, default=2024, help="Seed ngẫu nhiên để dữ liệu lặp lại được.")
+        parser.add_argument(
+            '--skip-indexes', action='store_true',
+            help="Không dựng lại chỉ mục tìm kiếm / MinHash sau khi sinh (nhanh hơn, tìm kiếm sẽ thiếu dữ liệu mới).",
+        )
+        parser.add_argument('--purge', action='store_true', help="Xóa toàn bộ dữ liệu giả lập rồi thoát.")
+
+    def handle(self, *args, **options):
+        if options['purge']:
+            self.purge(options['batch_size'])
+            return
+
+        if RoomType.objects.filter(description__startswith=SYNTHETIC_MARK).exists():
+            raise CommandError("Đã có dữ liệu giả lập trong CSDL, chạy với --purge trước khi sinh lại.")
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.today = timezone.localdate()
+        self.started = time.perf_counter()
+
+        self.image = self.placeholder_image()
+        with manual_timestamps(Booking, Room, Ticket, TicketResponse):
+            room_classes, rooms_by_class = self.create_rooms(options['hotels'], options['rooms'])
+            services = self.create_services()
+            staff = self.create_users(options['staff'], role=None)
+            customers = self.create_users(options['customers'], role=CustomUser.Role.CUSTOMER)
+            self.create_bookings(options['bookings'], options['years'], room_classes, rooms_by_class, services, customers)
+            self.create_tickets(options['tickets'], options['years'], room_classes, services, customers, staff)
+
+        self.finalize(options['skip_indexes'])
+        self.log(self.style.SUCCESS("Hoàn tất sinh dữ liệu giả lập."))
+
+    def log(self, message):
+        self.stdout.write(f"[{time.perf_counter() - self.started:7.1f}s] {message}")
+
+    def random_instant(self, start_date, end_date):
+        """Thời điểm ngẫu nhiên (giờ hành chính mở rộng 7h-23h) trong khoảng ngày cho trước."""
+        days = max((end_date - start_date).days, 0)
+        day = start_date + timedelta(days=self.rng.randint(0, days))
+        moment = datetime.combine(day, dt_time(7)) + timedelta(seconds=self.rng.randint(0, 16 * 3600))
+        return timezone.make_aware(moment)
+
+    def placeholder_image(self):
+        """Tạo (1 lần) ảnh minh họa trong MEDIA_ROOT, trả về tên file để gán cho các ImageField."""
+        if not default_storage.exists(PLACEHOLDER_IMAGE):
+            from PIL import Image
+            buffer = io.BytesIO()
+            Image.new('RGB', (640, 400), (176, 196, 222)).save(buffer, 'JPEG')
+            default_storage.save(PLACEHOLDER_IMAGE, ContentFile(buffer.getvalue()))
+        return PLACEHOLDER_IMAGE
+
+    def random_person(self):
+        return f"{self.rng.choice(FAMILY_NAMES)} {self.rng.choice(MIDDLE_NAMES)} {self.rng.choice(GIVEN_NAMES)}"
+
+    def random_phone(self):
+        return f"09{self.rng.randint(0, 99_999_999):08d}"
+
+    # ===== 1. Khách sạn, loại phòng, hạng phòng, phòng =====
+    def create_rooms(self, hotel_count, room_count):
+        amenities = Amenity.get_or_create_many(AMENITIES)
+        room_types, room_classes = [], []
+        for hotel in HOTELS[:max(1, min(hotel_count, len(HOTELS)))]:
+            for size_rank, (name, price, occupancy, share) in enumerate(ROOM_TYPES):
+                room_type = RoomType.objects.create(
+                    name=f"{name} - Fivitel {hotel}", description=f"{SYNTHETIC_MARK} Phòng {name} tại Fivitel {hotel}",
+                    image=self.image,
+                )
+                room_types.append(room_type)
+                for view_name, multiplier in ROOM_VIEWS:
+                    room_class = RoomClass.objects.create(
+                        room_type=room_type, name=f"{name} {view_name}", base_price=Decimal(price) * multiplier,
+                        description=f"Phòng {name} {view_name.lower()} tại Fivitel {hotel}.",
+                        area=f"{24 + 8 * size_rank}m2",
+                        max_occupancy=occupancy, image=self.image,
+                    )
+                    room_class.amenities.set(self.rng.sample(amenities, k=self.rng.randint(3, len(amenities))))
+                    room_class.share = share
+                    room_class.hotel_no = HOTELS.index(hotel) + 1
+                    room_classes.append(room_class)
+
+        # Chia phòng theo tỉ lệ của loại phòng; số phòng dạng S<khách sạn>-<tầng><số>
+        total_share = sum(room_class.share for room_class in room_classes)
+        now = timezone.now()
+        rooms, counters = [], {}
+        for room_class in room_classes:
+            for _ in range(max(1, round(room_count * room_class.share / total_share))):
+                sequence = counters[room_class.hotel_no] = counters.get(room_class.hotel_no, 0) + 1
+                floor, number = divmod(sequence - 1, 40)
+                rooms.append(Room(
+                    room_class=room_class, room_number=f"S{room_class.hotel_no}-{floor + 1:02d}{number + 1:02d}",
+                    status=weighted_choices(self.rng, ROOM_STATUSES, 1)[0],
+                    updated_at=now,
+                ))
+        Room.objects.bulk_create(rooms, batch_size=self.batch_size)
+        rooms_by_class = {}
+        for room in Room.objects.filter(room_class__in=room_classes).only('pk', 'room_class_id'):
+            rooms_by_class.setdefault(room.room_class_id, []).append(room.pk)
+        self.log(f"Tạo {len(room_types)} loại phòng, {len(room_classes)} hạng phòng, {len(rooms)} phòng.")
+        return room_classes, rooms_by_class
+
+    # ===== 2. Dịch vụ =====
+    def create_services(self):
+        services = []
+        for category_name, items in SERVICE_CATALOG.items():
+            category = ServiceCategory.objects.create(
+                name=category_name, description=f"{SYNTHETIC_MARK} Dịch vụ {category_name.lower()}",
+                image=self.image,
+            )
+            services += Service.objects.bulk_create([
+                Service(category=category, name=name, price=price, description=f"{name} dành cho khách lưu trú.", image=self.image,
+                        highlights="Đặt trước qua lễ tân\nPhục vụ tận phòng", terms_conditions="Không hoàn tiền khi hủy trong 24h")
+                for name, price in items
+            ])
+        self.log(f"Tạo {len(services)} dịch vụ.")
+        return services
+
+    # ===== 3. Tài khoản =====
+    def create_users(self, count, role):
+        """role=None: nhân viên (2/3 CSKH, 1/3 lễ tân); ngược lại: khách hàng."""
+        password = make_password(SYNTHETIC_PASSWORD)  # Băm 1 lần, dùng chung cho mọi tài khoản giả lập
+        kind = 'staff' if role is None else 'customer'
+        joined_from = self.today - timedelta(days=365 * 5)
+        created = []
+        for offset in range(0, count, self.batch_size):
+            batch = []
+            for i in range(offset, min(offset + self.batch_size, count)):
+                user_role = role or (CustomUser.Role.SUPPORT if i % 3 else CustomUser.Role.RECEPTION)
+                username = f"{SYNTHETIC_USERNAME_PREFIX}{kind}{i:06d}"
+                batch.append(CustomUser(
+                    username=username, email=f"{username}@{SYNTHETIC_EMAIL_DOMAIN}", password=password,
+                    role=user_role, is_staff=role is None, full_name=self.random_person(),
+                    phone_number=self.random_phone(), nationality=self.rng.choice(NATIONALITIES),
+                    date_joined=self.random_instant(joined_from, self.today),
+                ))
+            with transaction.atomic():
+                created += CustomUser.objects.bulk_create(batch)
+        self.log(f"Tạo {len(created)} tài khoản {'nhân viên' if role is None else 'khách hàng'}.")
+        return [(user.pk, user.full_name, user.email, user.phone_number, user.nationality) for user in created]
+
+    # ===== 4. Đơn đặt phòng =====
+    def create_bookings(self, count, years, room_classes, rooms_by_class, services, customers):
+        first_day = self.today - timedelta(days=365 * years)
+        last_day = self.today + timedelta(days=180)
+        class_weights = [room_class.share for room_class in room_classes]
+        ServiceLink = Booking.additional_services.through
+        created = 0
+        for offset in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - offset)
+            bookings, chosen_services = [], []
+            for room_class in self.rng.choices(room_classes, weights=class_weights, k=size):
+                booking = self.build_booking(room_class, rooms_by_class, services, customers, first_day, last_day)
+                chosen_services.append(booking.chosen_services)
+                bookings.append(booking)
+            with transaction.atomic():
+                Booking.objects.bulk_create(bookings)
+                ServiceLink.objects.bulk_create([
+                    ServiceLink(booking_id=booking.pk, service_id=service.pk)
+                    for booking, picked in zip(bookings, chosen_services) for service in picked
+                ])
+            created += size
+            if created % (self.batch_size * 20) == 0 or created == count:
+                self.log(f"Đơn đặt phòng: {created}/{count}")
+
+    def build_booking(self, room_class, rooms_by_class, services, customers, first_day, last_day):
+        rng = self.rng
+        nights = rng.choice(STAY_LENGTHS)
+        check_in = first_day + timedelta(days=rng.randint(0, (last_day - first_day).days))
+        check_out = check_in + timedelta(days=nights)
+        if check_out <= self.today:
+            status = weighted_choices(rng, PAST_STATUSES, 1)[0]
+        elif check_in <= self.today:
+            status = weighted_choices(rng, CURRENT_STATUSES, 1)[0]
+        else:
+            status = weighted_choices(rng, FUTURE_STATUSES, 1)[0]
+
+        # Đặt trước 0-60 ngày
+        created_at = self.random_instant(check_in - timedelta(days=rng.randint(0, 60)), check_in)
+        created_at = min(created_at, timezone.now())
+        picked = rng.sample(services, k=rng.choice([0, 0, 0, 1, 1, 2]))
+        room_price = room_class.base_price * nights
+        services_price = sum((service.price for service in picked), Decimal(0))
+
+        if customers and rng.random() < 0.6:
+            customer_id, full_name, email, phone, nationality = rng.choice(customers)
+        else:
+            customer_id, full_name = None, self.random_person()
+            email = f"guest{rng.randint(0, 10 ** 7)}@{SYNTHETIC_EMAIL_DOMAIN}"
+            phone, nationality = self.random_phone(), rng.choice(NATIONALITIES)
+
+        adults = rng.randint(1, room_class.max_occupancy)
+        booking = Booking(
+            customer_id=customer_id, room_class=room_class,
+            assigned_room_id=rng.choice(rooms_by_class[room_class.pk]) if status in ROOM_ASSIGNED_STATUSES else None,
+            guest_full_name=full_name, guest_email=email, guest_phone_number=phone, guest_nationality=nationality,
+            email_key=normalize_email_key(email), phone_key=normalize_phone_key(phone),
+            check_in_date=check_in, check_out_date=check_out,
+            adults=adults, children=rng.randint(0, room_class.max_occupancy - adults),
+            room_price=room_price, services_price=services_price, total_price=room_price + services_price,
+            status=status, is_locked=status != Booking.Status.PENDING_REVIEW,
+            created_at=created_at, updated_at=created_at,
+            payment_date=created_at + timedelta(hours=rng.randint(1, 48)) if status in ROOM_ASSIGNED_STATUSES else None,
+        )
+        booking.chosen_services = picked
+        return booking
+
+    # ===== 5. Ticket CSKH và phản hồi =====
+    def create_tickets(self, count, years, room_classes, services, customers, staff):
+        rng = self.rng
+        first_day = self.today - timedelta(days=365 * years)
+        support_staff = [member for i, member in enumerate(staff) if i % 3] or staff
+        ticket_types = list(TICKET_TEMPLATES)
+        now = timezone.now()
+        created = responses = 0
+        for offset in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - offset)
+            tickets, conversations = [], []
+            for _ in range(size):
+                ticket_type = rng.choices(ticket_types, weights=[35, 25, 30, 10])[0]
+                subject, body = rng.choice(TICKET_TEMPLATES[ticket_type])
+                values = {
+                    'service': rng.choice(services).name.lower(), 'room': rng.choice(room_classes).name,
+                    'guests': rng.randint(1, 5), 'nights': rng.choice(STAY_LENGTHS),
+                }
+                created_at = self.random_instant(first_day, self.today)
+                created_at = min(created_at, now)
+                age_days = (now - created_at).days
+                status = Ticket.Status.RESOLVED if age_days > 7 and rng.random() < 0.92 else rng.choice(Ticket.Status.values)
+
+                if customers and rng.random() < 0.7:
+                    customer_id, full_name, email, phone, _nationality = rng.choice(customers)
+                    guest_email = guest_phone = guest_name = ''
+                else:
+                    customer_id, full_name = None, self.random_person()
+                    email = guest_email = f"guest{rng.randint(0, 10 ** 7)}@{SYNTHETIC_EMAIL_DOMAIN}"
+                    phone = guest_phone = self.random_phone()
+                    guest_name = full_name
+
+                assignee = rng.choice(support_staff) if staff and (status != Ticket.Status.NEW or rng.random() < 0.3) else None
+                ticket = Ticket(
+                    customer_id=customer_id, guest_full_name=guest_name, guest_email=guest_email,
+                    guest_phone_number=guest_phone,
+                    email_key=normalize_email_key(guest_email), phone_key=normalize_phone_key(guest_phone),
+                    type=ticket_type, subject=subject.format(**values), description=body.format(**values),
+                    complaint_type=rng.choice(COMPLAINT_TYPES) if ticket_type == Ticket.Type.COMPLAINT else None,
+                    status=status, assigned_to_id=assignee[0] if assignee else None,
+                    created_at=created_at, status_changed_at=created_at,
+                )
+
+                # Hội thoại: khách và nhân viên xen kẽ, mỗi phản hồi cách nhau vài giờ
+                conversation, moment = [], created_at
+                for turn in range(rng.choice([0, 1, 1, 2, 2, 3, 4]) if status != Ticket.Status.NEW else 0):
+                    moment = min(moment + timedelta(minutes=rng.randint(10, 600)), now)
+                    if turn % 2 == 0 and staff:
+                        responder_id = assignee[0] if assignee else rng.choice(staff)[0]
+                        conversation.append((responder_id, rng.choice(STAFF_REPLIES), moment))
+                        ticket.first_response_at = ticket.first_response_at or moment
+                    elif customer_id:
+                        conversation.append((customer_id, rng.choice(CUSTOMER_REPLIES), moment))
+                if status == Ticket.Status.RESOLVED:
+                    ticket.resolved_at = ticket.status_changed_at = min(moment + timedelta(hours=rng.randint(1, 72)), now)
+                    ticket.resolution_details = "Đã xử lý xong và thông báo cho khách."
+                tickets.append(ticket)
+                conversations.append(conversation)
+
+            with transaction.atomic():
+                Ticket.objects.bulk_create(tickets)
+                responses += len(TicketResponse.objects.bulk_create([
+                    TicketResponse(ticket_id=ticket.pk, responder_id=responder_id, message=message, created_at=moment)
+                    for ticket, conversation in zip(tickets, conversations)
+                    for responder_id, message, moment in conversation
+                ]))
+                # Tóm tắt phản hồi (last_response_*, response_count) tính bằng 1 câu UPDATE cho cả lô
+                Ticket.refresh_response_summaries(Ticket.objects.filter(pk__in=[ticket.pk for ticket in tickets]))
+            created += size
+        self.log(f"Tạo {created} ticket và {responses} phản hồi.")
+
+    # ===== 6. Hoàn tất: bộ đếm, chỉ mục, cache =====
+    def finalize(self, skip_indexes):
+        ensure_agent_profiles()
+        recount_open_tickets()
+        bump_catalog_version()
+        if skip_indexes:
+            self.log("Bỏ qua dựng lại chỉ mục tìm kiếm / MinHash (--skip-indexes).")
+            return
+        for command in ('rebuild_user_search_index', 'rebuild_service_search_index',
+                        'rebuild_ticket_search_index', 'rebuild_ticket_signatures'):
+            call_command(command, stdout=self.stdout)
+            self.log(f"Đã chạy {command}.")
+
+    def purge(self, batch_size):
+        """
+        Xóa dữ liệu giả lập (đơn, ticket, tài khoản, phòng, dịch vụ) theo dấu nhận biết.
+        Đơn đặt phòng và ticket (hàng triệu dòng) được xóa theo từng khoảng pk bằng câu DELETE
+        trên cả tập (_raw_delete), không qua Collector/signal: bảng trung gian, chứng từ thanh toán,
+        phản hồi, chỉ mục tìm kiếm và MinHash được dọn tường minh; bộ đếm ticket tính lại 1 lần ở cuối.
+        """
+        synthetic_types = RoomType.objects.filter(description__startswith=SYNTHETIC_MARK)
+        deleted = {
+            'đơn đặt phòng': self.purge_in_batches(
+                Booking.objects.filter(room_class__room_type__in=synthetic_types), self.purge_bookings, batch_size,
+            ),
+            'ticket': self.purge_in_batches(
+                Ticket.objects.filter(
+                    Q(customer__username__startswith=SYNTHETIC_USERNAME_PREFIX)
+                    | Q(guest_email__endswith=f"@{SYNTHETIC_EMAIL_DOMAIN}")
+                ),
+                self.purge_tickets, batch_size,
+            ),
+            # Vài chục nghìn tài khoản: xóa qua ORM theo lô để signal dọn chỉ mục người dùng và các bản ghi liên quan
+            'tài khoản': self.purge_in_batches(
+                CustomUser.objects.filter(username__startswith=SYNTHETIC_USERNAME_PREFIX),
+                lambda ids: CustomUser.objects.filter(pk__in=ids).delete()[0], batch_size,
+            ),
+            'loại phòng': synthetic_types.delete()[0],
+            'loại dịch vụ': ServiceCategory.objects.filter(description__startswith=SYNTHETIC_MARK).delete()[0],
+        }
+        recount_open_tickets()
+        bump_catalog_version()
+        summary = ", ".join(f"{label}: {total}" for label, total in deleted.items())
+        self.stdout.write(self.style.SUCCESS(f"Đã xóa dữ liệu giả lập (số bản ghi kể cả bản ghi liên quan) - {summary}."))
+
+    def purge_in_batches(self, queryset, delete_batch, batch_size):
+        """
+        Duyệt queryset theo khoảng pk tăng dần (mỗi khoảng batch_size id, 1 transaction),
+        gọi delete_batch(danh sách pk) cho các pk khớp trong khoảng. Trả về tổng số bản ghi đã xóa.
+        """
+        bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            return 0
+        total = 0
+        for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+            with transaction.atomic():
+                ids = list(queryset.filter(pk__gte=start, pk__lt=start + batch_size).values_list('pk', flat=True))
+                if ids:
+                    total += delete_batch(ids)
+        return total
+
+    def purge_bookings(self, ids):
+        proofs = PaymentProof.objects.filter(booking_id__in=ids)
+        # Chứng từ chỉ có khi benchmark tải lên mà chưa dọn: xóa cả file như lúc dọn benchmark
+        for proof in proofs:
+            proof.image.delete(save=False)
+        count = Booking.additional_services.through.objects.filter(booking_id__in=ids)._raw_delete(DEFAULT_DB_ALIAS)
+        count += proofs._raw_delete(DEFAULT_DB_ALIAS)
+        return count + Booking.objects.filter(pk__in=ids)._raw_delete(DEFAULT_DB_ALIAS)
+
+    def purge_tickets(self, ids):
+        # Ticket thật có thể trỏ tới ticket giả lập (nghi trùng / đã gộp): SET_NULL như on_delete
+        Ticket.objects.filter(possible_duplicate_of__in=ids).update(possible_duplicate_of=None)
+        Ticket.objects.filter(merged_into__in=ids).update(merged_into=None)
+        remove_tickets(ids)
+        count = 0
+        for model in (TicketResponse, TicketLshBucket, TicketSignature):
+            count += model.objects.filter(ticket_id__in=ids)._raw_delete(DEFAULT_DB_ALIAS)
+        return count + Ticket.objects.filter(pk__in=ids)._raw_delete(DEFAULT_DB_ALIAS)
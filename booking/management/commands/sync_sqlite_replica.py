@@ -0,0 +1,51 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from fivitel_core.replica import REPLICA_DB_ALIAS
+
+SQLITE_ENGINE = 'django.db.backends.sqlite3'
+
+
+class Command(BaseCommand):
+    help = (
+        "Chép CSDL SQLite chính sang file bản sao (alias 'replica') bằng SQLite online backup, "
+        "để thử định tuyến đọc dashboard/báo cáo sang bản sao khi phát triển. "
+        "Dùng --interval để chạy liên tục, mô phỏng replica có độ trễ."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help="Số giây giữa hai lần đồng bộ; 0 (mặc định) = chỉ đồng bộ một lần.",
+        )
+
+    def handle(self, *args, **options):
+        if REPLICA_DB_ALIAS not in settings.DATABASES:
+            raise CommandError("Chưa cấu hình bản sao: đặt REPLICA_DATABASE_URL=sqlite:///db.replica.sqlite3.")
+        source = settings.DATABASES['default']
+        replica = settings.DATABASES[REPLICA_DB_ALIAS]
+        if source['ENGINE'] != SQLITE_ENGINE or replica['ENGINE'] != SQLITE_ENGINE:
+            raise CommandError("Lệnh này chỉ dành cho SQLite; với PostgreSQL hãy dùng streaming replication.")
+        if str(source['NAME']) == str(replica['NAME']):
+            raise CommandError("Bản sao phải là một file khác với CSDL chính.")
+
+        while True:
+            started = time.perf_counter()
+            self.copy_database(str(source['NAME']), str(replica['NAME']))
+            self.stdout.write(f"Đã đồng bộ bản sao {replica['NAME']} ({(time.perf_counter() - started) * 1000:.0f}ms).")
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def copy_database(self, source_path, replica_path):
+        """Backup API chép một ảnh nhất quán của CSDL chính, kể cả khi đang có giao dịch ghi (WAL)."""
+        source = sqlite3.connect(source_path, timeout=20)
+        replica = sqlite3.connect(replica_path, timeout=20)
+        try:
+            source.backup(replica)
+        finally:
+            replica.close()
+            source.close()
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0013_roomclass_max_occupancy'),
+        ('services', '0005_service_highlights_service_price_unit_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['room_class', 'check_in_date'], name='booking_class_checkin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['assigned_room', 'check_in_date'], name='booking_room_checkin_idx'),
+        ),
+    ]
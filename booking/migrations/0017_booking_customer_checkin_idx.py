@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0016_booking_checkin_idx'),
+        ('services', '0005_service_highlights_service_price_unit_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['customer', 'check_in_date'], name='booking_customer_checkin_idx'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:40
+
+from django.db import migrations, models
+
+
+def forwards_split_amenities(apps, schema_editor):
+    """Tách chuỗi tiện ích cũ (cách nhau bởi dấu phẩy) thành các bản ghi Amenity."""
+    RoomClass = apps.get_model('booking', 'RoomClass')
+    Amenity = apps.get_model('booking', 'Amenity')
+
+    amenity_by_key = {}
+    for room_class in RoomClass.objects.all():
+        names = []
+        for name in (room_class.amenities_text or '').split(','):
+            name = name.strip()
+            if name and name.lower() not in [n.lower() for n in names]:
+                names.append(name)
+
+        for name in names:
+            amenity = amenity_by_key.get(name.lower())
+            if amenity is None:
+                amenity, _ = Amenity.objects.get_or_create(name=name)
+                amenity_by_key[name.lower()] = amenity
+            room_class.amenities.add(amenity)
+
+
+def backwards_join_amenities(apps, schema_editor):
+    """Ghép lại các tiện ích thành chuỗi cách nhau bởi dấu phẩy."""
+    RoomClass = apps.get_model('booking', 'RoomClass')
+    for room_class in RoomClass.objects.prefetch_related('amenities'):
+        room_class.amenities_text = ', '.join(amenity.name for amenity in room_class.amenities.all())
+        room_class.save(update_fields=['amenities_text'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0017_booking_customer_checkin_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Amenity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Tên tiện ích')),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.RenameField(
+            model_name='roomclass',
+            old_name='amenities',
+            new_name='amenities_text',
+        ),
+        migrations.AlterField(
+            model_name='roomclass',
+            name='amenities_text',
+            field=models.TextField(blank=True, default='', verbose_name='Tiện ích', help_text='Mỗi tiện ích cách nhau bởi dấu phẩy'),
+        ),
+        migrations.AddField(
+            model_name='roomclass',
+            name='amenities',
+            field=models.ManyToManyField(blank=True, related_name='room_classes', to='booking.amenity', verbose_name='Tiện ích'),
+        ),
+        migrations.RunPython(forwards_split_amenities, backwards_join_amenities),
+        migrations.RemoveField(
+            model_name='roomclass',
+            name='amenities_text',
+        ),
+    ]
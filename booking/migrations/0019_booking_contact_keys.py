@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:09
+
+from django.db import migrations, models
+
+from users.identity import normalize_email_key, normalize_phone_key
+
+
+def fill_contact_keys(apps, schema_editor):
+    # Tính khóa nhận diện cho dữ liệu cũ theo lô (xem users/identity.py)
+    Booking = apps.get_model('booking', 'Booking')
+    rows = Booking.objects.exclude(guest_email='', guest_phone_number='').only('pk', 'guest_email', 'guest_phone_number')
+    batch = []
+    for row in rows.iterator(chunk_size=1000):
+        row.email_key = normalize_email_key(row.guest_email)
+        row.phone_key = normalize_phone_key(row.guest_phone_number)
+        batch.append(row)
+        if len(batch) >= 1000:
+            Booking.objects.bulk_update(batch, ['email_key', 'phone_key'])
+            batch = []
+    if batch:
+        Booking.objects.bulk_update(batch, ['email_key', 'phone_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0018_amenity_normalize_roomclass_amenities'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='email_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=254),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='phone_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20),
+        ),
+        migrations.RunPython(fill_contact_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:57
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+
+def merge_case_variants(apps, schema_editor):
+    """Gộp các tiện ích chỉ khác nhau về hoa thường vào bản ghi cũ nhất trước khi thêm ràng buộc."""
+    Amenity = apps.get_model('booking', 'Amenity')
+    Through = apps.get_model('booking', 'RoomClass').amenities.through
+
+    keeper_by_key = {}
+    for amenity in Amenity.objects.annotate(name_key=Lower('name')).order_by('pk'):
+        keeper = keeper_by_key.setdefault(amenity.name_key, amenity)
+        if keeper.pk == amenity.pk:
+            continue
+        linked = set(Through.objects.filter(amenity_id=keeper.pk).values_list('roomclass_id', flat=True))
+        Through.objects.bulk_create([
+            Through(roomclass_id=roomclass_id, amenity_id=keeper.pk)
+            for roomclass_id in Through.objects.filter(amenity_id=amenity.pk).values_list('roomclass_id', flat=True)
+            if roomclass_id not in linked
+        ])
+        amenity.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0020_booking_created_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_case_variants, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='amenity',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), name='amenity_name_ci_unique', violation_error_message='Tiện ích này đã tồn tại (không phân biệt hoa thường).'),
+        ),
+    ]
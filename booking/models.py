@@ -1,6 +1,8 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.conf import settings
 from services.models import Service
+from users.identity import apply_contact_keys
 from django_countries.fields import CountryField
 from django.utils import timezone
 from datetime import timedelta
@@ -21,6 +23,61 @@ class RoomType(models.Model):
     def __str__(self):
         return self.name
 
+class Amenity(models.Model):
+    """
+    Tiện ích của hạng phòng (VD: Wifi, Bồn tắm), dùng chung cho nhiều hạng phòng
+    và dùng làm bộ lọc khi tìm phòng.
+    """
+    name = models.CharField(max_length=100, unique=True, verbose_name="Tên tiện ích")
+
+    class Meta:
+        ordering = ['name']
+        constraints = [
+            # "Wifi" và "wifi" là cùng một tiện ích
+            models.UniqueConstraint(
+                Lower('name'), name='amenity_name_ci_unique',
+                violation_error_message="Tiện ích này đã tồn tại (không phân biệt hoa thường).",
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    @staticmethod
+    def parse_names(raw_text):
+        """Tách chuỗi tiện ích cách nhau bởi dấu phẩy, bỏ trùng lặp (không phân biệt hoa thường)."""
+        names = []
+        seen = set()
+        for name in raw_text.split(','):
+            name = name.strip()
+            if name and name.lower() not in seen:
+                seen.add(name.lower())
+                names.append(name)
+        return names
+
+    @classmethod
+    def get_or_create_many(cls, names):
+        """
+        Lấy các tiện ích theo tên không phân biệt hoa thường (khớp trên Lower('name') như ràng buộc
+        amenity_name_ci_unique), tạo mới (bulk_create) những tiện ích chưa có.
+        Tên nhập là biến thể hoa thường của tiện ích đã có thì trả về bản ghi đã có.
+        """
+        def fetch():
+            # name__in giữ khớp chính xác cả khi LOWER() của CSDL chỉ xử lý ký tự ASCII (SQLite)
+            found = {}
+            for amenity in cls.objects.annotate(name_key=Lower('name')).filter(
+                models.Q(name__in=names) | models.Q(name_key__in=[name.lower() for name in names])
+            ).order_by('pk'):
+                found.setdefault(amenity.name.lower(), amenity)
+            return found
+
+        existing = fetch()
+        missing = [cls(name=name) for name in names if name.lower() not in existing]
+        if missing:
+            cls.objects.bulk_create(missing, ignore_conflicts=True)
+            existing = fetch()
+        return [existing[name.lower()] for name in names if name.lower() in existing]
+
 class RoomClass(models.Model):
     """C
     ác hạng phòng cụ thể trong một Loại phòng (VD: Deluxe Hướng Vườn).
@@ -30,7 +87,7 @@ class RoomClass(models.Model):
     description = models.TextField(verbose_name="Mô tả chi tiết")
     base_price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Giá cơ bản/đêm")
     area = models.CharField(max_length=50, verbose_name="Diện tích")
-    amenities = models.TextField(verbose_name="Tiện ích", help_text="Mỗi tiện ích cách nhau bởi dấu phẩy")
+    amenities = models.ManyToManyField(Amenity, blank=True, related_name='room_classes', verbose_name="Tiện ích")
     image = models.ImageField(upload_to='media/room_classes/', blank=True, null=True, verbose_name="Ảnh hạng phòng")
     max_occupancy = models.PositiveIntegerField(
         default=2, 
@@ -54,6 +111,8 @@ class Room(models.Model):
     room_class = models.ForeignKey(RoomClass, on_delete=models.CASCADE, related_name='rooms', verbose_name="Thuộc hạng phòng")
     room_number = models.CharField(max_length=10, unique=True, verbose_name="Số phòng")
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.AVAILABLE, verbose_name="Trạng thái phòng")
+    # Mốc thời gian thay đổi cuối, dùng làm con trỏ cho luồng cập nhật trực tiếp (SSE)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.room_number
@@ -91,6 +150,9 @@ class Booking(models.Model):
     guest_email = models.EmailField(blank=True)
     guest_phone_number = models.CharField(max_length=20, blank=True)
     guest_nationality = CountryField(blank=True, verbose_name="Quốc tịch khách vãng lai")
+    # Email / SĐT đã chuẩn hóa để ghép lịch sử khách hàng (xem users/identity.py)
+    email_key = models.CharField(max_length=254, blank=True, db_index=True, editable=False)
+    phone_key = models.CharField(max_length=20, blank=True, db_index=True, editable=False)
 
     check_in_date = models.DateField()
     check_out_date = models.DateField()
@@ -122,6 +184,25 @@ class Booking(models.Model):
         null=True, blank=True, 
         verbose_name="Thời điểm tải chứng từ"
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Phục vụ tra cứu "khách đến tiếp theo" theo hạng phòng / phòng đã gán
+            models.Index(fields=['room_class', 'check_in_date'], name='booking_class_checkin_idx'),
+            models.Index(fields=['assigned_room', 'check_in_date'], name='booking_room_checkin_idx'),
+            # Sắp xếp / điều hướng theo ngày nhận phòng trong admin
+            models.Index(fields=['check_in_date'], name='booking_checkin_idx'),
+            # Lịch sử đặt phòng của khách hàng (trang "Đơn đặt phòng của tôi")
+            models.Index(fields=['customer', 'check_in_date'], name='booking_customer_checkin_idx'),
+            # Phân trang keyset trang quản lý đơn của Lễ tân (tất cả / lọc theo trạng thái)
+            models.Index(fields=['-created_at', '-id'], name='booking_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='booking_status_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        kwargs['update_fields'] = apply_contact_keys(self, kwargs.get('update_fields'))
+        super().save(*args, **kwargs)
 
     @property
     def is_cancellable(self):
@@ -0,0 +1,9 @@
+from django.db.models.signals import post_save, post_delete
+
+from services.catalog import catalog_changed
+from .models import RoomType, RoomClass
+
+# Loại phòng / hạng phòng thuộc danh mục công khai (trang chủ, danh sách phòng)
+for model in (RoomType, RoomClass):
+    post_save.connect(catalog_changed, sender=model, dispatch_uid=f'catalog_save_{model.__name__}')
+    post_delete.connect(catalog_changed, sender=model, dispatch_uid=f'catalog_delete_{model.__name__}')
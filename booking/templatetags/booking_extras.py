@@ -1,6 +1,11 @@
 from django import template
+from django.contrib.admin.templatetags.admin_list import date_hierarchy
+from django.core.cache import cache
 register = template.Library()
 
+# Thời gian giữ kết quả thanh điều hướng ngày trong admin (giây)
+DATE_HIERARCHY_CACHE_TIMEOUT = 600
+
 @register.filter
 def sub(value, arg):
     """
@@ -19,4 +24,22 @@ def add_attr(field, css):
     attrs = {}
     key, val = css.split(':')
     attrs[key] = val
-    return field.as_widget(attrs=attrs)
\ No newline at end of file
+    return field.as_widget(attrs=attrs)
+
+@register.inclusion_tag('admin/date_hierarchy.html')
+def cached_date_hierarchy(cl):
+    """
+    Phiên bản có cache của thẻ {% date_hierarchy %} trong admin.
+    Thẻ gốc chạy MIN/MAX và SELECT DISTINCT theo ngày trên toàn bảng ở mỗi lần tải trang;
+    ở đây kết quả được lưu theo model + bộ lọc hiện tại.
+    """
+    if not cl.date_hierarchy:
+        return {}
+    cache_key = 'admin_date_hierarchy:%s:%s:%s' % (
+        cl.opts.label_lower, cl.date_hierarchy, cl.get_query_string()
+    )
+    result = cache.get(cache_key)
+    if result is None:
+        result = date_hierarchy(cl)
+        cache.set(cache_key, result, DATE_HIERARCHY_CACHE_TIMEOUT)
+    return result
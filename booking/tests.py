@@ -1,3 +1,210 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from pathlib import Path
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.urls import re_path, reverse
+from django.utils import timezone
+
+from fivitel_core.downloads import public_media
+from users.models import CustomUser
+from .models import Amenity, Booking, Room, RoomClass, RoomType
+from .views import BOOKINGS_PER_PAGE, normalized_room_search_query
+
+# Route media chỉ được đăng ký khi DEBUG (test luôn chạy với DEBUG=False): dùng lại đúng route của fivitel_core/urls.py
+urlpatterns = [
+    re_path(r'^(?P<path>media/.+)$', public_media),
+]
+
+
+# ==============================================================================
+# TIỆN ÍCH HẠNG PHÒNG (booking/models.py: Amenity)
+# ==============================================================================
+class AmenityTests(TestCase):
+
+    def test_case_variants_reuse_existing_amenity(self):
+        wifi = Amenity.objects.create(name='Wifi')
+        amenities = Amenity.get_or_create_many(['WIFI', 'Bồn tắm', 'wifi'])
+        self.assertEqual(amenities[0], wifi)
+        self.assertEqual(amenities[2], wifi)
+        self.assertEqual(sorted(Amenity.objects.values_list('name', flat=True)), ['Bồn tắm', 'Wifi'])
+
+    def test_exact_non_ascii_name_is_reused(self):
+        amenity = Amenity.objects.create(name='Điều hòa')
+        self.assertEqual(Amenity.get_or_create_many(['Điều hòa']), [amenity])
+        self.assertEqual(Amenity.objects.count(), 1)
+
+    def test_case_variant_is_rejected_by_database(self):
+        Amenity.objects.create(name='Wifi')
+        with self.assertRaises(IntegrityError):
+            Amenity.objects.create(name='wifi')
+
+
+# ==============================================================================
+# DANH SÁCH LOẠI PHÒNG (booking/views.py: room_type_list_view)
+# ==============================================================================
+class RoomTypeListTests(TestCase):
+
+    def test_search_query_is_normalized(self):
+        query = normalized_room_search_query(
+            QueryDict('utm_source=ads&children=01&adults=2&check_out=2030-01-05&check_in=2030-01-03')
+        )
+        self.assertEqual(query, 'check_in=2030-01-03&check_out=2030-01-05&adults=2&children=1')
+
+    def test_invalid_values_are_dropped(self):
+        for raw in ['check_in=2030-01-05&check_out=2030-01-03', 'check_in=x&check_out=y', 'adults=0', 'adults=999', 'children=-1']:
+            with self.subTest(raw=raw):
+                self.assertEqual(normalized_room_search_query(QueryDict(raw)), '')
+
+    def test_links_carry_normalized_query(self):
+        room_type = RoomType.objects.create(name='Deluxe')
+        response = self.client.get(reverse('room_type_list_view'), {'adults': '2', 'x': '<script>'})
+        self.assertContains(response, f'href="{reverse("room_class_list", args=[room_type.pk])}?adults=2"')
+        self.assertNotContains(response, 'x=')
+
+
+# ==============================================================================
+# PHỤC VỤ MEDIA CÔNG KHAI KHI DEBUG (fivitel_core/downloads.py: public_media)
+# ==============================================================================
+class PublicMediaTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = Path(tempfile.mkdtemp())
+        (cls.root / 'media' / 'room_images').mkdir(parents=True)
+        (cls.root / 'media' / 'payment_proofs').mkdir(parents=True)
+        (cls.root / 'media' / 'room_images' / 'room.jpg').write_bytes(b'public image')
+        (cls.root / 'media' / 'payment_proofs' / 'proof.jpg').write_bytes(b'private proof')
+        (cls.root / 'manage.py').write_text('secret source')
+        cls.settings_override = override_settings(MEDIA_ROOT=cls.root, ROOT_URLCONF=__name__)
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.root)
+        super().tearDownClass()
+
+    def get_content(self, path):
+        response = self.client.get(path)
+        return response.status_code, b''.join(response.streaming_content) if response.streaming else b''
+
+    def test_serves_public_media(self):
+        self.assertEqual(self.get_content('/media/room_images/room.jpg'), (200, b'public image'))
+
+    def test_normalized_public_path_is_served(self):
+        self.assertEqual(self.get_content('/media/x/../room_images/room.jpg'), (200, b'public image'))
+
+    def test_rejects_paths_outside_media(self):
+        for path in ['/media/../manage.py', '/media/x/../../manage.py', '/media/room_images/../../manage.py']:
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 404)
+
+    def test_rejects_protected_folders(self):
+        for path in [
+            '/media/payment_proofs/proof.jpg',
+            '/media//payment_proofs/proof.jpg',
+            '/media/./payment_proofs/proof.jpg',
+            '/media/room_images/../payment_proofs/proof.jpg',
+        ]:
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 404)
+
+
+# ==============================================================================
+# GIỚI HẠN TẦN SUẤT CHECKOUT (booking/views.py: checkout_view)
+# ==============================================================================
+@override_settings(RATE_LIMITS={'checkout': [('user', '1/h')]})
+class CheckoutRateLimitTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        room_type = RoomType.objects.create(name='Deluxe')
+        self.room_class = RoomClass.objects.create(
+            room_type=room_type, name='Deluxe hướng biển', description='Phòng hướng biển',
+            base_price=1_000_000, area='30m2', max_occupancy=2,
+        )
+        Room.objects.create(room_class=self.room_class, room_number='301')
+        Room.objects.create(room_class=self.room_class, room_number='302')
+        self.customer = CustomUser.objects.create_user(
+            username='khach', email='khach@example.com', phone_number='0901234567', password='x',
+        )
+        self.client.force_login(self.customer)
+
+    def start_checkout(self, days_ahead):
+        check_in = timezone.localdate() + timedelta(days=days_ahead)
+        session = self.client.session
+        session['booking_options'] = {
+            'room_class_id': self.room_class.pk,
+            'check_in': check_in.isoformat(), 'check_out': (check_in + timedelta(days=2)).isoformat(),
+            'adults': 1, 'children': 0, 'service_ids': [],
+        }
+        session.save()
+
+    def test_invalid_submissions_are_not_counted(self):
+        self.start_checkout(30)
+        for _ in range(3):
+            # Thiếu phương thức thanh toán: form lỗi, hiển thị lại trang
+            self.assertEqual(self.client.post(reverse('checkout'), {'booking_for': 'SELF'}).status_code, 200)
+        valid = {'booking_for': 'SELF', 'payment_method': 'BANK_TRANSFER'}
+        self.assertEqual(self.client.post(reverse('checkout'), valid).status_code, 302)
+        self.assertEqual(Booking.objects.filter(customer=self.customer).count(), 1)
+
+        self.start_checkout(40)
+        self.assertEqual(self.client.post(reverse('checkout'), valid).status_code, 429)
+        self.assertEqual(Booking.objects.filter(customer=self.customer).count(), 1)
+
+
+# ==============================================================================
+# TRANG QUẢN LÝ ĐƠN CỦA LỄ TÂN (booking/views.py: manage_bookings_view)
+# ==============================================================================
+class ManageBookingsPaginationTests(TestCase):
+
+    def setUp(self):
+        room_type = RoomType.objects.create(name='Deluxe')
+        room_class = RoomClass.objects.create(
+            room_type=room_type, name='Deluxe hướng biển', description='Phòng hướng biển',
+            base_price=1_000_000, area='30m2', max_occupancy=2,
+        )
+        check_in = timezone.localdate() + timedelta(days=10)
+        Booking.objects.bulk_create([
+            Booking(
+                room_class=room_class, guest_full_name=f'Khách {i}', check_in_date=check_in,
+                check_out_date=check_in + timedelta(days=1), total_price=1_000_000,
+                status=Booking.Status.CANCELLED if i % 10 == 0 else Booking.Status.PENDING_REVIEW,
+            )
+            for i in range(BOOKINGS_PER_PAGE + 10)
+        ])
+        # Nhiều đơn trùng created_at: thứ tự phải được phân định bằng id
+        Booking.objects.update(created_at=timezone.now())
+        staff = CustomUser.objects.create_user(
+            username='letan', email='letan@example.com', phone_number='0901000003', password='x',
+            role=CustomUser.Role.RECEPTION, is_staff=True,
+        )
+        self.client.force_login(staff)
+
+    def test_pages_cover_every_booking_once(self):
+        url = reverse('manage_bookings')
+        first = self.client.get(url)
+        self.assertEqual(len(first.context['bookings']), BOOKINGS_PER_PAGE)
+        self.assertIsNone(first.context['newer_cursor'])
+
+        second = self.client.get(url, {'after': first.context['older_cursor']})
+        self.assertEqual(len(second.context['bookings']), 10)
+        self.assertIsNone(second.context['older_cursor'])
+        seen = [b.pk for b in first.context['bookings']] + [b.pk for b in second.context['bookings']]
+        self.assertEqual(seen, list(Booking.objects.order_by('-created_at', '-pk').values_list('pk', flat=True)))
+
+        back = self.client.get(url, {'before': second.context['newer_cursor']})
+        self.assertEqual([b.pk for b in back.context['bookings']], [b.pk for b in first.context['bookings']])
+
+    def test_status_filter_is_paginated(self):
+        response = self.client.get(reverse('manage_bookings'), {'status': 'CANCELLED_ALL'})
+        self.assertEqual(len(response.context['bookings']), 6)
+        self.assertIsNone(response.context['older_cursor'])
+        self.assertTrue(all(b.status == Booking.Status.CANCELLED for b in response.context['bookings']))
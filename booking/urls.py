@@ -5,6 +5,7 @@ urlpatterns = [
     # --- URLS CHUNG & CHO KHÁCH HÀNG ---
     path('', views.room_type_list_view, name='room_type_list_view'),
     path('<int:room_type_id>/', views.room_class_list_view, name='room_class_list'),
+    path('search/', views.room_search_view, name='room_search'),
     path('options/<int:room_class_id>/', views.booking_options_view, name='booking_options'),
     path('checkout/', views.checkout_view, name='checkout'),
 
@@ -14,6 +15,7 @@ urlpatterns = [
     path('my-bookings/<int:pk>/cancel/', views.cancel_booking_view, name='cancel_booking'),
     path('my-bookings/<int:pk>/edit/', views.edit_booking_view, name='edit_booking'),
     path('payment/<int:booking_pk>/', views.payment_guidance_view, name='payment_guidance'),
+    path('payment/<int:booking_pk>/proof/', views.payment_proof_file_view, name='payment_proof_file'),
 
     # --- URLS DÀNH RIÊNG CHO KHÁCH VÃNG LAI (SỬ DỤNG UUID) ---
     path('guest/booking/<uuid:booking_code>/', views.guest_booking_detail_view, name='guest_booking_detail'),
@@ -1,17 +1,28 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone
-from django.db import transaction
-from django.db.models import Count, Q
+from django.db.models import Count, Q, F, OuterRef, Subquery, Case, When, Value, CharField
+from django.db.models.functions import Coalesce, Least
 from django.contrib.auth.decorators import login_required,  user_passes_test
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages
+from django.core.paginator import Paginator
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 
-from .models import RoomType, RoomClass, Room, Service, PaymentProof, Booking
+from .models import Amenity, RoomType, RoomClass, Room, PaymentProof, Booking
 from services.models import ServiceCategory
-from .forms import BookingOptionsForm, CheckoutForm, PaymentProofForm, BookingEditForm
+from services.catalog import catalog_cache_context, get_catalog_snapshot
+from fivitel_core.downloads import protected_file_response
+from fivitel_core.paginators import paginate_by_keyset
+from fivitel_core.ratelimit import check_rate_limits, rate_limited_response
+from fivitel_core.replica import read_from_replica
+from fivitel_core.sse import format_sse_event, sse_response
+from .checkout import place_booking
+from .forms import BookingOptionsForm, CheckoutForm, PaymentProofForm, BookingEditForm, RoomClassForm
 from datetime import timedelta, datetime
+from urllib.parse import urlencode
 
 # ==============================================================================
 # PHẦN 1: CÁC VIEW CÔNG KHAI (PUBLIC VIEWS)
@@ -27,12 +38,37 @@ def homepage(request):
     # Lấy tối đa 4 loại dịch vụ đầu tiên có trường 'image' không rỗng
     featured_service_categories = ServiceCategory.objects.exclude(image__isnull=True).exclude(image='').order_by('id')[:4]
 
+    # QuerySet chỉ được thực thi khi fragment trong template chưa có trong cache
     context = {
         'featured_room_types': featured_room_types,
         'featured_service_categories': featured_service_categories,
+        **catalog_cache_context(),
     }
     return render(request, 'homepage.html', context)
 
+# Số khách tối đa được giữ lại trong điều kiện tìm phòng chuyển tiếp giữa các trang
+MAX_SEARCH_GUESTS = 20
+
+def normalized_room_search_query(params):
+    """
+    Chuẩn hóa điều kiện tìm phòng mà trang danh sách hạng phòng sử dụng (check_in, check_out,
+    adults, children) thành query string cố định thứ tự; bỏ tham số lạ và giá trị không hợp lệ.
+    Dùng làm một phần khóa cache fragment nên số biến thể chỉ tăng theo các tìm kiếm hợp lệ.
+    """
+    query = {}
+    try:
+        check_in = datetime.strptime(params.get('check_in', ''), '%Y-%m-%d').date()
+        check_out = datetime.strptime(params.get('check_out', ''), '%Y-%m-%d').date()
+        if check_in < check_out:
+            query.update(check_in=check_in.isoformat(), check_out=check_out.isoformat())
+    except ValueError:
+        pass
+    for name, minimum in (('adults', 1), ('children', 0)):
+        value = params.get(name, '')
+        if value.isdigit() and minimum <= int(value) <= MAX_SEARCH_GUESTS:
+            query[name] = int(value)
+    return urlencode(query)
+
 def room_type_list_view(request):
     """
     Hiển thị danh sách các LOẠI PHÒNG (RoomType) có trong khách sạn.
@@ -40,7 +76,9 @@ def room_type_list_view(request):
     """
     room_types = RoomType.objects.all()
     context = {
-        'room_types': room_types
+        'room_types': room_types,
+        'search_query': normalized_room_search_query(request.GET),
+        **catalog_cache_context(),
     }
     return render(request, 'booking/room_type_list.html', context)
 
@@ -101,9 +139,8 @@ def room_class_list_view(request, room_type_id):
             available_rooms_count=Count('rooms', filter=Q(rooms__status='AVAILABLE'))
         )
 
-    # Xử lý chuỗi tiện ích (Giữ nguyên)
-    for r_class in room_classes:
-        r_class.amenities_list = [amenity.strip() for amenity in r_class.amenities.split(',')]
+    # Tải trước tiện ích của tất cả hạng phòng trong 1 truy vấn
+    room_classes = room_classes.prefetch_related('amenities')
 
     context = {
         'room_type': room_type,
@@ -111,6 +148,102 @@ def room_class_list_view(request, room_type_id):
     }
     return render(request, 'booking/room_class_list.html', context)
 
+# Các khoảng giá dùng cho bộ lọc tìm phòng: (mã, nhãn, giá từ, giá đến)
+ROOM_PRICE_BANDS = [
+    ('under-1m', 'Dưới 1 triệu', None, 1000000),
+    ('1m-2m', '1 - 2 triệu', 1000000, 2000000),
+    ('2m-3m', '2 - 3 triệu', 2000000, 3000000),
+    ('over-3m', 'Trên 3 triệu', 3000000, None),
+]
+
+def _price_band_filter(band_key):
+    """Điều kiện Q cho một khoảng giá (cận dưới bao gồm, cận trên không bao gồm)."""
+    for key, _label, low, high in ROOM_PRICE_BANDS:
+        if key == band_key:
+            condition = Q()
+            if low is not None:
+                condition &= Q(base_price__gte=low)
+            if high is not None:
+                condition &= Q(base_price__lt=high)
+            return condition
+    return Q()
+
+def room_search_view(request):
+    """
+    Tìm hạng phòng theo tiện ích, khoảng giá và số khách, kèm số lượng (facet) cho từng lựa chọn.
+    - Tiện ích: chọn nhiều, hạng phòng phải có ĐỦ các tiện ích đã chọn.
+    - Số lượng của mỗi nhóm bộ lọc được đếm bằng truy vấn GROUP BY,
+      áp dụng các bộ lọc của những nhóm còn lại (để người dùng thấy đổi lựa chọn sẽ ra bao nhiêu kết quả).
+    """
+    amenity_ids = sorted({int(value) for value in request.GET.getlist('amenity') if value.isdigit()})
+    price_band = request.GET.get('price', '')
+    if price_band not in [band[0] for band in ROOM_PRICE_BANDS]:
+        price_band = ''
+    guests_raw = request.GET.get('guests', '')
+    guests = int(guests_raw) if guests_raw.isdigit() else 0
+
+    def apply_filters(queryset, skip=None):
+        if amenity_ids and skip != 'amenity':
+            # Hạng phòng có đủ tất cả tiện ích đã chọn (GROUP BY ... HAVING COUNT = số tiện ích)
+            matching_ids = RoomClass.amenities.through.objects.filter(
+                amenity_id__in=amenity_ids
+            ).values('roomclass_id').annotate(
+                matched=Count('amenity_id')
+            ).filter(matched=len(amenity_ids)).values('roomclass_id')
+            queryset = queryset.filter(pk__in=matching_ids)
+        if price_band and skip != 'price':
+            queryset = queryset.filter(_price_band_filter(price_band))
+        if guests and skip != 'guests':
+            queryset = queryset.filter(max_occupancy__gte=guests)
+        return queryset
+
+    all_classes = RoomClass.objects.all()
+    results = apply_filters(all_classes).select_related('room_type').prefetch_related('amenities').order_by('base_price')
+
+    # 1. Facet tiện ích: số hạng phòng trong kết quả hiện tại có thêm tiện ích đó
+    amenity_facets = Amenity.objects.filter(
+        room_classes__in=apply_filters(all_classes)
+    ).annotate(result_count=Count('room_classes')).order_by('name')
+
+    # 2. Facet khoảng giá: gán nhãn khoảng giá bằng CASE rồi GROUP BY
+    price_band_case = Case(
+        *[When(_price_band_filter(key), then=Value(key)) for key, _label, _low, _high in ROOM_PRICE_BANDS],
+        output_field=CharField(),
+    )
+    price_counts = dict(
+        apply_filters(all_classes, skip='price').annotate(
+            price_band=price_band_case
+        ).values('price_band').annotate(
+            result_count=Count('id')
+        ).values_list('price_band', 'result_count')
+    )
+    price_facets = [
+        (key, label, price_counts.get(key, 0)) for key, label, _low, _high in ROOM_PRICE_BANDS
+    ]
+
+    # 3. Facet sức chứa: đếm theo từng mức max_occupancy, "từ N khách" = cộng dồn các mức >= N
+    occupancy_counts = list(
+        apply_filters(all_classes, skip='guests').values('max_occupancy').annotate(
+            result_count=Count('id')
+        ).order_by('max_occupancy').values_list('max_occupancy', 'result_count')
+    )
+    occupancy_facets = []
+    remaining = sum(count for _occupancy, count in occupancy_counts)
+    for occupancy, count in occupancy_counts:
+        occupancy_facets.append((occupancy, remaining))
+        remaining -= count
+
+    context = {
+        'room_classes': results,
+        'amenity_facets': amenity_facets,
+        'price_facets': price_facets,
+        'occupancy_facets': occupancy_facets,
+        'selected_amenities': amenity_ids,
+        'selected_price': price_band,
+        'selected_guests': guests,
+    }
+    return render(request, 'booking/room_search.html', context)
+
 def booking_options_view(request, room_class_id):
     """
     Xử lý Bước 1: Trang Tùy chọn Đặt phòng.
@@ -137,7 +270,7 @@ def booking_options_view(request, room_class_id):
                 'check_out': options['check_out_date'].isoformat(),
                 'adults': options['adults'],
                 'children': options['children'],
-                'service_ids': [service.id for service in options['additional_services']],
+                'service_ids': list(options['additional_services']),
             }
             return redirect('checkout') # Chuyển đến trang checkout
     else:
@@ -163,7 +296,12 @@ def checkout_view(request):
 
     # Lấy thông tin cần thiết từ session
     room_class = get_object_or_404(RoomClass, pk=booking_options.get('room_class_id'))
-    selected_services = Service.objects.filter(id__in=booking_options.get('service_ids', []))
+    # Lấy dịch vụ và giá từ snapshot danh mục (bỏ qua dịch vụ đã ngừng hoạt động)
+    catalog = get_catalog_snapshot()
+    selected_services = [
+        service for service in map(catalog.get_service, booking_options.get('service_ids', []))
+        if service is not None
+    ]
     check_in = datetime.fromisoformat(booking_options.get('check_in')).date()
     check_out = datetime.fromisoformat(booking_options.get('check_out')).date()
     
@@ -177,99 +315,88 @@ def checkout_view(request):
     if request.method == 'POST':
         form = CheckoutForm(request.POST, request=request)
         if form.is_valid():
+            # Giới hạn tần suất chỉ tính lần thực sự đặt phòng (form hợp lệ), không tính lần gửi bị lỗi nhập liệu
+            exceeded = check_rate_limits(request, 'checkout')
+            if exceeded:
+                return rate_limited_response(request, exceeded)
             guest_data = form.cleaned_data
             try:
-                with transaction.atomic():
-                    # 1. Kiểm tra phòng trống
-                    if Room.objects.select_for_update().filter(room_class=room_class, status='AVAILABLE').count() == 0:
-                        messages.error(request, 'Rất tiếc, hạng phòng này vừa hết phòng trống trong lúc bạn thao tác.')
-                        return redirect('room_class_list', room_type_id=room_class.room_type.id)
-
-                    # 2. Chuẩn bị dữ liệu để tạo Booking
-                    booking_details = {
-                        'room_class': room_class,
-                        'check_in_date': check_in,
-                        'check_out_date': check_out,
-                        'adults': booking_options.get('adults'), # Lấy từ session
-                        'children': booking_options.get('children'), # Lấy từ session
-                        'room_price': room_price,
-                        'services_price': services_price,
-                        'total_price': total_price,
-                        'payment_method': guest_data.get('payment_method'),
-                        'special_requests': guest_data.get('special_requests'),
-                    }
-
-                    # 3. Xử lý thông tin khách hàng
-                    if request.user.is_authenticated:
-                        booking_details['customer'] = request.user
-                        if guest_data.get('booking_for') == 'SELF':
-                            booking_details.update({
-                                'guest_full_name': request.user.full_name or request.user.username,
-                                'guest_email': request.user.email,
-                                'guest_phone_number': request.user.phone_number,
-                                'guest_nationality': request.user.nationality,
-                            })
-                        else: # Nếu người dùng đặt cho người khác
-                            booking_details.update({
-                                'guest_full_name': guest_data.get('full_name'), 'guest_email': guest_data.get('email'),
-                                'guest_phone_number': guest_data.get('phone_number'), 'guest_nationality': guest_data.get('nationality'),
-                            })
-                    else: # Khách vãng lai
+                # 1. Chuẩn bị dữ liệu để tạo Booking
+                booking_details = {
+                    'room_class': room_class,
+                    'check_in_date': check_in,
+                    'check_out_date': check_out,
+                    'adults': booking_options.get('adults'), # Lấy từ session
+                    'children': booking_options.get('children'), # Lấy từ session
+                    'room_price': room_price,
+                    'services_price': services_price,
+                    'total_price': total_price,
+                    'payment_method': guest_data.get('payment_method'),
+                    'special_requests': guest_data.get('special_requests'),
+                }
+
+                # 2. Xử lý thông tin khách hàng
+                if request.user.is_authenticated:
+                    booking_details['customer'] = request.user
+                    if guest_data.get('booking_for') == 'SELF':
+                        booking_details.update({
+                            'guest_full_name': request.user.full_name or request.user.username,
+                            'guest_email': request.user.email,
+                            'guest_phone_number': request.user.phone_number,
+                            'guest_nationality': request.user.nationality,
+                        })
+                    else: # Nếu người dùng đặt cho người khác
                         booking_details.update({
                             'guest_full_name': guest_data.get('full_name'), 'guest_email': guest_data.get('email'),
                             'guest_phone_number': guest_data.get('phone_number'), 'guest_nationality': guest_data.get('nationality'),
                         })
-                    
-                    # 4. Tạo bản ghi Booking mới (CHỈ 1 LẦN)
-                    new_booking = Booking.objects.create(**booking_details)
-                    new_booking.additional_services.set(selected_services)
-
-                    # 5. Phân loại và khóa đơn (LOGIC MỚI CỦA BẠN)
-                    time_until_checkin = new_booking.check_in_date - timezone.now().date()
-                    is_urgent_booking = time_until_checkin < timedelta(days=1)
-
-                    if is_urgent_booking:
-                        # Đơn đặt gấp (< 24h)
-                        new_booking.is_locked = True
-                        new_booking.status = Booking.Status.PENDING_PAYMENT
-                        new_booking.save()
-                        
-                        new_booking.send_booking_email(
-                            subject=f"Yêu cầu Thanh toán Gấp cho Đơn hàng #{new_booking.id}",
-                            template_name='emails/urgent_payment_required.html'
-                        )
-                        messages.warning(request, "Đây là đơn đặt gấp (nhận phòng trong 24h). Vui lòng thanh toán ngay để xác nhận giữ phòng.")
-                        
-                        # Xác định URL chuyển hướng
-                        redirect_url_name = 'payment_guidance'
-                        args = {'booking_pk': new_booking.pk}
-                        if not request.user.is_authenticated:
-                            redirect_url_name = 'guest_payment_guidance'
-                            args = {'booking_code': new_booking.booking_code}
-
-                    else:
-                        # Đơn đặt sớm (>= 24h)
-                        new_booking.is_locked = False
-                        new_booking.status = Booking.Status.PENDING_REVIEW
-                        new_booking.save()
-                        
-                        new_booking.send_booking_email(
-                            subject=f"Fivitel đã nhận Đơn hàng #{new_booking.id} của bạn",
-                            template_name='emails/booking_received.html'
-                        )
-                        
-                        # Xác định URL chuyển hướng
-                        redirect_url_name = 'booking_detail'
-                        args = {'pk': new_booking.pk}
-                        if not request.user.is_authenticated:
-                            redirect_url_name = 'guest_booking_detail'
-                            args = {'booking_code': new_booking.booking_code}
-
-                    # 6. Dọn dẹp session
-                    del request.session['booking_options']
-
-                    # 7. Chuyển hướng
-                    return redirect(redirect_url_name, **args)
+                else: # Khách vãng lai
+                    booking_details.update({
+                        'guest_full_name': guest_data.get('full_name'), 'guest_email': guest_data.get('email'),
+                        'guest_phone_number': guest_data.get('phone_number'), 'guest_nationality': guest_data.get('nationality'),
+                    })
+
+                # 3. Kiểm tra phòng trống + tạo Booking trong 1 giao dịch ngắn (tự thử lại khi CSDL bị khóa)
+                new_booking = place_booking(booking_details, [service.id for service in selected_services])
+                if new_booking is None:
+                    messages.error(request, 'Rất tiếc, hạng phòng này vừa hết phòng trống trong lúc bạn thao tác.')
+                    return redirect('room_class_list', room_type_id=room_class.room_type.id)
+
+                # 4. Gửi email (ngoài giao dịch để không giữ khóa ghi trong lúc chờ SMTP)
+                if new_booking.is_locked:
+                    # Đơn đặt gấp (< 24h)
+                    new_booking.send_booking_email(
+                        subject=f"Yêu cầu Thanh toán Gấp cho Đơn hàng #{new_booking.id}",
+                        template_name='emails/urgent_payment_required.html'
+                    )
+                    messages.warning(request, "Đây là đơn đặt gấp (nhận phòng trong 24h). Vui lòng thanh toán ngay để xác nhận giữ phòng.")
+
+                    # Xác định URL chuyển hướng
+                    redirect_url_name = 'payment_guidance'
+                    args = {'booking_pk': new_booking.pk}
+                    if not request.user.is_authenticated:
+                        redirect_url_name = 'guest_payment_guidance'
+                        args = {'booking_code': new_booking.booking_code}
+
+                else:
+                    # Đơn đặt sớm (>= 24h)
+                    new_booking.send_booking_email(
+                        subject=f"Fivitel đã nhận Đơn hàng #{new_booking.id} của bạn",
+                        template_name='emails/booking_received.html'
+                    )
+
+                    # Xác định URL chuyển hướng
+                    redirect_url_name = 'booking_detail'
+                    args = {'pk': new_booking.pk}
+                    if not request.user.is_authenticated:
+                        redirect_url_name = 'guest_booking_detail'
+                        args = {'booking_code': new_booking.booking_code}
+
+                # 5. Dọn dẹp session
+                del request.session['booking_options']
+
+                # 6. Chuyển hướng
+                return redirect(redirect_url_name, **args)
             
             except Exception as e:
                 # Bắt lỗi nếu có bất kỳ vấn đề gì xảy ra
@@ -361,14 +488,48 @@ def guest_payment_guidance_view(request, booking_code):
 # PHẦN 2: CÁC VIEW CỦA KHÁCH HÀNG (CUSTOMER VIEWS)
 # Yêu cầu @login_required
 # ==============================================================================
+MY_BOOKINGS_PER_PAGE = 10
+
 @login_required
 def my_bookings_view(request):
     """
     Hiển thị trang "Quản lý Đơn đặt phòng của tôi".
+    - Tách 2 tab: Sắp tới (chưa trả phòng, còn hiệu lực) và Lịch sử (đã qua / đã hủy).
+    - Phân trang, số truy vấn cố định cho mỗi trang bất kể khách có bao nhiêu đơn.
     """
-    bookings = Booking.objects.filter(customer=request.user).order_by('-created_at')
+    today = timezone.now().date()
+    upcoming_filter = Q(check_out_date__gte=today) & ~Q(status__in=[
+        Booking.Status.CANCELLED,
+        Booking.Status.EXPIRED,
+        Booking.Status.COMPLETED,
+    ])
+
+    tab = request.GET.get('tab', 'upcoming')
+    if tab not in ('upcoming', 'past'):
+        tab = 'upcoming'
+
+    customer_bookings = Booking.objects.filter(customer=request.user)
+
+    # Số lượng của cả 2 tab trong 1 truy vấn
+    tab_counts = customer_bookings.aggregate(
+        upcoming=Count('id', filter=upcoming_filter),
+        past=Count('id', filter=~upcoming_filter),
+    )
+
+    if tab == 'upcoming':
+        # Chuyến sắp tới gần nhất hiển thị trước
+        bookings = customer_bookings.filter(upcoming_filter).order_by('check_in_date', 'id')
+    else:
+        bookings = customer_bookings.exclude(upcoming_filter).order_by('-check_in_date', '-id')
+
+    paginator = Paginator(bookings.select_related('room_class'), MY_BOOKINGS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+
     context = {
-        'bookings': bookings
+        'bookings': page_obj.object_list,
+        'page_obj': page_obj,
+        'current_tab': tab,
+        'tab_counts': tab_counts,
     }
     return render(request, 'booking/my_bookings.html', context)
 
@@ -387,6 +548,20 @@ def booking_detail_view(request, pk):
     }
     return render(request, 'booking/booking_detail.html', context)
 
+@login_required
+def payment_proof_file_view(request, booking_pk):
+    """
+    Tải ảnh bằng chứng thanh toán (tệp riêng tư): chỉ chủ đơn hàng và Lễ tân / Admin được xem.
+    File được stream theo từng khối, hỗ trợ HTTP Range (xem fivitel_core/downloads.py).
+    """
+    booking = get_object_or_404(Booking.objects.select_related('payment_proof'), pk=booking_pk)
+    if booking.customer_id != request.user.pk and not is_reception_staff(request.user):
+        raise Http404("Không tìm thấy bằng chứng thanh toán.")
+    proof = getattr(booking, 'payment_proof', None)
+    if proof is None:
+        raise Http404("Không tìm thấy bằng chứng thanh toán.")
+    return protected_file_response(request, proof.image, as_attachment=request.GET.get('download') == '1')
+
 @login_required
 def payment_guidance_view(request, booking_pk):
     booking = get_object_or_404(Booking, pk=booking_pk, customer=request.user)
@@ -536,6 +711,46 @@ def check_and_lock_booking(booking):
         
     return False
 
+def get_housekeeping_queue():
+    """
+    Trả về QuerySet các phòng đang dọn dẹp (CLEANING), sắp xếp theo ngày khách
+    đến sớm nhất: đơn đã gán thẳng vào phòng hoặc đơn chưa gán của cùng hạng phòng.
+    Toàn bộ hàng đợi được tính trong 1 truy vấn (subquery), không lặp trong Python.
+    """
+    today = timezone.now().date()
+    upcoming_bookings = Booking.objects.filter(
+        check_in_date__gte=today
+    ).exclude(
+        status__in=[
+            Booking.Status.CANCELLED,
+            Booking.Status.EXPIRED,
+            Booking.Status.CHECKED_IN,
+            Booking.Status.COMPLETED,
+        ]
+    ).order_by('check_in_date').values('check_in_date')
+
+    # Khách đến đã được gán thẳng vào phòng này
+    next_room_arrival = upcoming_bookings.filter(assigned_room=OuterRef('pk'))[:1]
+    # Khách đến của cùng hạng phòng nhưng chưa được gán phòng cụ thể
+    next_class_arrival = upcoming_bookings.filter(
+        room_class=OuterRef('room_class'), assigned_room__isnull=True
+    )[:1]
+
+    return Room.objects.filter(
+        status=Room.Status.CLEANING
+    ).select_related(
+        'room_class'
+    ).annotate(
+        next_room_arrival=Subquery(next_room_arrival),
+        next_class_arrival=Subquery(next_class_arrival),
+    ).annotate(
+        # Ngày gần nhất trong 2 mốc trên (bỏ qua giá trị NULL)
+        next_arrival=Least(
+            Coalesce('next_room_arrival', 'next_class_arrival'),
+            Coalesce('next_class_arrival', 'next_room_arrival'),
+        )
+    ).order_by(F('next_arrival').asc(nulls_last=True), 'room_number')
+
 def is_reception_staff(user):
     return user.is_authenticated and (user.role in ['RECEPTION', 'ADMIN'])
 
@@ -577,11 +792,16 @@ def check_in_booking_view(request, pk):
             
     return redirect('manage_bookings')
 
+# Số đơn đặt phòng trên mỗi trang quản lý của Lễ tân
+BOOKINGS_PER_PAGE = 50
+
 @user_passes_test(is_reception_staff)
+@read_from_replica
 def manage_bookings_view(request):
     """
     Hiển thị trang quản lý tất cả đơn đặt phòng cho Lễ tân.
-    Cho phép lọc đơn hàng theo trạng thái.
+    Cho phép lọc đơn hàng theo trạng thái; danh sách được phân trang theo keyset
+    nên mỗi trang chỉ đọc BOOKINGS_PER_PAGE + 1 đơn dù tổng số đơn lớn đến đâu.
     """
     status_filter = request.GET.get('status')
     
@@ -591,7 +811,7 @@ def manage_bookings_view(request):
         'room_class', 'customer'
     ).prefetch_related(
         'payment_proof'
-    ).order_by('-created_at')
+    )
 
     if status_filter:
         if status_filter == 'PENDING_ALL':
@@ -617,9 +837,13 @@ def manage_bookings_view(request):
             # Lọc theo các trạng thái riêng lẻ (CHECKED_IN, COMPLETED, v.v.)
             bookings = bookings.filter(status=status_filter)
 
+    page, older_cursor, newer_cursor = paginate_by_keyset(bookings, request, BOOKINGS_PER_PAGE)
+
     context = {
-        'bookings': bookings,
-        'current_filter': status_filter 
+        'bookings': page,
+        'current_filter': status_filter,
+        'older_cursor': older_cursor,
+        'newer_cursor': newer_cursor,
     }
     return render(request, 'booking/dashboard_bookings.html', context)
 
@@ -708,12 +932,14 @@ def check_out_view(request, pk):
         booking.save()
         
         # 2. Cập nhật trạng thái phòng để bộ phận buồng phòng xử lý
+        #    (phòng sẽ xuất hiện trong Hàng đợi dọn phòng)
         if booking.assigned_room:
             room = booking.assigned_room
             room.status = Room.Status.CLEANING
             room.save()
-        
-        messages.success(request, f"Check-out thành công cho đơn hàng #{booking.id}. Phòng {room.room_number} đã được chuyển sang trạng thái cần dọn dẹp.")
+            messages.success(request, f"Check-out thành công cho đơn hàng #{booking.id}. Phòng {room.room_number} đã được chuyển sang trạng thái cần dọn dẹp.")
+        else:
+            messages.success(request, f"Check-out thành công cho đơn hàng #{booking.id}.")
     
     return redirect('manage_bookings')
 
@@ -757,15 +983,52 @@ def manage_rooms_view(request):
         # Chuyển hướng trở lại chính trang này để xem kết quả
         return redirect('manage_rooms')
 
-    # Lấy danh sách tất cả các phòng để hiển thị
-    all_rooms = Room.objects.select_related('room_class').order_by('room_number')
-    
+    # Lấy danh sách tất cả các phòng để hiển thị (1 truy vấn duy nhất).
+    # Số lượng theo từng trạng thái được đếm trên danh sách đã tải, không truy vấn thêm.
+    all_rooms = list(Room.objects.select_related('room_class').order_by('room_number'))
+    status_counts = {value: 0 for value in Room.Status.values}
+    for room in all_rooms:
+        status_counts[room.status] = status_counts.get(room.status, 0) + 1
+
     context = {
         'rooms': all_rooms,
-        'room_statuses': Room.Status.choices # Gửi các lựa chọn trạng thái sang template
+        'room_statuses': Room.Status.choices, # Gửi các lựa chọn trạng thái sang template
+        'status_summary': [(value, label, status_counts[value]) for value, label in Room.Status.choices],
+        # Con trỏ ban đầu cho luồng SSE: chỉ nhận các thay đổi xảy ra sau khi trang được render
+        'stream_cursor': timezone.now().isoformat(),
     }
     return render(request, 'booking/dashboard_rooms.html', context)
 
+@user_passes_test(is_reception_staff)
+def housekeeping_queue_view(request):
+    """
+    Hàng đợi dọn phòng cho bộ phận buồng phòng.
+    - GET: Liệt kê các phòng CLEANING, phòng có khách sắp đến sớm nhất được xếp lên đầu.
+    - POST: Đánh dấu hàng loạt các phòng đã chọn là AVAILABLE (1 lệnh bulk_update).
+    """
+    if request.method == 'POST':
+        room_ids = request.POST.getlist('room_ids')
+        rooms_to_update = list(Room.objects.filter(pk__in=room_ids, status=Room.Status.CLEANING))
+
+        # bulk_update không tự cập nhật auto_now, gán tay để bảng trạng thái trực tiếp nhận được thay đổi
+        now = timezone.now()
+        for room in rooms_to_update:
+            room.status = Room.Status.AVAILABLE
+            room.updated_at = now
+        Room.objects.bulk_update(rooms_to_update, ['status', 'updated_at'])
+
+        if rooms_to_update:
+            room_numbers = ", ".join(room.room_number for room in rooms_to_update)
+            messages.success(request, f"Đã chuyển {len(rooms_to_update)} phòng sang 'Còn trống': {room_numbers}.")
+        else:
+            messages.warning(request, "Vui lòng chọn ít nhất một phòng đang dọn dẹp.")
+        return redirect('housekeeping_queue')
+
+    context = {
+        'rooms': get_housekeeping_queue(),
+    }
+    return render(request, 'booking/dashboard_housekeeping.html', context)
+
 # ===== 3. Logic Quản lý Cấu hình (Admin) =====
 class RoomTypeListView(AdminRequiredMixin, ListView):
     """View hiển thị danh sách tất cả các Loại phòng."""
@@ -802,14 +1065,14 @@ class RoomClassCreateView(AdminRequiredMixin, CreateView):
     """View hiển thị form để tạo mới một Hạng phòng."""
     model = RoomClass
     template_name = 'booking/dashboard_roomclass_form.html'
-    fields = ['room_type', 'name', 'description', 'base_price', 'area', 'amenities', 'image']
+    form_class = RoomClassForm
     success_url = reverse_lazy('room_class_list_admin') # Đổi tên để tránh trùng lặp
 
 class RoomClassUpdateView(AdminRequiredMixin, UpdateView):
     """View hiển thị form để chỉnh sửa một Hạng phòng."""
     model = RoomClass
     template_name = 'booking/dashboard_roomclass_form.html'
-    fields = ['room_type', 'name', 'description', 'base_price', 'area', 'amenities', 'image']
+    form_class = RoomClassForm
     success_url = reverse_lazy('room_class_list_admin')
 
 class RoomClassDeleteView(AdminRequiredMixin, DeleteView):
@@ -840,4 +1103,56 @@ class RoomUpdateView(AdminRequiredMixin, UpdateView):
 class RoomDeleteView(AdminRequiredMixin, DeleteView):
     """View xử lý việc xóa một phòng."""
     model = Room
-    success_url = reverse_lazy('room_list_admin')
\ No newline at end of file
+    success_url = reverse_lazy('room_list_admin')
+
+# ==============================================================================
+# PHẦN 5: LUỒNG CẬP NHẬT TRỰC TIẾP (SERVER-SENT EVENTS)
+# Đẩy các thay đổi trạng thái phòng / check-in / check-out tới dashboard,
+# chạy tốt nhất qua ASGI (fivitel_core/asgi.py, VD: uvicorn hoặc daphne)
+# ==============================================================================
+def get_room_board_changes(since):
+    """
+    Lấy các thay đổi kể từ mốc `since` (2 truy vấn có index trên updated_at):
+    - Phòng đổi trạng thái.
+    - Đơn hàng vừa check-in / check-out.
+    Trả về (danh sách sự kiện SSE, con trỏ mới).
+    """
+    cursor = since
+    events = []
+
+    rooms = Room.objects.filter(updated_at__gt=since).order_by('updated_at').values(
+        'id', 'room_number', 'status', 'updated_at'
+    )
+    for room in rooms:
+        cursor = max(cursor, room['updated_at'])
+        room['status_display'] = Room.Status(room['status']).label
+        events.append(('room', room))
+
+    bookings = Booking.objects.filter(
+        updated_at__gt=since,
+        status__in=[Booking.Status.CHECKED_IN, Booking.Status.COMPLETED],
+    ).order_by('updated_at').values(
+        'id', 'status', 'guest_full_name', 'assigned_room_id', 'assigned_room__room_number', 'updated_at'
+    )
+    for booking in bookings:
+        cursor = max(cursor, booking['updated_at'])
+        booking['status_display'] = Booking.Status(booking['status']).label
+        events.append(('booking', booking))
+
+    return [format_sse_event(name, data, cursor.isoformat()) for name, data in events], cursor
+
+@user_passes_test(is_reception_staff)
+async def room_status_stream_view(request):
+    """
+    Endpoint SSE cho bảng trạng thái phòng. Client chỉ nhận phần chênh lệch (diff),
+    không cần tải lại toàn bộ danh sách phòng.
+    Con trỏ lấy từ header Last-Event-ID (khi tự kết nối lại) hoặc tham số ?since=.
+    """
+    raw_cursor = request.headers.get('Last-Event-ID') or request.GET.get('since')
+    cursor = parse_datetime(raw_cursor) if raw_cursor else None
+    if cursor is None:
+        cursor = timezone.now()
+    elif timezone.is_naive(cursor):
+        cursor = timezone.make_aware(cursor)
+
+    return sse_response(request, get_room_board_changes, cursor)
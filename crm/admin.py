@@ -1,5 +1,21 @@
 from django.contrib import admin
-from .models import Ticket, TicketResponse
+from .models import Ticket, TicketResponse, SupportAgent, SupportAgentSkill
 
 admin.site.register(Ticket)
-admin.site.register(TicketResponse)
\ No newline at end of file
+admin.site.register(TicketResponse)
+
+
+class SupportAgentSkillInline(admin.TabularInline):
+    model = SupportAgentSkill
+    extra = 1
+
+
+@admin.register(SupportAgent)
+class SupportAgentAdmin(admin.ModelAdmin):
+    list_display = ('user', 'is_accepting', 'open_ticket_count', 'max_open_tickets', 'last_assigned_at')
+    list_filter = ('is_accepting',)
+    list_editable = ('is_accepting', 'max_open_tickets')
+    list_select_related = ('user',)
+    # Bộ đếm do hệ thống duy trì; sửa sai lệch bằng lệnh rebalance_support_tickets
+    readonly_fields = ('open_ticket_count', 'last_assigned_at')
+    inlines = [SupportAgentSkillInline]
@@ -0,0 +1,126 @@
+from django.core.cache import cache
+from django.db.models import Q
+
+from booking.models import Booking
+from users.identity import normalize_email_key, normalize_phone_key
+from .models import CustomUser, Ticket
+
+# ==============================================================================
+# HỒ SƠ KHÁCH HÀNG 360°
+# Gom đơn đặt phòng và yêu cầu CSKH của một khách theo:
+# - khóa ngoại customer (tài khoản đã đăng ký), và
+# - email_key / phone_key đã chuẩn hóa (có index) của các bản ghi vãng lai.
+# Số truy vấn không phụ thuộc lượng dữ liệu: tối đa 1 (tài khoản) + 1 (đơn) + 1 (ticket).
+# Kết quả được cache ngắn hạn vì trang này thường được mở lại nhiều lần khi xử lý một ca.
+# ==============================================================================
+CUSTOMER_PROFILE_CACHE_TIMEOUT = 60  # giây
+# Số dòng tối đa mỗi loại hiển thị trên hồ sơ
+PROFILE_ROW_LIMIT = 200
+
+# Các trạng thái đơn được tính là đã chi tiêu
+SPENT_BOOKING_STATUSES = {
+    Booking.Status.PAID, Booking.Status.CONFIRMED, Booking.Status.CHECKED_IN, Booking.Status.COMPLETED,
+}
+
+
+def _identity_filter(user_ids, emails, phones, customer_field='customer_id'):
+    condition = Q()
+    if user_ids:
+        condition |= Q(**{f'{customer_field}__in': user_ids})
+    if emails:
+        condition |= Q(email_key__in=emails)
+    if phones:
+        condition |= Q(phone_key__in=phones)
+    return condition
+
+
+def build_customer_profile(user=None, email='', phone=''):
+    """
+    Tổng hợp hồ sơ của một khách: theo tài khoản (user) hoặc theo email / SĐT của khách vãng lai.
+    Trả về dict gồm tài khoản liên kết, danh sách đơn, danh sách ticket và số liệu tóm tắt;
+    None nếu không có thông tin nhận diện nào.
+    """
+    user_ids, emails, phones = set(), set(), set()
+    if user is not None:
+        user_ids.add(user.pk)
+        emails.add(normalize_email_key(user.email))
+        phones.add(normalize_phone_key(user.phone_number))
+    emails.add(normalize_email_key(email))
+    phones.add(normalize_phone_key(phone))
+    emails.discard('')
+    phones.discard('')
+    if not (user_ids or emails or phones):
+        return None
+
+    if user is None and emails:
+        # Khách vãng lai có thể đã đăng ký tài khoản bằng cùng email: ghép cả SĐT của tài khoản đó
+        for user_id, phone_number in CustomUser.objects.filter(
+            email__in=emails, role=CustomUser.Role.CUSTOMER
+        ).values_list('pk', 'phone_number'):
+            user_ids.add(user_id)
+            phones.add(normalize_phone_key(phone_number))
+        phones.discard('')
+
+    bookings = list(
+        Booking.objects.filter(_identity_filter(user_ids, emails, phones))
+        .select_related('room_class', 'assigned_room', 'customer')
+        .order_by('-created_at')[:PROFILE_ROW_LIMIT]
+    )
+    tickets = list(
+        Ticket.objects.filter(_identity_filter(user_ids, emails, phones))
+        .select_related('customer', 'assigned_to')
+        .order_by('-created_at')[:PROFILE_ROW_LIMIT]
+    )
+
+    # Các tài khoản xuất hiện trên đơn / ticket đã ghép (lấy từ select_related, không truy vấn thêm)
+    accounts = {user.pk: user} if user is not None else {}
+    for row in bookings + tickets:
+        if row.customer_id and row.customer_id not in accounts:
+            accounts[row.customer_id] = row.customer
+
+    spent = [booking for booking in bookings if booking.status in SPENT_BOOKING_STATUSES]
+    stays = [booking for booking in spent if booking.status in (Booking.Status.CHECKED_IN, Booking.Status.COMPLETED)]
+    summary = {
+        'booking_count': len(bookings),
+        'total_spent': sum(booking.total_price for booking in spent),
+        'nights_stayed': sum((booking.check_out_date - booking.check_in_date).days for booking in stays),
+        'last_stay': max((booking.check_in_date for booking in stays), default=None),
+        'cancelled_count': sum(1 for booking in bookings if booking.status in (Booking.Status.CANCELLED, Booking.Status.EXPIRED)),
+        'ticket_count': len(tickets),
+        'open_ticket_count': sum(1 for ticket in tickets if ticket.status != Ticket.Status.RESOLVED),
+        'complaint_count': sum(1 for ticket in tickets if ticket.type == Ticket.Type.COMPLAINT),
+    }
+
+    display_source = user or next(iter(accounts.values()), None) or next(iter(bookings + tickets), None)
+    return {
+        'display_name': _display_name(display_source) if display_source else (email or phone),
+        'emails': sorted(emails),
+        'phones': sorted(phones),
+        'accounts': list(accounts.values()),
+        'bookings': bookings,
+        'tickets': tickets,
+        'summary': summary,
+        'truncated': len(bookings) == PROFILE_ROW_LIMIT or len(tickets) == PROFILE_ROW_LIMIT,
+    }
+
+
+def _display_name(source):
+    if isinstance(source, CustomUser):
+        return source.full_name or source.username
+    if source.customer_id:
+        return source.customer.full_name or source.customer.username
+    return source.guest_full_name
+
+
+def get_customer_profile(user=None, email='', phone=''):
+    """build_customer_profile có cache ngắn hạn, khóa theo tài khoản hoặc email / SĐT đã chuẩn hóa."""
+    if user is not None:
+        cache_key = f'customer360:user:{user.pk}'
+    else:
+        cache_key = f'customer360:guest:{normalize_email_key(email)}:{normalize_phone_key(phone)}'
+    profile = cache.get(cache_key)
+    if profile is None:
+        profile = build_customer_profile(user=user, email=email, phone=phone)
+        if profile is not None:
+            cache.set(cache_key, profile, CUSTOMER_PROFILE_CACHE_TIMEOUT)
+    return profile
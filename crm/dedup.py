@@ -0,0 +1,221 @@
+import hashlib
+import random
+import re
+import unicodedata
+from array import array
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Ticket, TicketLshBucket, TicketResponse, TicketSignature
+from .search import move_responses
+
+# ==============================================================================
+# PHÁT HIỆN YÊU CẦU TRÙNG LẶP (MinHash + LSH)
+# - Nội dung ticket được chuẩn hóa (chữ thường, bỏ dấu) rồi tách thành các cụm
+#   SHINGLE_SIZE từ liên tiếp; chữ ký MinHash gồm NUM_PERM giá trị nhỏ nhất.
+# - Chữ ký chia thành LSH_BANDS dải x LSH_ROWS giá trị; mỗi dải băm thành một bucket
+#   (bảng TicketLshBucket, có index). Ứng viên trùng = các ticket chung ít nhất 1 bucket,
+#   sau đó mới so chữ ký để ước lượng độ tương đồng.
+# Với 16 dải x 4 dòng: cặp có độ tương đồng 0.6 được tìm thấy ~89%, cặp 0.3 chỉ ~12%.
+# ==============================================================================
+NUM_PERM = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_SIZE = 3
+
+# Ngưỡng độ tương đồng ước tính để đánh dấu "có thể trùng"
+DUPLICATE_THRESHOLD = 0.6
+# Chỉ so với các ticket được tạo trong khoảng thời gian này
+DUPLICATE_WINDOW_DAYS = 30
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)  # Hạt cố định: chữ ký phải ổn định giữa các lần chạy
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERM)
+]
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def normalize_tokens(text):
+    """Chữ thường, bỏ dấu tiếng Việt (kể cả 'đ') và tách từ."""
+    text = unicodedata.normalize('NFD', (text or '').lower().replace('đ', 'd'))
+    text = ''.join(char for char in text if unicodedata.category(char) != 'Mn')
+    return _TOKEN_RE.findall(text)
+
+
+def shingles(text):
+    """Tập các cụm SHINGLE_SIZE từ liên tiếp (nội dung ngắn hơn thì dùng từng từ)."""
+    tokens = normalize_tokens(text)
+    if len(tokens) < SHINGLE_SIZE:
+        return set(tokens)
+    return {' '.join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+
+def minhash_signature(text):
+    """Chữ ký MinHash (list NUM_PERM số nguyên) của nội dung; None nếu nội dung rỗng."""
+    hashes = [_hash64(shingle) % _MERSENNE_PRIME for shingle in shingles(text)]
+    if not hashes:
+        return None
+    return [min((a * x + b) % _MERSENNE_PRIME for x in hashes) for a, b in _PERMUTATIONS]
+
+
+def band_buckets(signature):
+    """Giá trị băm (số nguyên 64-bit có dấu, vừa cột BigInteger) của từng dải."""
+    buckets = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        digest = hashlib.blake2b(array('Q', rows).tobytes(), digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, 'big', signed=True))
+    return buckets
+
+
+def estimate_similarity(signature, other):
+    """Tỷ lệ vị trí trùng nhau giữa hai chữ ký ~ độ tương đồng Jaccard."""
+    return sum(1 for a, b in zip(signature, other) if a == b) / NUM_PERM
+
+
+def pack_signature(signature):
+    return array('Q', signature).tobytes()
+
+
+def unpack_signature(data):
+    return array('Q', bytes(data)).tolist()
+
+
+def store_signature(ticket, signature):
+    """Ghi (hoặc thay) chữ ký và các bucket LSH của ticket."""
+    TicketLshBucket.objects.filter(ticket=ticket).delete()
+    if signature is None:
+        TicketSignature.objects.filter(ticket=ticket).delete()
+        return
+    TicketSignature.objects.update_or_create(ticket=ticket, defaults={'signature': pack_signature(signature)})
+    TicketLshBucket.objects.bulk_create([
+        TicketLshBucket(ticket=ticket, band=band, bucket=bucket)
+        for band, bucket in enumerate(band_buckets(signature))
+    ])
+
+
+def find_duplicates(ticket, signature, threshold=DUPLICATE_THRESHOLD):
+    """
+    Các ticket có thể trùng với nội dung đã cho, dạng [(ticket_id, độ tương đồng)] giảm dần.
+    Chỉ xét ticket chưa bị gộp, tạo trong DUPLICATE_WINDOW_DAYS ngày gần đây.
+    Dùng 2 truy vấn: tìm ứng viên qua index (band, bucket), rồi đọc chữ ký của các ứng viên.
+    """
+    bucket_filter = Q()
+    for band, bucket in enumerate(band_buckets(signature)):
+        bucket_filter |= Q(band=band, bucket=bucket)
+    since = timezone.now() - timedelta(days=DUPLICATE_WINDOW_DAYS)
+    candidate_ids = set(
+        TicketLshBucket.objects.filter(bucket_filter)
+        .exclude(ticket_id=ticket.pk)
+        .filter(ticket__created_at__gte=since, ticket__merged_into__isnull=True)
+        .values_list('ticket_id', flat=True)
+    )
+    if not candidate_ids:
+        return []
+    matches = []
+    for ticket_id, data in TicketSignature.objects.filter(ticket_id__in=candidate_ids).values_list('ticket_id', 'signature'):
+        similarity = estimate_similarity(signature, unpack_signature(data))
+        if similarity >= threshold:
+            matches.append((ticket_id, similarity))
+    # Độ tương đồng cao nhất trước; bằng nhau thì ưu tiên ticket cũ hơn (ticket gốc)
+    matches.sort(key=lambda match: (-match[1], match[0]))
+    return matches
+
+
+def index_ticket_signature(ticket, flag=True):
+    """
+    Tính và lưu chữ ký của ticket; nếu flag thì đánh dấu ticket trùng khả dĩ nhất.
+    Gọi từ signal khi tạo ticket hoặc khi nội dung thay đổi (crm/signals.py).
+    """
+    signature = minhash_signature(ticket.description)
+    store_signature(ticket, signature)
+    if not flag or signature is None:
+        return None
+    matches = find_duplicates(ticket, signature)
+    duplicate_of_id, similarity = matches[0] if matches else (None, None)
+    if duplicate_of_id != ticket.possible_duplicate_of_id:
+        # update() để không kích hoạt lại signal post_save của Ticket
+        Ticket.objects.filter(pk=ticket.pk).update(
+            possible_duplicate_of=duplicate_of_id, duplicate_similarity=similarity
+        )
+        ticket.possible_duplicate_of_id, ticket.duplicate_similarity = duplicate_of_id, similarity
+    return duplicate_of_id
+
+
+def rebuild_signatures(batch_size=500):
+    """Tính lại chữ ký và bucket của toàn bộ ticket (không đánh dấu trùng). Trả về số ticket."""
+    total = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            Ticket.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', 'description', 'merged_into_id')[:batch_size]
+        )
+        if not batch:
+            return total
+        last_pk = batch[-1][0]
+        signatures, buckets = [], []
+        for ticket_id, description, merged_into_id in batch:
+            signature = minhash_signature(description)
+            if signature is None:
+                continue
+            signatures.append(TicketSignature(ticket_id=ticket_id, signature=pack_signature(signature)))
+            if merged_into_id:
+                continue  # Ticket đã gộp không còn là ứng viên trùng lặp
+            buckets.extend(
+                TicketLshBucket(ticket_id=ticket_id, band=band, bucket=bucket)
+                for band, bucket in enumerate(band_buckets(signature))
+            )
+        ticket_ids = [row[0] for row in batch]
+        with transaction.atomic():
+            TicketLshBucket.objects.filter(ticket_id__in=ticket_ids).delete()
+            TicketSignature.objects.filter(ticket_id__in=ticket_ids).delete()
+            TicketSignature.objects.bulk_create(signatures)
+            TicketLshBucket.objects.bulk_create(buckets)
+        total += len(batch)
+
+
+# ----- Gộp ticket trùng -----
+
+def merge_tickets(source, target):
+    """
+    Gộp ticket source vào target:
+    - Chuyển toàn bộ phản hồi của source sang target (1 câu UPDATE) và tính lại tóm tắt phản hồi.
+    - Đóng source với ghi chú "đã gộp", các ticket đang trỏ "có thể trùng" tới source chuyển sang target.
+    Trả về số phản hồi đã chuyển.
+    """
+    if source.pk == target.pk:
+        raise ValueError("Không thể gộp một yêu cầu vào chính nó.")
+    if source.merged_into_id or target.merged_into_id:
+        raise ValueError("Yêu cầu đã được gộp trước đó.")
+
+    with transaction.atomic():
+        moved = TicketResponse.objects.filter(ticket=source).update(ticket=target)
+        move_responses(source.pk, target.pk)
+        Ticket.refresh_response_summaries(Ticket.objects.filter(pk__in=[source.pk, target.pk]))
+        # Giữ mốc phản hồi đầu tiên sớm nhất của hai ticket (SLA)
+        if source.first_response_at and (not target.first_response_at or source.first_response_at < target.first_response_at):
+            Ticket.objects.filter(pk=target.pk).update(first_response_at=source.first_response_at)
+        Ticket.objects.filter(possible_duplicate_of=source).exclude(pk=target.pk).update(possible_duplicate_of=target)
+
+        source.merged_into = target
+        source.possible_duplicate_of = None
+        source.duplicate_similarity = None
+        source.status = Ticket.Status.RESOLVED
+        note = f"Đã gộp vào yêu cầu #{str(target.ticket_id)[:8]}."
+        source.resolution_details = f"{source.resolution_details}\n{note}" if source.resolution_details else note
+        source.save(update_fields=[
+            'merged_into', 'possible_duplicate_of', 'duplicate_similarity', 'status', 'resolution_details',
+        ])
+        # Ticket đã gộp không còn là ứng viên trùng lặp
+        TicketLshBucket.objects.filter(ticket=source).delete()
+    target.refresh_from_db()
+    return moved
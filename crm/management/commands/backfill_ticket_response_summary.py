@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef, Subquery
+
+from crm.models import Ticket, TicketResponse
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Tính lại các trường tóm tắt phản hồi (last_response_*, response_count) của Ticket từ TicketResponse, "
+        "và điền mốc phản hồi đầu tiên (first_response_at) còn trống cho ticket cũ."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Số ticket cập nhật trong mỗi câu UPDATE (mặc định 1000).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        ticket_ids = list(Ticket.objects.order_by('pk').values_list('pk', flat=True))
+        updated = 0
+        for start in range(0, len(ticket_ids), batch_size):
+            batch = ticket_ids[start:start + batch_size]
+            updated += Ticket.refresh_response_summaries(Ticket.objects.filter(pk__in=batch))
+        self.stdout.write(self.style.SUCCESS(f"Đã cập nhật tóm tắt phản hồi cho {updated} ticket."))
+
+        filled = self.backfill_first_response()
+        self.stdout.write(self.style.SUCCESS(f"Đã điền mốc phản hồi đầu tiên cho {filled} ticket."))
+
+    def backfill_first_response(self):
+        """Mốc phản hồi đầu tiên = phản hồi sớm nhất của nhân viên; chỉ điền ticket chưa có mốc."""
+        staff_responses = TicketResponse.objects.filter(ticket=OuterRef('pk')).exclude(
+            responder__role=CustomUser.Role.CUSTOMER
+        )
+        return Ticket.objects.filter(Exists(staff_responses), first_response_at__isnull=True).update(
+            first_response_at=Subquery(staff_responses.order_by('created_at').values('created_at')[:1])
+        )
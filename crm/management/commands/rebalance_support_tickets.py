@@ -0,0 +1,80 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from crm.models import SupportAgent, Ticket
+from crm.routing import assign_ticket_to_agent, auto_assign_ticket, ensure_agent_profiles, recount_open_tickets
+
+
+class Command(BaseCommand):
+    help = (
+        "Cân bằng lại việc phân công khiếu nại: sửa bộ đếm ticket đang mở, "
+        "gán các khiếu nại còn trống và chuyển khiếu nại chưa được phản hồi từ người quá tải sang người rảnh hơn."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-moves', type=int, default=100,
+            help="Số khiếu nại tối đa được chuyển người xử lý trong một lần chạy (mặc định 100).",
+        )
+        parser.add_argument(
+            '--no-move', action='store_true',
+            help="Chỉ sửa bộ đếm và gán khiếu nại còn trống, không chuyển việc giữa các nhân viên.",
+        )
+
+    def handle(self, *args, **options):
+        created = ensure_agent_profiles()
+        fixed = recount_open_tickets()
+        self.stdout.write(f"Tạo {created} hồ sơ CSKH mới, sửa bộ đếm của {fixed} nhân viên.")
+
+        assigned = 0
+        unassigned = Ticket.objects.filter(
+            type=Ticket.Type.COMPLAINT, assigned_to__isnull=True
+        ).exclude(status=Ticket.Status.RESOLVED).order_by('created_at')
+        for ticket in unassigned.iterator():
+            if auto_assign_ticket(ticket) is None:
+                break  # Không còn ai nhận thêm việc
+            assigned += 1
+        self.stdout.write(f"Đã gán {assigned} khiếu nại chưa có người xử lý.")
+
+        if not options['no_move']:
+            moved = self.move_untouched_tickets(options['max_moves'])
+            self.stdout.write(f"Đã chuyển {moved} khiếu nại để cân bằng tải.")
+        self.stdout.write(self.style.SUCCESS("Hoàn tất cân bằng phân công."))
+
+    def move_untouched_tickets(self, max_moves):
+        """
+        Lặp: lấy người nhiều việc nhất và người ít việc nhất (đang nhận việc);
+        nếu chênh lệch > 1 thì chuyển 1 khiếu nại chưa có phản hồi nào (mới nhất) sang người ít việc.
+        """
+        agents = list(SupportAgent.objects.filter(
+            is_accepting=True, user__is_active=True, user__role='SUPPORT'
+        ).order_by('pk'))
+        if len(agents) < 2:
+            return 0
+
+        moved = 0
+        exhausted = set()  # Nhân viên không còn khiếu nại nào có thể chuyển đi
+        while moved < max_moves:
+            donors = [agent for agent in agents if agent.pk not in exhausted]
+            if not donors:
+                break
+            busiest = max(donors, key=lambda agent: agent.open_ticket_count)
+            idlest = min(agents, key=lambda agent: agent.open_ticket_count)
+            if busiest.open_ticket_count - idlest.open_ticket_count <= 1 or idlest.open_ticket_count >= idlest.max_open_tickets:
+                break
+
+            ticket = Ticket.objects.filter(
+                type=Ticket.Type.COMPLAINT,
+                assigned_to_id=busiest.user_id,
+                response_count=0,
+            ).exclude(status=Ticket.Status.RESOLVED).order_by('-created_at').first()
+            if ticket is None:
+                exhausted.add(busiest.pk)
+                continue
+
+            with transaction.atomic():
+                assign_ticket_to_agent(ticket, idlest)
+            busiest.open_ticket_count -= 1
+            idlest.open_ticket_count += 1
+            moved += 1
+        return moved
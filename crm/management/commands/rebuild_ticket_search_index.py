@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from crm.search import fts_enabled, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Dựng lại chỉ mục tìm kiếm toàn văn (FTS5) của ticket và phản hồi từ dữ liệu hiện có."
+
+    def handle(self, *args, **options):
+        if not fts_enabled():
+            self.stdout.write(self.style.WARNING("CSDL hiện tại không phải SQLite, bỏ qua chỉ mục FTS5."))
+            return
+        ticket_count, response_count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Đã đánh chỉ mục {ticket_count} ticket và {response_count} phản hồi."))
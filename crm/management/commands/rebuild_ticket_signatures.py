@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from crm.dedup import rebuild_signatures
+
+
+class Command(BaseCommand):
+    help = "Tính lại chữ ký MinHash và chỉ mục LSH (phát hiện trùng lặp) cho toàn bộ ticket."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Số ticket xử lý mỗi lô.")
+
+    def handle(self, *args, **options):
+        total = rebuild_signatures(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Đã tính chữ ký cho {total} ticket."))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from crm.models import SlaMetricsSnapshot
+from crm.sla import run_sla_sweep
+
+
+class Command(BaseCommand):
+    help = "Quét SLA của ticket: đánh dấu các ticket trễ hạn và tính lại số liệu SLA cho dashboard (chạy định kỳ, ví dụ mỗi 5 phút)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep', type=int, default=2000,
+            help="Số bản số liệu SLA gần nhất được giữ lại (mặc định 2000).",
+        )
+
+    def handle(self, *args, **options):
+        first_response_flagged, resolution_flagged, snapshot = run_sla_sweep()
+
+        # Dọn các bản số liệu cũ
+        keep_ids = SlaMetricsSnapshot.objects.order_by('-computed_at').values_list('pk', flat=True)[:options['keep']]
+        SlaMetricsSnapshot.objects.exclude(pk__in=list(keep_ids)).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Đánh dấu {first_response_flagged} ticket trễ phản hồi, {resolution_flagged} ticket trễ hoàn thành. "
+            f"Đang mở: {snapshot.open_tickets} (trễ hạn: {snapshot.open_breached})."
+        ))
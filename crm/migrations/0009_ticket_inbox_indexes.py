@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0008_ticket_resolution_details_alter_ticket_attachment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['type', '-created_at', '-id'], name='ticket_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='ticket_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0009_ticket_inbox_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='last_responder_name',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Người phản hồi gần nhất'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='last_response_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Thời gian phản hồi gần nhất'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='last_response_excerpt',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Trích đoạn phản hồi gần nhất'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='response_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Số phản hồi'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['customer', '-created_at'], name='ticket_customer_created_idx'),
+        ),
+    ]
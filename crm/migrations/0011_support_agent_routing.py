@@ -0,0 +1,67 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_agent_profiles(apps, schema_editor):
+    # Tạo hồ sơ cho các nhân viên CSKH hiện có, kèm số ticket đang mở của từng người
+    CustomUser = apps.get_model('users', 'CustomUser')
+    Ticket = apps.get_model('crm', 'Ticket')
+    SupportAgent = apps.get_model('crm', 'SupportAgent')
+    open_counts = dict(
+        Ticket.objects.exclude(status='RESOLVED').filter(assigned_to__isnull=False)
+        .order_by().values('assigned_to').annotate(total=models.Count('pk')).values_list('assigned_to', 'total')
+    )
+    SupportAgent.objects.bulk_create([
+        SupportAgent(user=user, open_ticket_count=open_counts.get(user.pk, 0))
+        for user in CustomUser.objects.filter(role='SUPPORT')
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0010_ticket_response_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SupportAgent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_accepting', models.BooleanField(default=True, verbose_name='Đang nhận việc tự động')),
+                ('max_open_tickets', models.PositiveIntegerField(default=20, verbose_name='Số ticket mở tối đa')),
+                ('open_ticket_count', models.IntegerField(default=0, verbose_name='Số ticket đang mở')),
+                ('last_assigned_at', models.DateTimeField(blank=True, null=True, verbose_name='Lần nhận việc gần nhất')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='support_agent', to=settings.AUTH_USER_MODEL, verbose_name='Nhân viên')),
+            ],
+            options={
+                'verbose_name': 'Nhân viên CSKH',
+                'verbose_name_plural': 'Nhân viên CSKH',
+            },
+        ),
+        migrations.CreateModel(
+            name='SupportAgentSkill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('complaint_type', models.CharField(choices=[('ROOM_QUALITY', 'Về chất lượng phòng'), ('STAFF_ATTITUDE', 'Về thái độ nhân viên'), ('SERVICE_ISSUES', 'Về chất lượng dịch vụ'), ('BILLING_ERROR', 'Về sai sót thanh toán'), ('OTHER', 'Vấn đề khác')], max_length=20, verbose_name='Loại khiếu nại')),
+                ('agent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='skills', to='crm.supportagent', verbose_name='Nhân viên')),
+            ],
+            options={
+                'verbose_name': 'Chuyên môn',
+                'verbose_name_plural': 'Chuyên môn',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='supportagent',
+            index=models.Index(fields=['is_accepting', 'open_ticket_count'], name='agent_load_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='supportagentskill',
+            constraint=models.UniqueConstraint(fields=('agent', 'complaint_type'), name='unique_agent_skill'),
+        ),
+        migrations.RunPython(create_agent_profiles, migrations.RunPython.noop),
+    ]
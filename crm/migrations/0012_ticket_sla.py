@@ -0,0 +1,70 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:57
+
+from django.db import migrations, models
+
+
+def backfill_first_response(apps, schema_editor):
+    # Mốc phản hồi đầu tiên của ticket cũ = phản hồi sớm nhất của nhân viên (không phải khách hàng)
+    Ticket = apps.get_model('crm', 'Ticket')
+    TicketResponse = apps.get_model('crm', 'TicketResponse')
+    # (Không lọc theo response_count: cột này chỉ được điền sau migrate bởi lệnh backfill_ticket_response_summary)
+    staff_responses = TicketResponse.objects.filter(ticket=models.OuterRef('pk')).exclude(responder__role='CUSTOMER')
+    Ticket.objects.filter(models.Exists(staff_responses)).update(
+        first_response_at=models.Subquery(staff_responses.order_by('created_at').values('created_at')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0011_support_agent_routing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlaMetricsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('computed_at', models.DateTimeField(db_index=True, verbose_name='Thời điểm tính')),
+                ('window_days', models.PositiveIntegerField(verbose_name='Số ngày thống kê')),
+                ('open_tickets', models.PositiveIntegerField(default=0, verbose_name='Ticket đang mở')),
+                ('open_breached', models.PositiveIntegerField(default=0, verbose_name='Ticket đang mở đã trễ hạn')),
+                ('open_complaints_breached', models.PositiveIntegerField(default=0, verbose_name='Khiếu nại đang mở đã trễ hạn')),
+                ('tickets_in_window', models.PositiveIntegerField(default=0, verbose_name='Ticket tạo trong kỳ')),
+                ('first_response_breached', models.PositiveIntegerField(default=0, verbose_name='Trễ hạn phản hồi đầu tiên (trong kỳ)')),
+                ('resolution_breached', models.PositiveIntegerField(default=0, verbose_name='Trễ hạn hoàn thành (trong kỳ)')),
+                ('avg_first_response', models.DurationField(blank=True, null=True, verbose_name='Thời gian phản hồi đầu tiên trung bình')),
+                ('avg_resolution', models.DurationField(blank=True, null=True, verbose_name='Thời gian hoàn thành trung bình')),
+            ],
+            options={
+                'ordering': ['-computed_at'],
+                'get_latest_by': 'computed_at',
+            },
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='first_response_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Thời gian nhân viên phản hồi đầu tiên'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='first_response_breached',
+            field=models.BooleanField(default=False, verbose_name='Trễ hạn phản hồi đầu tiên'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='resolution_breached',
+            field=models.BooleanField(default=False, verbose_name='Trễ hạn hoàn thành'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='resolved_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Thời gian hoàn thành'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='status_changed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Thời gian đổi trạng thái gần nhất'),
+        ),
+        migrations.RunPython(backfill_first_response, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # Bảng FTS5 chỉ có trên SQLite; CSDL khác tìm kiếm bằng icontains (xem crm/search.py)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS crm_ticket_fts USING fts5("
+        "subject, description, resolution_details, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS crm_ticketresponse_fts USING fts5("
+        "message, ticket_id UNINDEXED, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO crm_ticket_fts (rowid, subject, description, resolution_details) "
+        "SELECT id, subject, description, COALESCE(resolution_details, '') FROM crm_ticket"
+    )
+    schema_editor.execute(
+        "INSERT INTO crm_ticketresponse_fts (rowid, message, ticket_id) "
+        "SELECT id, message, ticket_id FROM crm_ticketresponse"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS crm_ticket_fts")
+    schema_editor.execute("DROP TABLE IF EXISTS crm_ticketresponse_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0012_ticket_sla'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
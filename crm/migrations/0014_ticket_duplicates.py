@@ -0,0 +1,52 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0013_ticket_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketSignature',
+            fields=[
+                ('ticket', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='crm.ticket', verbose_name='Yêu cầu')),
+                ('signature', models.BinaryField(verbose_name='Chữ ký MinHash')),
+            ],
+            options={
+                'verbose_name': 'Chữ ký nội dung',
+                'verbose_name_plural': 'Chữ ký nội dung',
+            },
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='duplicate_similarity',
+            field=models.FloatField(blank=True, null=True, verbose_name='Độ tương đồng ước tính'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='merged_into',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='merged_tickets', to='crm.ticket', verbose_name='Đã gộp vào'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='possible_duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='possible_duplicates', to='crm.ticket', verbose_name='Có thể trùng với'),
+        ),
+        migrations.CreateModel(
+            name='TicketLshBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField(verbose_name='Dải')),
+                ('bucket', models.BigIntegerField(verbose_name='Giá trị băm của dải')),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='crm.ticket', verbose_name='Yêu cầu')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['band', 'bucket'], name='ticket_lsh_bucket_idx')],
+            },
+        ),
+    ]
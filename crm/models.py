@@ -1,6 +1,10 @@
 import uuid
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Subquery, Count, Value
+from django.db.models.functions import Coalesce, NullIf, Substr
+from django.utils import timezone
 from django.conf import settings
+from users.identity import apply_contact_keys
 from users.models import CustomUser
 
 class Ticket(models.Model):
@@ -31,6 +35,9 @@ class Ticket(models.Model):
     guest_full_name = models.CharField(max_length=100, blank=True, verbose_name="Họ tên khách vãng lai")
     guest_email = models.EmailField(blank=True, verbose_name="Email khách vãng lai")
     guest_phone_number = models.CharField(max_length=20, blank=True, verbose_name="SĐT khách vãng lai")
+    # Email / SĐT đã chuẩn hóa để ghép lịch sử khách hàng (xem users/identity.py)
+    email_key = models.CharField(max_length=254, blank=True, db_index=True, editable=False)
+    phone_key = models.CharField(max_length=20, blank=True, db_index=True, editable=False)
     subject = models.CharField(max_length=255, verbose_name="Tiêu đề", blank=True)
     incident_time = models.DateTimeField(verbose_name="Thời gian xảy ra vụ việc", null=True, blank=True)
     attachment = models.FileField(upload_to='media/ticket_attachments/', verbose_name="Tệp đính kèm", null=True, blank=True)
@@ -53,9 +60,135 @@ class Ticket(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Tóm tắt phản hồi gần nhất (phi chuẩn hóa từ TicketResponse) để trang danh sách không cần subquery.
+    # Được cập nhật trong cùng transaction khi thêm phản hồi (xem TicketResponse.save).
+    last_response_at = models.DateTimeField(null=True, blank=True, verbose_name="Thời gian phản hồi gần nhất")
+    last_response_excerpt = models.CharField(max_length=255, blank=True, verbose_name="Trích đoạn phản hồi gần nhất")
+    last_responder_name = models.CharField(max_length=255, blank=True, verbose_name="Người phản hồi gần nhất")
+    response_count = models.PositiveIntegerField(default=0, verbose_name="Số phản hồi")
+
+    # Độ dài tối đa của trích đoạn phản hồi gần nhất
+    EXCERPT_LENGTH = 255
+
+    # Mốc thời gian SLA (xem crm/sla.py)
+    first_response_at = models.DateTimeField(null=True, blank=True, verbose_name="Thời gian nhân viên phản hồi đầu tiên")
+    resolved_at = models.DateTimeField(null=True, blank=True, verbose_name="Thời gian hoàn thành")
+    status_changed_at = models.DateTimeField(null=True, blank=True, verbose_name="Thời gian đổi trạng thái gần nhất")
+    first_response_breached = models.BooleanField(default=False, verbose_name="Trễ hạn phản hồi đầu tiên")
+    resolution_breached = models.BooleanField(default=False, verbose_name="Trễ hạn hoàn thành")
+
+    # Phát hiện trùng lặp (xem crm/dedup.py)
+    possible_duplicate_of = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='possible_duplicates', verbose_name="Có thể trùng với"
+    )
+    duplicate_similarity = models.FloatField(null=True, blank=True, verbose_name="Độ tương đồng ước tính")
+    merged_into = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='merged_tickets', verbose_name="Đã gộp vào"
+    )
+
+    class Meta:
+        indexes = [
+            # Hộp thư nhân viên: lọc theo loại / trạng thái, phân trang keyset theo (created_at, id)
+            models.Index(fields=['type', '-created_at', '-id'], name='ticket_type_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='ticket_status_created_idx'),
+            # Trang "Yêu cầu / Khiếu nại của tôi"
+            models.Index(fields=['customer', '-created_at'], name='ticket_customer_created_idx'),
+        ]
+
     def __str__(self):
         return self.subject or f"Yêu cầu từ {self.customer or self.guest_full_name}"
 
+    # Các trường được ghi nhớ giá trị lúc đọc từ CSDL, để khi lưu biết trường nào thực sự thay đổi:
+    # - status: mốc đổi trạng thái / hoàn thành (SLA, xem save())
+    # - assigned_to_id + status: bộ đếm ticket đang mở của nhân viên (xem crm/signals.py)
+    # - description: tính lại chữ ký MinHash (xem crm/dedup.py)
+    TRACKED_FIELDS = ('status', 'assigned_to_id', 'description')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = instance.tracked_values()
+        return instance
+
+    def tracked_values(self, fields=None):
+        """Giá trị hiện tại của các trường theo dõi (bỏ qua trường bị defer)."""
+        names = self.TRACKED_FIELDS if fields is None else [name for name in self.TRACKED_FIELDS if name in fields]
+        return {name: self.__dict__[name] for name in names if name in self.__dict__}
+
+    @property
+    def loaded_values(self):
+        """Giá trị lúc đọc từ CSDL (hoặc lần lưu gần nhất); rỗng với ticket chưa lưu."""
+        return getattr(self, '_loaded_values', {})
+
+    def save(self, *args, **kwargs):
+        """Ghi lại thời điểm đổi trạng thái và thời điểm hoàn thành (phục vụ SLA)."""
+        update_fields = kwargs['update_fields'] = apply_contact_keys(self, kwargs.get('update_fields'))
+        if update_fields is None or 'status' in update_fields:
+            if self._state.adding or self.status != self.loaded_values.get('status'):
+                now = timezone.now()
+                self.status_changed_at = now
+                if self.status == self.Status.RESOLVED:
+                    self.resolved_at = self.resolved_at or now
+                else:
+                    self.resolved_at = None  # Mở lại ticket
+                if update_fields is not None:
+                    kwargs['update_fields'] = set(update_fields) | {'status_changed_at', 'resolved_at'}
+        # Signal post_save (crm/signals.py) so sánh với loaded_values cũ, sau đó mới cập nhật giá trị đã lưu
+        super().save(*args, **kwargs)
+        saved = kwargs['update_fields']
+        if saved is not None:
+            saved = {self._meta.get_field(name).attname for name in saved}
+        self._loaded_values = {**self.loaded_values, **self.tracked_values(saved)}
+
+    RESPONSE_SUMMARY_FIELDS = ['last_response_at', 'last_response_excerpt', 'last_responder_name', 'response_count']
+
+    @staticmethod
+    def responder_display_name(user):
+        return user.full_name or user.username
+
+    def record_response(self, response):
+        """
+        Cập nhật tóm tắt phản hồi sau khi thêm một phản hồi mới.
+        Dùng UPDATE với F() để bộ đếm đúng kể cả khi nhiều người trả lời cùng lúc,
+        sau đó nạp lại các trường trên instance đang dùng (tránh lần save() sau ghi đè giá trị cũ).
+        """
+        summary = {
+            'last_response_at': response.created_at,
+            'last_response_excerpt': response.message[:self.EXCERPT_LENGTH],
+            'last_responder_name': self.responder_display_name(response.responder),
+            'response_count': F('response_count') + 1,
+        }
+        if response.responder.role != CustomUser.Role.CUSTOMER:
+            # Phản hồi đầu tiên của nhân viên (mốc SLA); các phản hồi sau giữ nguyên giá trị cũ
+            summary['first_response_at'] = Coalesce(F('first_response_at'), Value(response.created_at))
+        Ticket.objects.filter(pk=self.pk).update(**summary)
+        self.refresh_from_db(fields=self.RESPONSE_SUMMARY_FIELDS + ['first_response_at'])
+
+    @classmethod
+    def refresh_response_summaries(cls, queryset=None):
+        """
+        Tính lại tóm tắt phản hồi từ bảng TicketResponse bằng một câu UPDATE duy nhất.
+        Dùng cho lệnh back-fill và khi phản hồi bị xóa. Trả về số ticket đã cập nhật.
+        """
+        if queryset is None:
+            queryset = cls.objects.all()
+        latest = TicketResponse.objects.filter(ticket=OuterRef('pk')).order_by('-created_at', '-pk')
+        response_count = TicketResponse.objects.filter(ticket=OuterRef('pk')).order_by().values('ticket').annotate(
+            total=Count('pk')
+        ).values('total')
+        return queryset.update(
+            last_response_at=Subquery(latest.values('created_at')[:1]),
+            last_response_excerpt=Coalesce(Subquery(latest.annotate(
+                excerpt=Substr('message', 1, cls.EXCERPT_LENGTH)
+            ).values('excerpt')[:1]), Value('')),
+            last_responder_name=Coalesce(Subquery(latest.annotate(
+                display_name=Coalesce(NullIf('responder__full_name', Value('')), 'responder__username')
+            ).values('display_name')[:1]), Value('')),
+            response_count=Coalesce(Subquery(response_count), 0),
+        )
+
 class TicketResponse(models.Model):
     """
     Lưu trữ nội dung của mỗi lần trao đổi trong một Ticket.
@@ -65,5 +198,117 @@ class TicketResponse(models.Model):
     message = models.TextField(verbose_name="Nội dung phản hồi")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    def save(self, *args, **kwargs):
+        # Lưu phản hồi và cập nhật tóm tắt trên Ticket trong cùng một transaction
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                self.ticket.record_response(self)
+
+    def __str__(self):
+        return f"Phản hồi từ {self.responder.username} cho {self.ticket.ticket_id}"
+
+class SupportAgent(models.Model):
+    """
+    Hồ sơ phân công của một nhân viên CSKH.
+    open_ticket_count được cập nhật tăng/giảm mỗi khi ticket được gán, bỏ gán hoặc đóng
+    (xem crm/signals.py), nên việc chọn người nhận không cần đếm lại ticket.
+    """
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='support_agent', verbose_name="Nhân viên")
+    is_accepting = models.BooleanField(default=True, verbose_name="Đang nhận việc tự động")
+    max_open_tickets = models.PositiveIntegerField(default=20, verbose_name="Số ticket mở tối đa")
+    open_ticket_count = models.IntegerField(default=0, verbose_name="Số ticket đang mở")
+    last_assigned_at = models.DateTimeField(null=True, blank=True, verbose_name="Lần nhận việc gần nhất")
+
+    class Meta:
+        verbose_name = "Nhân viên CSKH"
+        verbose_name_plural = "Nhân viên CSKH"
+        indexes = [
+            models.Index(fields=['is_accepting', 'open_ticket_count'], name='agent_load_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} ({self.open_ticket_count}/{self.max_open_tickets})"
+
+
+class SupportAgentSkill(models.Model):
+    """Loại khiếu nại mà nhân viên CSKH có chuyên môn xử lý (được ưu tiên khi phân công)."""
+    agent = models.ForeignKey(SupportAgent, on_delete=models.CASCADE, related_name='skills', verbose_name="Nhân viên")
+    complaint_type = models.CharField(max_length=20, choices=Ticket.ComplaintType.choices, verbose_name="Loại khiếu nại")
+
+    class Meta:
+        verbose_name = "Chuyên môn"
+        verbose_name_plural = "Chuyên môn"
+        constraints = [
+            models.UniqueConstraint(fields=['agent', 'complaint_type'], name='unique_agent_skill'),
+        ]
+
+    def __str__(self):
+        return f"{self.agent.user.username} - {self.get_complaint_type_display()}"
+
+
+class SlaMetricsSnapshot(models.Model):
+    """
+    Số liệu SLA được tính sẵn bởi lệnh sweep_ticket_sla (chạy định kỳ).
+    Dashboard chỉ đọc bản ghi mới nhất thay vì tổng hợp trên toàn bộ ticket.
+    """
+    computed_at = models.DateTimeField(db_index=True, verbose_name="Thời điểm tính")
+    window_days = models.PositiveIntegerField(verbose_name="Số ngày thống kê")
+    open_tickets = models.PositiveIntegerField(default=0, verbose_name="Ticket đang mở")
+    open_breached = models.PositiveIntegerField(default=0, verbose_name="Ticket đang mở đã trễ hạn")
+    open_complaints_breached = models.PositiveIntegerField(default=0, verbose_name="Khiếu nại đang mở đã trễ hạn")
+    tickets_in_window = models.PositiveIntegerField(default=0, verbose_name="Ticket tạo trong kỳ")
+    first_response_breached = models.PositiveIntegerField(default=0, verbose_name="Trễ hạn phản hồi đầu tiên (trong kỳ)")
+    resolution_breached = models.PositiveIntegerField(default=0, verbose_name="Trễ hạn hoàn thành (trong kỳ)")
+    avg_first_response = models.DurationField(null=True, blank=True, verbose_name="Thời gian phản hồi đầu tiên trung bình")
+    avg_resolution = models.DurationField(null=True, blank=True, verbose_name="Thời gian hoàn thành trung bình")
+
+    class Meta:
+        ordering = ['-computed_at']
+        get_latest_by = 'computed_at'
+
+    def __str__(self):
+        return f"SLA {self.computed_at:%d/%m/%Y %H:%M}"
+
+    @property
+    def first_response_compliance(self):
+        """Tỷ lệ % ticket trong kỳ được phản hồi đúng hạn."""
+        if not self.tickets_in_window:
+            return None
+        return round(100 * (self.tickets_in_window - self.first_response_breached) / self.tickets_in_window, 1)
+
+
+class TicketSignature(models.Model):
+    """
+    Chữ ký MinHash của nội dung ticket (NUM_PERM giá trị 64-bit, xem crm/dedup.py), lưu dạng nhị phân.
+    Tỷ lệ vị trí trùng nhau giữa hai chữ ký ước lượng độ tương đồng Jaccard của hai nội dung.
+    """
+    ticket = models.OneToOneField(Ticket, on_delete=models.CASCADE, primary_key=True, related_name='signature', verbose_name="Yêu cầu")
+    signature = models.BinaryField(verbose_name="Chữ ký MinHash")
+
+    class Meta:
+        verbose_name = "Chữ ký nội dung"
+        verbose_name_plural = "Chữ ký nội dung"
+
+    def __str__(self):
+        return f"MinHash #{self.ticket_id}"
+
+
+class TicketLshBucket(models.Model):
+    """
+    Chỉ mục LSH: mỗi ticket có một bucket cho mỗi dải (band) của chữ ký.
+    Hai ticket chung ít nhất một (band, bucket) là ứng viên trùng lặp; tra cứu qua index
+    nên không phải so sánh với toàn bộ ticket.
+    """
+    ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE, related_name='lsh_buckets', verbose_name="Yêu cầu")
+    band = models.PositiveSmallIntegerField(verbose_name="Dải")
+    bucket = models.BigIntegerField(verbose_name="Giá trị băm của dải")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['band', 'bucket'], name='ticket_lsh_bucket_idx'),
+        ]
+
     def __str__(self):
-        return f"Phản hồi từ {self.responder.username} cho {self.ticket.ticket_id}"
\ No newline at end of file
+        return f"#{self.ticket_id} [{self.band}] {self.bucket}"
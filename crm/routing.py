@@ -0,0 +1,78 @@
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef
+from django.utils import timezone
+
+from .models import CustomUser, SupportAgent, SupportAgentSkill, Ticket
+
+# ==============================================================================
+# TỰ ĐỘNG PHÂN CÔNG KHIẾU NẠI CHO NHÂN VIÊN CSKH
+# Chọn nhân viên CSKH đang hoạt động theo: có chuyên môn đúng loại khiếu nại trước,
+# sau đó ít ticket đang mở nhất, rồi lâu chưa nhận việc nhất.
+# Bộ đếm open_ticket_count được giữ đúng bởi signal (crm/signals.py).
+# ==============================================================================
+
+def is_open_ticket(status):
+    return status != Ticket.Status.RESOLVED
+
+
+def ensure_agent_profiles():
+    """Tạo hồ sơ SupportAgent cho các user CSKH chưa có. Trả về số hồ sơ mới."""
+    missing = CustomUser.objects.filter(role=CustomUser.Role.SUPPORT, support_agent__isnull=True)
+    created = SupportAgent.objects.bulk_create([SupportAgent(user=user) for user in missing])
+    return len(created)
+
+
+def available_agents(complaint_type=None):
+    """Các nhân viên có thể nhận thêm việc, sắp xếp theo thứ tự ưu tiên phân công."""
+    agents = SupportAgent.objects.filter(
+        is_accepting=True,
+        user__is_active=True,
+        user__role=CustomUser.Role.SUPPORT,
+        open_ticket_count__lt=F('max_open_tickets'),
+    ).annotate(
+        has_skill=Exists(SupportAgentSkill.objects.filter(agent=OuterRef('pk'), complaint_type=complaint_type or ''))
+    )
+    return agents.order_by('-has_skill', 'open_ticket_count', F('last_assigned_at').asc(nulls_first=True), 'pk')
+
+
+def assign_ticket_to_agent(ticket, agent):
+    """Gán ticket cho nhân viên (signal tự cập nhật bộ đếm của người cũ và người mới)."""
+    ticket.assigned_to_id = agent.user_id
+    if ticket.status == Ticket.Status.NEW:
+        ticket.status = Ticket.Status.IN_PROGRESS
+    ticket.save(update_fields=['assigned_to', 'status'])
+    SupportAgent.objects.filter(pk=agent.pk).update(last_assigned_at=timezone.now())
+
+
+@transaction.atomic
+def auto_assign_ticket(ticket):
+    """
+    Tự động gán một khiếu nại chưa có người xử lý.
+    Trả về SupportAgent được chọn, hoặc None nếu không có ai còn nhận việc.
+    """
+    if ticket.type != Ticket.Type.COMPLAINT or ticket.assigned_to_id or not is_open_ticket(ticket.status):
+        return None
+    agent = available_agents(ticket.complaint_type).select_for_update().first()
+    if agent is None:
+        return None
+    assign_ticket_to_agent(ticket, agent)
+    return agent
+
+
+def recount_open_tickets():
+    """
+    Tính lại open_ticket_count của mọi nhân viên từ dữ liệu thật (1 truy vấn GROUP BY),
+    dùng để sửa sai lệch của bộ đếm. Trả về số hồ sơ có giá trị thay đổi.
+    """
+    actual = dict(
+        Ticket.objects.exclude(status=Ticket.Status.RESOLVED).filter(assigned_to__isnull=False)
+        .order_by().values('assigned_to').annotate(total=Count('pk')).values_list('assigned_to', 'total')
+    )
+    changed = []
+    for agent in SupportAgent.objects.only('pk', 'user_id', 'open_ticket_count'):
+        count = actual.get(agent.user_id, 0)
+        if agent.open_ticket_count != count:
+            agent.open_ticket_count = count
+            changed.append(agent)
+    SupportAgent.objects.bulk_update(changed, ['open_ticket_count'])
+    return len(changed)
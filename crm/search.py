@@ -0,0 +1,191 @@
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from fivitel_core.fts import build_match_query, fts_enabled
+from fivitel_core.replica import read_connection
+from .models import Ticket, TicketResponse
+
+# ==============================================================================
+# TÌM KIẾM TOÀN VĂN TICKET VÀ PHẢN HỒI (SQLite FTS5)
+# - crm_ticket_fts: subject, description, resolution_details (rowid = id ticket)
+# - crm_ticketresponse_fts: message, ticket_id (rowid = id phản hồi)
+# Mỗi phản hồi chỉ được đánh chỉ mục 1 lần khi tạo, không phải ghép lại cả hội thoại.
+# Bảng được tạo ở migration 0013 và được đồng bộ qua signal (xem crm/signals.py).
+# ==============================================================================
+TICKET_FTS_TABLE = 'crm_ticket_fts'
+RESPONSE_FTS_TABLE = 'crm_ticketresponse_fts'
+
+# Trọng số bm25 cho các cột của crm_ticket_fts: subject, description, resolution_details
+TICKET_COLUMN_WEIGHTS = (5.0, 2.0, 2.0)
+
+# Ký tự đánh dấu đoạn khớp trong snippet (được thay bằng <mark> sau khi escape HTML)
+_MARK_START, _MARK_END = '\x02', '\x03'
+SNIPPET_TOKENS = 16
+
+# Các trường của Ticket có trong chỉ mục
+TICKET_INDEXED_FIELDS = {'subject', 'description', 'resolution_details'}
+
+
+def highlight_snippet(snippet):
+    """Escape nội dung người dùng rồi chuyển ký tự đánh dấu thành thẻ <mark>."""
+    html = escape(snippet or '').replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+    return mark_safe(html)
+
+
+def search_tickets(text, types, status=None, assigned_to=None, unassigned=False, limit=50):
+    """
+    Tìm ticket theo nội dung ticket và các phản hồi, trả về danh sách (ticket, snippet)
+    theo độ liên quan. Một ticket khớp nhiều chỗ chỉ xuất hiện 1 lần với đoạn khớp tốt nhất.
+    - types: các loại ticket người xem được phép thấy (theo vai trò).
+    - status / assigned_to / unassigned: bộ lọc tùy chọn, áp dụng ngay trong câu SQL.
+    """
+    if not types:
+        return []
+    if not fts_enabled():
+        return _search_tickets_fallback(text, types, status, assigned_to, unassigned, limit)
+    match = build_match_query(text)
+    if not match:
+        return []
+
+    weights = ', '.join(str(weight) for weight in TICKET_COLUMN_WEIGHTS)
+    snippet_args = f"'{_MARK_START}', '{_MARK_END}', '…', {SNIPPET_TOKENS}"
+    filters = [f"t.type IN ({', '.join(['%s'] * len(types))})"]
+    params = [match, match, *types]
+    if status:
+        filters.append('t.status = %s')
+        params.append(status)
+    if unassigned:
+        filters.append('t.assigned_to_id IS NULL')
+    elif assigned_to:
+        filters.append('t.assigned_to_id = %s')
+        params.append(assigned_to)
+    params.append(limit)
+
+    # SQLite: với MIN() trong GROUP BY, cột snippet lấy từ đúng dòng có điểm tốt nhất
+    sql = f"""
+        SELECT hits.ticket_id, MIN(hits.score), hits.snippet
+        FROM (
+            SELECT rowid AS ticket_id, bm25({TICKET_FTS_TABLE}, {weights}) AS score,
+                   snippet({TICKET_FTS_TABLE}, -1, {snippet_args}) AS snippet
+            FROM {TICKET_FTS_TABLE} WHERE {TICKET_FTS_TABLE} MATCH %s
+            UNION ALL
+            SELECT ticket_id, bm25({RESPONSE_FTS_TABLE}) AS score,
+                   snippet({RESPONSE_FTS_TABLE}, 0, {snippet_args}) AS snippet
+            FROM {RESPONSE_FTS_TABLE} WHERE {RESPONSE_FTS_TABLE} MATCH %s
+        ) AS hits
+        INNER JOIN crm_ticket t ON t.id = hits.ticket_id
+        WHERE {' AND '.join(filters)}
+        GROUP BY hits.ticket_id
+        ORDER BY MIN(hits.score)
+        LIMIT %s
+    """
+    with read_connection(Ticket).cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    tickets = Ticket.objects.select_related('customer', 'assigned_to').in_bulk([row[0] for row in rows])
+    return [(tickets[ticket_id], highlight_snippet(snippet)) for ticket_id, _score, snippet in rows if ticket_id in tickets]
+
+
+def _search_tickets_fallback(text, types, status, assigned_to, unassigned, limit):
+    """Tìm bằng icontains cho CSDL không phải SQLite (không xếp hạng, snippet là đầu mô tả)."""
+    from django.db.models import Q
+    tickets = Ticket.objects.filter(type__in=types).filter(
+        Q(subject__icontains=text) | Q(description__icontains=text)
+        | Q(resolution_details__icontains=text) | Q(responses__message__icontains=text)
+    ).distinct()
+    if status:
+        tickets = tickets.filter(status=status)
+    if unassigned:
+        tickets = tickets.filter(assigned_to__isnull=True)
+    elif assigned_to:
+        tickets = tickets.filter(assigned_to_id=assigned_to)
+    tickets = tickets.select_related('customer', 'assigned_to').order_by('-created_at')[:limit]
+    return [(ticket, escape(ticket.description[:200])) for ticket in tickets]
+
+
+# ----- Đồng bộ chỉ mục -----
+
+def index_ticket(ticket):
+    """Ghi (hoặc ghi đè) nội dung của một ticket vào chỉ mục."""
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TICKET_FTS_TABLE} WHERE rowid = %s', [ticket.pk])
+        cursor.execute(
+            f'INSERT INTO {TICKET_FTS_TABLE} (rowid, subject, description, resolution_details) VALUES (%s, %s, %s, %s)',
+            [ticket.pk, ticket.subject, ticket.description, ticket.resolution_details or ''],
+        )
+
+
+def index_response(response):
+    """Thêm một phản hồi vào chỉ mục (mỗi phản hồi chỉ ghi 1 lần khi tạo)."""
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {RESPONSE_FTS_TABLE} (rowid, message, ticket_id) VALUES (%s, %s, %s)',
+            [response.pk, response.message, response.ticket_id],
+        )
+
+
+def remove_ticket(ticket_id):
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TICKET_FTS_TABLE} WHERE rowid = %s', [ticket_id])
+
+
+def remove_response(response_id):
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {RESPONSE_FTS_TABLE} WHERE rowid = %s', [response_id])
+
+
+def remove_tickets(ticket_ids):
+    """
+    Xóa hàng loạt các ticket cùng mọi phản hồi của chúng khỏi chỉ mục (2 câu DELETE cho cả lô).
+    Dùng khi xóa ticket bằng set operation không phát signal; phải gọi trước khi xóa phản hồi.
+    """
+    if not fts_enabled() or not ticket_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(ticket_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TICKET_FTS_TABLE} WHERE rowid IN ({placeholders})', list(ticket_ids))
+        cursor.execute(
+            f'DELETE FROM {RESPONSE_FTS_TABLE} WHERE rowid IN '
+            f'(SELECT id FROM {TicketResponse._meta.db_table} WHERE ticket_id IN ({placeholders}))',
+            list(ticket_ids),
+        )
+
+
+def rebuild_index():
+    """Dựng lại toàn bộ chỉ mục. Trả về (số ticket, số phản hồi) đã đánh chỉ mục."""
+    if not fts_enabled():
+        return 0, 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TICKET_FTS_TABLE}')
+        cursor.execute(
+            f"INSERT INTO {TICKET_FTS_TABLE} (rowid, subject, description, resolution_details) "
+            f"SELECT id, subject, description, COALESCE(resolution_details, '') FROM {Ticket._meta.db_table}"
+        )
+        ticket_count = cursor.rowcount
+        cursor.execute(f'DELETE FROM {RESPONSE_FTS_TABLE}')
+        cursor.execute(
+            f"INSERT INTO {RESPONSE_FTS_TABLE} (rowid, message, ticket_id) "
+            f"SELECT id, message, ticket_id FROM {TicketResponse._meta.db_table}"
+        )
+        return ticket_count, cursor.rowcount
+
+
+def move_responses(from_ticket_id, to_ticket_id):
+    """Cập nhật ticket_id trong chỉ mục sau khi phản hồi được chuyển sang ticket khác (gộp ticket)."""
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {RESPONSE_FTS_TABLE} SET ticket_id = %s WHERE ticket_id = %s',
+            [to_ticket_id, from_ticket_id],
+        )
@@ -0,0 +1,108 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+
+from users.models import CustomUser
+from .dedup import index_ticket_signature
+from .models import SupportAgent, Ticket, TicketResponse
+from .search import TICKET_INDEXED_FIELDS, index_response, index_ticket, remove_response, remove_ticket
+
+
+def response_deleted(sender, instance, **kwargs):
+    # Tính lại tóm tắt phản hồi của ticket sau khi xóa (kể cả xóa hàng loạt trong admin)
+    ticket_id = instance.ticket_id
+    transaction.on_commit(lambda: Ticket.refresh_response_summaries(Ticket.objects.filter(pk=ticket_id)))
+
+
+post_delete.connect(response_deleted, sender=TicketResponse, dispatch_uid='ticket_response_deleted')
+
+
+# ----- Bộ đếm ticket đang mở của nhân viên CSKH (xem crm/routing.py) -----
+
+def _load_key(values):
+    """(người được gán, ticket có đang mở không) từ các giá trị trường; None nếu thiếu trường (bị defer)."""
+    if 'assigned_to_id' not in values or 'status' not in values:
+        return None
+    return values['assigned_to_id'], values['status'] != Ticket.Status.RESOLVED
+
+
+def _adjust_open_count(user_id, delta):
+    if user_id:
+        SupportAgent.objects.filter(user_id=user_id).update(open_ticket_count=F('open_ticket_count') + delta)
+
+
+def ticket_saved(sender, instance, created, raw=False, **kwargs):
+    # So với giá trị lúc đọc (Ticket.loaded_values) để chỉ cộng/trừ phần chênh lệch
+    if raw:
+        return
+    old = None if created else _load_key(instance.loaded_values)
+    new = _load_key(instance.tracked_values())
+    if new is None or old == new:
+        return
+    if old and old[0] and old[1]:
+        _adjust_open_count(old[0], -1)
+    if new[0] and new[1]:
+        _adjust_open_count(new[0], +1)
+
+
+def ticket_deleted(sender, instance, **kwargs):
+    key = _load_key(instance.tracked_values())
+    if key and key[0] and key[1]:
+        _adjust_open_count(key[0], -1)
+
+
+def support_user_saved(sender, instance, raw=False, **kwargs):
+    # Mỗi user CSKH có một hồ sơ phân công
+    if not raw and instance.role == CustomUser.Role.SUPPORT:
+        SupportAgent.objects.get_or_create(user=instance)
+
+
+post_save.connect(ticket_saved, sender=Ticket, dispatch_uid='ticket_agent_load')
+post_delete.connect(ticket_deleted, sender=Ticket, dispatch_uid='ticket_agent_load_delete')
+post_save.connect(support_user_saved, sender=CustomUser, dispatch_uid='support_agent_profile')
+
+
+# ----- Chỉ mục tìm kiếm toàn văn ticket/phản hồi (xem crm/search.py) -----
+# Ghi trong cùng transaction với thay đổi dữ liệu nên rollback cũng hoàn tác chỉ mục.
+
+def ticket_search_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Các lần lưu chỉ đổi trạng thái/người phụ trách không cần đánh chỉ mục lại
+    if raw or (update_fields and not TICKET_INDEXED_FIELDS.intersection(update_fields)):
+        return
+    index_ticket(instance)
+
+
+def ticket_search_deleted(sender, instance, **kwargs):
+    # Phản hồi bị xóa theo CASCADE cũng phát post_delete riêng (response_search_deleted)
+    remove_ticket(instance.pk)
+
+
+def response_search_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw and created:
+        index_response(instance)
+
+
+def response_search_deleted(sender, instance, **kwargs):
+    remove_response(instance.pk)
+
+
+post_save.connect(ticket_search_saved, sender=Ticket, dispatch_uid='ticket_search_save')
+post_delete.connect(ticket_search_deleted, sender=Ticket, dispatch_uid='ticket_search_delete')
+post_save.connect(response_search_saved, sender=TicketResponse, dispatch_uid='ticket_response_search_save')
+post_delete.connect(response_search_deleted, sender=TicketResponse, dispatch_uid='ticket_response_search_delete')
+
+
+# ----- Chữ ký MinHash phát hiện ticket trùng lặp (xem crm/dedup.py) -----
+
+def ticket_signature_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if created:
+        index_ticket_signature(instance)
+    elif (update_fields is None or 'description' in update_fields) \
+            and instance.description != instance.loaded_values.get('description'):
+        # Nội dung bị sửa: tính lại chữ ký và kiểm tra trùng lặp với nội dung mới
+        index_ticket_signature(instance)
+
+
+post_save.connect(ticket_signature_saved, sender=Ticket, dispatch_uid='ticket_signature_save')
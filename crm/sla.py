@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Q
+from django.utils import timezone
+
+from .models import SlaMetricsSnapshot, Ticket
+
+# ==============================================================================
+# SLA CỦA TICKET
+# Hạn được tính từ created_at theo loại ticket: (hạn phản hồi đầu tiên, hạn hoàn thành).
+# Các mốc first_response_at / resolved_at được ghi khi nhân viên phản hồi hoặc đóng ticket
+# (xem Ticket.save và Ticket.record_response); lệnh sweep_ticket_sla đánh dấu trễ hạn và
+# tính sẵn số liệu cho dashboard.
+# ==============================================================================
+SLA_TARGETS = {
+    Ticket.Type.COMPLAINT: (timedelta(hours=2), timedelta(hours=48)),
+    Ticket.Type.BOOKING_SUPPORT: (timedelta(hours=1), timedelta(hours=24)),
+    Ticket.Type.CONSULTATION: (timedelta(hours=4), timedelta(hours=72)),
+    Ticket.Type.OTHER: (timedelta(hours=8), timedelta(hours=120)),
+}
+
+# Số ngày gần nhất dùng để thống kê thời gian phản hồi / hoàn thành
+SLA_METRICS_WINDOW_DAYS = 30
+
+
+def _first_response_breach_condition(ticket_type, now):
+    """Ticket quá hạn phản hồi đầu tiên: đang mở, chưa phản hồi mà đã quá hạn; hoặc phản hồi muộn."""
+    first_response_target, _resolution_target = SLA_TARGETS[ticket_type]
+    return Q(type=ticket_type) & (
+        (Q(first_response_at__isnull=True, created_at__lt=now - first_response_target) & ~Q(status=Ticket.Status.RESOLVED))
+        | Q(first_response_at__gt=F('created_at') + first_response_target)
+    )
+
+
+def _resolution_breach_condition(ticket_type, now):
+    """Ticket quá hạn hoàn thành: đang mở mà đã quá hạn, hoặc hoàn thành muộn."""
+    _first_response_target, resolution_target = SLA_TARGETS[ticket_type]
+    return Q(type=ticket_type) & (
+        (Q(created_at__lt=now - resolution_target) & ~Q(status=Ticket.Status.RESOLVED))
+        | Q(resolved_at__gt=F('created_at') + resolution_target)
+    )
+
+
+def flag_breaches(now=None):
+    """
+    Đánh dấu các ticket mới trễ hạn bằng UPDATE theo tập (mỗi loại ticket một câu lệnh).
+    Trả về (số ticket trễ phản hồi đầu tiên, số ticket trễ hoàn thành) mới được đánh dấu.
+    """
+    now = now or timezone.now()
+    first_response_flagged = resolution_flagged = 0
+    for ticket_type in SLA_TARGETS:
+        first_response_flagged += Ticket.objects.filter(
+            _first_response_breach_condition(ticket_type, now), first_response_breached=False
+        ).update(first_response_breached=True)
+        resolution_flagged += Ticket.objects.filter(
+            _resolution_breach_condition(ticket_type, now), resolution_breached=False
+        ).update(resolution_breached=True)
+    return first_response_flagged, resolution_flagged
+
+
+def compute_metrics(now=None, window_days=SLA_METRICS_WINDOW_DAYS):
+    """Tổng hợp số liệu SLA bằng 2 truy vấn aggregate và lưu thành một SlaMetricsSnapshot."""
+    now = now or timezone.now()
+    breached = Q(first_response_breached=True) | Q(resolution_breached=True)
+
+    open_stats = Ticket.objects.exclude(status=Ticket.Status.RESOLVED).aggregate(
+        open_tickets=Count('pk'),
+        open_breached=Count('pk', filter=breached),
+        open_complaints_breached=Count('pk', filter=breached & Q(type=Ticket.Type.COMPLAINT)),
+    )
+    window_stats = Ticket.objects.filter(created_at__gte=now - timedelta(days=window_days)).aggregate(
+        tickets_in_window=Count('pk'),
+        first_response_breached=Count('pk', filter=Q(first_response_breached=True)),
+        resolution_breached=Count('pk', filter=Q(resolution_breached=True)),
+        avg_first_response=Avg(ExpressionWrapper(F('first_response_at') - F('created_at'), output_field=DurationField())),
+        avg_resolution=Avg(ExpressionWrapper(F('resolved_at') - F('created_at'), output_field=DurationField())),
+    )
+    return SlaMetricsSnapshot.objects.create(
+        computed_at=now, window_days=window_days, **open_stats, **window_stats
+    )
+
+
+def run_sla_sweep(now=None):
+    """Đánh dấu trễ hạn rồi tính lại số liệu. Trả về (đánh dấu phản hồi, đánh dấu hoàn thành, snapshot)."""
+    now = now or timezone.now()
+    first_response_flagged, resolution_flagged = flag_breaches(now)
+    return first_response_flagged, resolution_flagged, compute_metrics(now)
+
+
+def latest_metrics():
+    """Bản số liệu SLA mới nhất (hoặc None nếu lệnh quét chưa chạy lần nào)."""
+    return SlaMetricsSnapshot.objects.order_by('-computed_at').first()
@@ -1,3 +1,129 @@
+from datetime import timedelta
+
 from django.test import TestCase
 
-# Create your tests here.
+from users.models import CustomUser
+from .dedup import find_duplicates, merge_tickets, minhash_signature
+from .models import SupportAgent, Ticket, TicketLshBucket, TicketResponse
+from .search import search_tickets
+
+
+# ==============================================================================
+# PHÁT HIỆN VÀ GỘP TICKET TRÙNG LẶP (crm/dedup.py)
+# ==============================================================================
+AIRCON_COMPLAINT = (
+    "Máy lạnh phòng 305 không hoạt động từ tối qua, tôi đã báo lễ tân hai lần nhưng vẫn chưa có "
+    "kỹ thuật viên nào lên kiểm tra, phòng rất nóng và gia đình tôi không ngủ được."
+)
+AIRCON_COMPLAINT_AGAIN = (
+    "Máy lạnh phòng 305 không hoạt động từ tối qua, tôi đã báo lễ tân hai lần nhưng vẫn chưa có "
+    "kỹ thuật viên nào lên kiểm tra, phòng rất nóng và gia đình tôi không ngủ được. Mong xử lý gấp."
+)
+BILLING_COMPLAINT = "Hóa đơn tính phí minibar hai lần trong khi tôi chỉ dùng một chai nước suối."
+
+
+def make_ticket(description, **fields):
+    fields.setdefault('type', Ticket.Type.COMPLAINT)
+    fields.setdefault('guest_full_name', 'Khách vãng lai')
+    fields.setdefault('guest_email', 'khach@example.com')
+    return Ticket.objects.create(description=description, **fields)
+
+
+class DuplicateDetectionTests(TestCase):
+
+    def test_near_duplicate_is_flagged(self):
+        original = make_ticket(AIRCON_COMPLAINT)
+        duplicate = make_ticket(AIRCON_COMPLAINT_AGAIN)
+        duplicate.refresh_from_db()
+        self.assertEqual(duplicate.possible_duplicate_of, original)
+        self.assertGreaterEqual(duplicate.duplicate_similarity, 0.6)
+
+    def test_unrelated_ticket_is_not_flagged(self):
+        make_ticket(AIRCON_COMPLAINT)
+        other = make_ticket(BILLING_COMPLAINT)
+        other.refresh_from_db()
+        self.assertIsNone(other.possible_duplicate_of)
+
+    def test_threshold(self):
+        original = make_ticket(AIRCON_COMPLAINT)
+        duplicate = make_ticket(AIRCON_COMPLAINT_AGAIN)
+        signature = minhash_signature(duplicate.description)
+        [(ticket_id, similarity)] = find_duplicates(duplicate, signature)
+        self.assertEqual(ticket_id, original.pk)
+        self.assertLess(similarity, 1.0)
+        # Ngưỡng cao hơn độ tương đồng ước tính: không còn ứng viên
+        self.assertEqual(find_duplicates(duplicate, signature, threshold=similarity + 0.01), [])
+        self.assertEqual(find_duplicates(duplicate, signature, threshold=similarity), [(original.pk, similarity)])
+
+    def test_old_tickets_are_not_candidates(self):
+        original = make_ticket(AIRCON_COMPLAINT)
+        Ticket.objects.filter(pk=original.pk).update(created_at=original.created_at - timedelta(days=60))
+        duplicate = make_ticket(AIRCON_COMPLAINT_AGAIN)
+        self.assertEqual(find_duplicates(duplicate, minhash_signature(duplicate.description)), [])
+
+    def test_edited_description_is_rechecked(self):
+        original = make_ticket(AIRCON_COMPLAINT)
+        ticket = Ticket.objects.get(pk=make_ticket(BILLING_COMPLAINT).pk)
+        ticket.description = AIRCON_COMPLAINT_AGAIN
+        ticket.save()
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.possible_duplicate_of, original)
+
+
+class MergeTicketsTests(TestCase):
+
+    def setUp(self):
+        self.customer = CustomUser.objects.create_user(
+            username='khach', email='khach@example.com', phone_number='0901234567', password='x',
+        )
+        self.agent_a = CustomUser.objects.create_user(
+            username='cskh_a', email='a@example.com', phone_number='0901000001', password='x',
+            role=CustomUser.Role.SUPPORT, is_staff=True,
+        )
+        self.agent_b = CustomUser.objects.create_user(
+            username='cskh_b', email='b@example.com', phone_number='0901000002', password='x',
+            role=CustomUser.Role.SUPPORT, is_staff=True,
+        )
+        self.target = make_ticket(AIRCON_COMPLAINT, customer=self.customer, assigned_to=self.agent_a)
+        self.source = make_ticket(AIRCON_COMPLAINT_AGAIN, customer=self.customer, assigned_to=self.agent_b)
+        TicketResponse.objects.create(ticket=self.target, responder=self.customer, message="Vẫn chưa ai lên phòng.")
+        TicketResponse.objects.create(ticket=self.source, responder=self.agent_b, message="Kỹ thuật viên đang lên phòng.")
+        TicketResponse.objects.create(ticket=self.source, responder=self.customer, message="Cảm ơn, máy lạnh đã chạy lại.")
+
+    def open_count(self, user):
+        return SupportAgent.objects.get(user=user).open_ticket_count
+
+    def test_moves_responses_and_summaries(self):
+        source = Ticket.objects.get(pk=self.source.pk)
+        target = Ticket.objects.get(pk=self.target.pk)
+        self.assertEqual(merge_tickets(source, target), 2)
+
+        self.assertEqual(target.responses.count(), 3)
+        self.assertEqual(target.response_count, 3)
+        self.assertEqual(target.last_response_excerpt, "Cảm ơn, máy lạnh đã chạy lại.")
+        # Mốc phản hồi đầu tiên của nhân viên được lấy từ ticket bị gộp
+        self.assertEqual(target.first_response_at, source.first_response_at)
+
+        source.refresh_from_db()
+        self.assertEqual(source.response_count, 0)
+        self.assertEqual(source.merged_into, target)
+        self.assertEqual(source.status, Ticket.Status.RESOLVED)
+        self.assertFalse(TicketLshBucket.objects.filter(ticket=source).exists())
+        # Chỉ mục tìm kiếm trỏ phản hồi đã chuyển sang ticket đích
+        [(found, _snippet)] = search_tickets("máy lạnh chạy lại", [Ticket.Type.COMPLAINT])
+        self.assertEqual(found, target)
+
+    def test_agent_counters(self):
+        self.assertEqual(self.open_count(self.agent_a), 1)
+        self.assertEqual(self.open_count(self.agent_b), 1)
+        merge_tickets(Ticket.objects.get(pk=self.source.pk), Ticket.objects.get(pk=self.target.pk))
+        # Ticket bị gộp được đóng: người phụ trách nó bớt 1 ticket đang mở
+        self.assertEqual(self.open_count(self.agent_a), 1)
+        self.assertEqual(self.open_count(self.agent_b), 0)
+
+    def test_rejects_invalid_merges(self):
+        with self.assertRaises(ValueError):
+            merge_tickets(self.target, self.target)
+        merge_tickets(Ticket.objects.get(pk=self.source.pk), Ticket.objects.get(pk=self.target.pk))
+        with self.assertRaises(ValueError):
+            merge_tickets(Ticket.objects.get(pk=self.source.pk), Ticket.objects.get(pk=self.target.pk))
@@ -10,14 +10,21 @@ urlpatterns = [
     path('my-complaints/', views.my_complaints_view, name='my_complaints'),
     # path('my-tickets/', views.my_tickets_view, name='my_tickets'),
     path('my-tickets/<int:pk>/', views.customer_ticket_detail_view, name='customer_ticket_detail'),
+    path('my-tickets/<int:pk>/messages/stream/', views.customer_ticket_messages_stream_view, name='customer_ticket_messages_stream'),
 
     # --- URLS CHO NHÂN VIÊN ---
     path('dashboard/requests/', views.manage_requests_view, name='manage_requests'),
     
     # URL cho trang quản lý khiếu nại
     path('dashboard/complaints/', views.manage_complaints_view, name='manage_complaints'),
+    path('dashboard/search/', views.ticket_search_view, name='ticket_search'),
+    path('dashboard/customers/', views.customer_profile_view, name='customer_profile_lookup'),
+    path('dashboard/customers/<int:user_id>/', views.customer_profile_view, name='customer_profile'),
     path('dashboard/ticket/<int:pk>/', views.ticket_detail_view, name='ticket_detail'),
+    path('dashboard/ticket/<int:pk>/messages/stream/', views.ticket_messages_stream_view, name='ticket_messages_stream'),
     path('dashboard/ticket/<int:pk>/resolve/', views.resolve_ticket_view, name='resolve_ticket'),
+    path('ticket/<int:pk>/attachment/', views.ticket_attachment_view, name='ticket_attachment'),
+    path('dashboard/ticket/<int:pk>/merge/', views.merge_ticket_view, name='merge_ticket'),
     path('dashboard/ticket/<int:pk>/assign/', views.assign_ticket_view, name='assign_ticket'),
     
     # URL cho trang hỗ trợ qua Zalo
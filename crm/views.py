@@ -1,21 +1,47 @@
 from django.contrib.auth.decorators import user_passes_test
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db.models import OuterRef, Subquery
+from django.db.models import Count, F
 from django.contrib.auth.decorators import login_required
 from django.views.generic import UpdateView
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse, reverse_lazy
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.utils import timezone
 from datetime import timedelta
 
 from .forms import ConsultationRequestForm, TicketResponseForm, CustomerResponseForm, ComplaintForm, TicketEditForm, ComplaintResolutionForm
 from .models import Ticket, TicketResponse, CustomUser
+from .customer360 import get_customer_profile
+from .dedup import merge_tickets
+from .routing import auto_assign_ticket
+from .search import search_tickets
+from fivitel_core.downloads import protected_file_response
+from fivitel_core.paginators import paginate_by_keyset
+from fivitel_core.ratelimit import rate_limit
+from fivitel_core.replica import read_from_replica
+from fivitel_core.sse import format_sse_event, sse_response
+
+def is_ajax(request):
+    """Yêu cầu được gửi bằng fetch/XHR từ trang hội thoại (không tải lại trang)."""
+    return request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
+def serialize_ticket_response(response):
+    """Dữ liệu JSON của một tin nhắn trong hội thoại ticket (dùng cho SSE và phản hồi AJAX)."""
+    return {
+        'id': response.pk,
+        'responder_id': response.responder_id,
+        'responder_name': response.responder.full_name or response.responder.username,
+        'is_staff': response.responder.is_staff,
+        'message': response.message,
+        'created_at': response.created_at.isoformat(),
+        'created_display': timezone.localtime(response.created_at).strftime('%d/%m/%Y %H:%M'),
+    }
 
 # ==============================================================================
 # VIEWS DÀNH CHO KHÁCH HÀNG (USER-FACING)
 # ==============================================================================
+@rate_limit('consultation', json_response=True)
 def consultation_request_view(request):
     """
     Xử lý trang gửi Yêu cầu Tư vấn cho cả khách vãng lai và người đã đăng nhập.
@@ -80,19 +106,12 @@ def consultation_request_view(request):
 @login_required
 def my_requests_view(request):
     """Hiển thị danh sách CHỈ các Yêu cầu Tư vấn của khách hàng."""
-    
-    # Lấy phản hồi cuối cùng (tương tự logic nâng cấp trước)
-    latest_response_message = TicketResponse.objects.filter(ticket=OuterRef('pk')).order_by('-created_at').values('message')[:1]
-    latest_responder_name = TicketResponse.objects.filter(ticket=OuterRef('pk')).order_by('-created_at').values('responder__full_name')[:1]
 
-    # Lọc các loại KHÔNG PHẢI là Khiếu nại
+    # Lọc các loại KHÔNG PHẢI là Khiếu nại; phản hồi gần nhất đã có sẵn trên Ticket (last_response_*)
     tickets = Ticket.objects.filter(
         customer=request.user
     ).exclude(
         type=Ticket.Type.COMPLAINT 
-    ).annotate(
-        last_response_message=Subquery(latest_response_message),
-        last_responder_name=Subquery(latest_responder_name)
     ).order_by('-created_at')
 
     context = {
@@ -108,17 +127,11 @@ def my_complaints_view(request):
     """
     Hiển thị danh sách CHỈ các Khiếu nại của khách hàng.
     """
-    
-    latest_response_message = TicketResponse.objects.filter(ticket=OuterRef('pk')).order_by('-created_at').values('message')[:1]
-    latest_responder_name = TicketResponse.objects.filter(ticket=OuterRef('pk')).order_by('-created_at').values('responder__full_name')[:1]
-    
+
     # Chỉ lọc các loại là Khiếu nại
     tickets = Ticket.objects.filter(
         customer=request.user,
         type=Ticket.Type.COMPLAINT
-    ).annotate(
-        last_response_message=Subquery(latest_response_message),
-        last_responder_name=Subquery(latest_responder_name)
     ).order_by('-created_at')
 
     context = {
@@ -134,7 +147,7 @@ def customer_ticket_detail_view(request, pk):
     Hiển thị chi tiết một yêu cầu cho khách hàng và xử lý việc họ gửi trả lời.
     """
     ticket = get_object_or_404(Ticket, pk=pk, customer=request.user)
-    responses = ticket.responses.select_related('responder').order_by('created_at')
+    responses = list(ticket.responses.select_related('responder').order_by('pk'))
 
     # Kiểm tra quyền chỉnh sửa (chỉ trong 1h, chưa RESOLVED, và là tư vấn)
     time_limit = timedelta(hours=1)
@@ -158,9 +171,14 @@ def customer_ticket_detail_view(request, pk):
                 response.responder = request.user
                 response.save()
                 ticket.status = Ticket.Status.AWAITING_STAFF_RESPONSE
-                ticket.save()
+                ticket.save(update_fields=['status'])
+                if is_ajax(request):
+                    # Tin nhắn mới sẽ hiện ra qua luồng SSE, không cần tải lại trang
+                    return JsonResponse({'success': True, 'message': serialize_ticket_response(response)})
                 messages.success(request, "Đã gửi trả lời thành công.")
                 return redirect('customer_ticket_detail', pk=ticket.pk)
+            elif is_ajax(request):
+                return JsonResponse({'success': False, 'errors': reply_form.errors}, status=400)
 
         # 2. LƯU CHỈNH SỬA NỘI DUNG GỐC
         elif 'submit_edit' in request.POST and can_edit:
@@ -177,6 +195,7 @@ def customer_ticket_detail_view(request, pk):
         'reply_form': reply_form,
         'edit_form': edit_form,
         'can_edit': can_edit,
+        'last_response_id': responses[-1].pk if responses else 0,
     }
     return render(request, 'crm/customer_ticket_detail.html', context)
 
@@ -193,13 +212,49 @@ def is_admin(user):
     """Kiểm tra xem user có phải là Admin không."""
     return user.is_authenticated and user.role == 'ADMIN'
 
+# Số ticket trên mỗi trang hộp thư của nhân viên
+TICKETS_PER_PAGE = 25
+
+def render_ticket_inbox(request, tickets, context):
+    """
+    Render hộp thư ticket chung cho trang Yêu cầu và trang Khiếu nại.
+    - Số lượng theo từng trạng thái lấy bằng 1 truy vấn GROUP BY (trước khi lọc trạng thái).
+    - Danh sách ticket được phân trang theo keyset.
+    """
+    status_filter = request.GET.get('status')
+    if status_filter not in Ticket.Status.values:
+        status_filter = None
+
+    status_counts = dict(
+        tickets.order_by().values('status').annotate(total=Count('id')).values_list('status', 'total')
+    )
+    ticket_statuses = [
+        (value, label, status_counts.get(value, 0)) for value, label in Ticket.Status.choices
+    ]
+
+    if status_filter:
+        tickets = tickets.filter(status=status_filter)
+    page, older_cursor, newer_cursor = paginate_by_keyset(
+        tickets.select_related('customer', 'assigned_to'), request, TICKETS_PER_PAGE
+    )
+
+    context.update({
+        'tickets': page,
+        'current_filter': status_filter,
+        'ticket_statuses': ticket_statuses,
+        'total_count': sum(status_counts.values()),
+        'older_cursor': older_cursor,
+        'newer_cursor': newer_cursor,
+        'back_url_to_dashboard': True,
+    })
+    return render(request, 'crm/dashboard_tickets.html', context)
+
 @user_passes_test(is_crm_staff)
+@read_from_replica
 def manage_requests_view(request):
     """
     Hiển thị trang quản lý các yêu cầu (KHÔNG bao gồm Khiếu nại).
     """
-    status_filter = request.GET.get('status')
-
     base_query = Ticket.objects.exclude(type=Ticket.Type.COMPLAINT)
 
     if request.user.role == 'RECEPTION':
@@ -218,78 +273,153 @@ def manage_requests_view(request):
         # Dự phòng (nếu có vai trò lạ)
         tickets = Ticket.objects.none()
 
-    tickets = tickets.select_related('customer', 'assigned_to').order_by('-created_at')
-    
-    # Logic lọc trạng thái
-    if status_filter in Ticket.Status.values:
-        tickets = tickets.filter(status=status_filter)
-
-    context = {
-        'tickets': tickets,
-        'current_filter': status_filter,
-        'ticket_statuses': Ticket.Status.choices,
-        'header_title': 'Quản lý Yêu cầu',
-        'back_url_to_dashboard': True
-    }
-
-    return render(request, 'crm/dashboard_tickets.html', context)
+    return render_ticket_inbox(request, tickets, {'header_title': 'Quản lý Yêu cầu'})
 
 @user_passes_test(is_crm_staff)
+@read_from_replica
 def manage_complaints_view(request):
     """
     Hiển thị trang quản lý chỉ các KHIẾU NẠI.
     """
-    status_filter = request.GET.get('status')
-
     if request.user.role == 'RECEPTION':
         # Lễ tân không có quyền xem khiếu nại
         messages.error(request, "Bạn không có quyền truy cập trang này.")
         return redirect('staff_dashboard')
     
     # CSKH và Admin sẽ thấy tất cả Khiếu nại
-    tickets = Ticket.objects.filter(type=Ticket.Type.COMPLAINT).select_related('customer', 'assigned_to').order_by('-created_at')
+    tickets = Ticket.objects.filter(type=Ticket.Type.COMPLAINT)
 
-    # Lấy danh sách nhân viên CSKH để tự "Nhận việc"
-    staff_members = CustomUser.objects.filter(role='SUPPORT', is_active=True)
-
-    if status_filter in Ticket.Status.values:
-        tickets = tickets.filter(status=status_filter)
+    # Lấy danh sách nhân viên CSKH để phân công (chỉ Admin dùng); đánh giá 1 lần cho cả trang
+    staff_members = None
+    if request.user.role == 'ADMIN':
+        staff_members = list(
+            CustomUser.objects.filter(role='SUPPORT', is_active=True)
+            .annotate(open_load=F('support_agent__open_ticket_count'))
+            .only('pk', 'username').order_by('username')
+        )
 
     context = {
-        'tickets': tickets,
-        'current_filter': status_filter,
-        'ticket_statuses': Ticket.Status.choices,
         'header_title': 'Quản lý Khiếu nại',
         'staff_members': staff_members,
-        'back_url_to_dashboard': True
     }
-    return render(request, 'crm/dashboard_tickets.html', context)
+    return render_ticket_inbox(request, tickets, context)
+
+def staff_ticket_access_error(user, ticket):
+    """
+    Kiểm tra quyền xem ticket của nhân viên theo vai trò.
+    Trả về None nếu được phép, ngược lại trả về (thông báo lỗi, tên URL để chuyển hướng).
+    """
+    # 1. Nếu là KHIẾU NẠI (COMPLAINT)
+    if ticket.type == Ticket.Type.COMPLAINT:
+        if user.role == 'RECEPTION':
+            return "Lễ tân không có quyền xem Khiếu nại.", 'staff_dashboard'
+
+    # 2. Nếu là YÊU CẦU TƯ VẤN (CONSULTATION)
+    else:
+        if user.role == 'RECEPTION' and ticket.type != Ticket.Type.BOOKING_SUPPORT:
+            return "Bạn chỉ có quyền xem các yêu cầu Hỗ trợ Đặt phòng.", 'manage_requests'
+
+        if user.role == 'SUPPORT' and ticket.type == Ticket.Type.BOOKING_SUPPORT:
+            return "Bạn không có quyền xem các yêu cầu Hỗ trợ Đặt phòng.", 'manage_requests'
+    return None
+
+def staff_visible_ticket_types(user):
+    """Các loại ticket nhân viên được xem theo vai trò (cùng quy tắc với staff_ticket_access_error)."""
+    if user.role == 'RECEPTION':
+        return [Ticket.Type.BOOKING_SUPPORT]
+    if user.role == 'SUPPORT':
+        return [value for value in Ticket.Type.values if value != Ticket.Type.BOOKING_SUPPORT]
+    if user.role == 'ADMIN':
+        return list(Ticket.Type.values)
+    return []
+
+@user_passes_test(is_crm_staff)
+@read_from_replica
+def ticket_search_view(request):
+    """
+    Tìm kiếm toàn văn trong nội dung ticket và các phản hồi (xem crm/search.py),
+    để nhân viên tra cứu các trường hợp đã xử lý trước đó.
+    Bộ lọc: loại ticket, trạng thái, người phụ trách ('me' / 'none' / id nhân viên).
+    """
+    query = request.GET.get('q', '').strip()
+    type_filter = request.GET.get('type', '')
+    status_filter = request.GET.get('status', '')
+    assignee_filter = request.GET.get('assignee', '')
+
+    visible_types = staff_visible_ticket_types(request.user)
+    types = [type_filter] if type_filter in visible_types else visible_types
+    if status_filter not in Ticket.Status.values:
+        status_filter = ''
+
+    assigned_to, unassigned = None, False
+    if assignee_filter == 'me':
+        assigned_to = request.user.pk
+    elif assignee_filter == 'none':
+        unassigned = True
+    elif assignee_filter.isdigit():
+        assigned_to = int(assignee_filter)
+    else:
+        assignee_filter = ''
+
+    results = []
+    if query:
+        results = search_tickets(
+            query, types, status=status_filter, assigned_to=assigned_to, unassigned=unassigned
+        )
+
+    context = {
+        'query': query,
+        'results': results,
+        'type_choices': [(value, label) for value, label in Ticket.Type.choices if value in visible_types],
+        'status_choices': Ticket.Status.choices,
+        'current_type': type_filter if type_filter in visible_types else '',
+        'current_status': status_filter,
+        'current_assignee': assignee_filter,
+    }
+    return render(request, 'crm/dashboard_ticket_search.html', context)
+
+@user_passes_test(is_crm_staff)
+@read_from_replica
+def customer_profile_view(request, user_id=None):
+    """
+    Hồ sơ 360° của một khách hàng: toàn bộ đơn đặt phòng và yêu cầu CSKH,
+    ghép theo tài khoản hoặc theo email / SĐT (khách vãng lai) - xem crm/customer360.py.
+    - /dashboard/customers/<user_id>/: theo tài khoản đã đăng ký.
+    - /dashboard/customers/?email=...&phone=...: theo thông tin liên hệ của khách vãng lai.
+    """
+    user = get_object_or_404(CustomUser, pk=user_id) if user_id is not None else None
+    email = request.GET.get('email', '').strip()
+    phone = request.GET.get('phone', '').strip()
+
+    profile = get_customer_profile(user=user, email=email, phone=phone)
+    if profile is None:
+        messages.error(request, "Vui lòng cung cấp email hoặc số điện thoại của khách hàng.")
+        return redirect('staff_dashboard')
+
+    # Hồ sơ được cache chung cho mọi nhân viên; lọc ticket theo quyền xem của từng vai trò
+    visible_types = staff_visible_ticket_types(request.user)
+    context = {
+        'profile': profile,
+        'profile_user': user,
+        'tickets': [ticket for ticket in profile['tickets'] if ticket.type in visible_types],
+    }
+    return render(request, 'crm/dashboard_customer_profile.html', context)
 
 @user_passes_test(is_crm_staff)
 def ticket_detail_view(request, pk):
     """
     Hiển thị chi tiết một yêu cầu và xử lý phản hồi.
     """
-    ticket = get_object_or_404(Ticket, pk=pk)
+    ticket = get_object_or_404(Ticket.objects.select_related('possible_duplicate_of', 'merged_into'), pk=pk)
     user_role = request.user.role
 
-    # 1. Nếu là KHIẾU NẠI (COMPLAINT)
-    if ticket.type == Ticket.Type.COMPLAINT:
-        if user_role == 'RECEPTION':
-            messages.error(request, "Lễ tân không có quyền xem Khiếu nại.")
-            return redirect('staff_dashboard')
-            
-    # 2. Nếu là YÊU CẦU TƯ VẤN (CONSULTATION)
-    else:
-        if (user_role == 'RECEPTION' and ticket.type != Ticket.Type.BOOKING_SUPPORT):
-            messages.error(request, "Bạn chỉ có quyền xem các yêu cầu Hỗ trợ Đặt phòng.")
-            return redirect('manage_requests')
-        
-        if (user_role == 'SUPPORT' and ticket.type == Ticket.Type.BOOKING_SUPPORT):
-            messages.error(request, "Bạn không có quyền xem các yêu cầu Hỗ trợ Đặt phòng.")
-            return redirect('manage_requests')
+    access_error = staff_ticket_access_error(request.user, ticket)
+    if access_error:
+        error_message, redirect_to = access_error
+        messages.error(request, error_message)
+        return redirect(redirect_to)
 
-    responses = ticket.responses.select_related('responder').order_by('created_at')
+    responses = list(ticket.responses.select_related('responder').order_by('pk'))
     
     # Logic xác định URL quay lại
     if ticket.type == Ticket.Type.COMPLAINT:
@@ -323,9 +453,13 @@ def ticket_detail_view(request, pk):
                 if ticket.status == Ticket.Status.NEW:
                     ticket.status = Ticket.Status.IN_PROGRESS
                 
-                ticket.save()
+                ticket.save(update_fields=['status'])
+                if is_ajax(request):
+                    return JsonResponse({'success': True, 'message': serialize_ticket_response(response)})
                 messages.success(request, "Đã gửi phản hồi thành công.")
                 return redirect('ticket_detail', pk=ticket.pk)
+            elif is_ajax(request):
+                return JsonResponse({'success': False, 'errors': response_form.errors}, status=400)
 
         # 2. XỬ LÝ LƯU KẾT QUẢ/ĐÓNG TICKET (CHO KHIẾU NẠI)
         elif 'submit_resolution' in request.POST:
@@ -345,9 +479,60 @@ def ticket_detail_view(request, pk):
         'header_title': header_title,
         'back_url': back_url,
         'staff_members': staff_members, # Gửi danh sách CSKH (chỉ cho Khiếu nại)
+        'last_response_id': responses[-1].pk if responses else 0,
     }
     return render(request, 'crm/dashboard_ticket_detail.html', context)
 
+@user_passes_test(is_crm_staff)
+def merge_ticket_view(request, pk):
+    """
+    Xử lý cảnh báo trùng lặp của một ticket (xem crm/dedup.py):
+    - action=merge: gộp ticket này vào ticket đích (mặc định là ticket bị nghi trùng),
+      chuyển toàn bộ phản hồi sang ticket đích và đóng ticket này.
+    - action=dismiss: bỏ cảnh báo "có thể trùng".
+    """
+    if request.method != 'POST':
+        return redirect('ticket_detail', pk=pk)
+
+    ticket = get_object_or_404(Ticket, pk=pk)
+    access_error = staff_ticket_access_error(request.user, ticket)
+    if access_error:
+        error_message, redirect_to = access_error
+        messages.error(request, error_message)
+        return redirect(redirect_to)
+
+    if request.POST.get('action') == 'dismiss':
+        Ticket.objects.filter(pk=ticket.pk).update(possible_duplicate_of=None, duplicate_similarity=None)
+        messages.success(request, "Đã bỏ cảnh báo trùng lặp.")
+        return redirect('ticket_detail', pk=ticket.pk)
+
+    target_id = request.POST.get('target') or ticket.possible_duplicate_of_id
+    target = Ticket.objects.filter(pk=target_id).first() if str(target_id or '').isdigit() else None
+    if target is None or staff_ticket_access_error(request.user, target):
+        messages.error(request, "Không tìm thấy yêu cầu đích để gộp.")
+        return redirect('ticket_detail', pk=ticket.pk)
+
+    try:
+        moved = merge_tickets(ticket, target)
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect('ticket_detail', pk=ticket.pk)
+
+    messages.success(request, f"Đã gộp yêu cầu vào #{str(target.ticket_id)[:8]}... ({moved} phản hồi được chuyển).")
+    return redirect('ticket_detail', pk=target.pk)
+
+@login_required
+def ticket_attachment_view(request, pk):
+    """
+    Tải tệp đính kèm của ticket (tệp riêng tư): chủ ticket hoặc nhân viên có quyền xem ticket đó.
+    File được stream theo từng khối, hỗ trợ HTTP Range (xem fivitel_core/downloads.py).
+    """
+    ticket = get_object_or_404(Ticket, pk=pk)
+    user = request.user
+    if ticket.customer_id != user.pk and (not is_crm_staff(user) or staff_ticket_access_error(user, ticket)):
+        raise Http404("Không tìm thấy tệp đính kèm.")
+    return protected_file_response(request, ticket.attachment, as_attachment=request.GET.get('download') == '1')
+
 @user_passes_test(is_crm_staff)
 def resolve_ticket_view(request, pk):
     """
@@ -383,6 +568,9 @@ def complaint_submission_view(request):
             ticket.status = Ticket.Status.NEW
             ticket.save() # Lưu ticket vào DB
 
+            # Tự động phân công cho nhân viên CSKH phù hợp (theo chuyên môn và số việc đang xử lý)
+            auto_assign_ticket(ticket)
+
             return JsonResponse({
                 'success': True,
                 'home_url': reverse('homepage'),
@@ -433,4 +621,43 @@ def zalo_support_view(request):
     """
     Hiển thị trang thông tin hỗ trợ qua Zalo.
     """
-    return render(request, 'crm/zalo_support.html')
\ No newline at end of file
+    return render(request, 'crm/zalo_support.html')
+
+# ==============================================================================
+# LUỒNG TIN NHẮN MỚI CỦA HỘI THOẠI (SERVER-SENT EVENTS)
+# Client chỉ nhận các phản hồi có id lớn hơn con trỏ, không tải lại cả hội thoại.
+# ==============================================================================
+def get_ticket_message_changes(ticket_id):
+    """Tạo hàm lấy các phản hồi mới (id > cursor) của một ticket, dùng cho poll_event_stream."""
+    def fetch_changes(cursor):
+        responses = TicketResponse.objects.filter(
+            ticket_id=ticket_id, pk__gt=cursor
+        ).select_related('responder').order_by('pk')
+        events = []
+        for response in responses:
+            cursor = response.pk
+            events.append(format_sse_event('message', serialize_ticket_response(response), cursor))
+        return events, cursor
+    return fetch_changes
+
+def _parse_message_cursor(request):
+    """Con trỏ lấy từ header Last-Event-ID (khi tự kết nối lại) hoặc tham số ?after=."""
+    raw_cursor = request.headers.get('Last-Event-ID') or request.GET.get('after', '')
+    return int(raw_cursor) if raw_cursor.isdigit() else 0
+
+@login_required
+async def customer_ticket_messages_stream_view(request, pk):
+    """Luồng SSE tin nhắn mới cho khách hàng (chỉ ticket của chính họ)."""
+    user = await request.auser()
+    if not await Ticket.objects.filter(pk=pk, customer=user).aexists():
+        raise Http404("Không tìm thấy yêu cầu.")
+    return sse_response(request, get_ticket_message_changes(pk), _parse_message_cursor(request))
+
+@user_passes_test(is_crm_staff)
+async def ticket_messages_stream_view(request, pk):
+    """Luồng SSE tin nhắn mới cho nhân viên, cùng quy tắc phân quyền với trang chi tiết."""
+    user = await request.auser()
+    ticket = await Ticket.objects.filter(pk=pk).only('pk', 'type').afirst()
+    if ticket is None or staff_ticket_access_error(user, ticket):
+        raise Http404("Không tìm thấy yêu cầu.")
+    return sse_response(request, get_ticket_message_changes(pk), _parse_message_cursor(request))
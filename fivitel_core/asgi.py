@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+The live room-status board (Server-Sent Events) keeps connections open only
+when served through this entry point, e.g. ``uvicorn fivitel_core.asgi:application``.
 """
 
 import os
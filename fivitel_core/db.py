@@ -0,0 +1,55 @@
+import logging
+import random
+import time
+from functools import wraps
+
+from django.db import OperationalError, connections, DEFAULT_DB_ALIAS
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# THỬ LẠI GIAO DỊCH GHI KHI CSDL BÁO KHÓA / XUNG ĐỘT
+# SQLite chỉ cho 1 writer tại một thời điểm: khi busy_timeout (OPTIONS['timeout'])
+# hết mà vẫn chưa lấy được khóa ghi, giao dịch ném OperationalError
+# "database is locked". PostgreSQL có lỗi tương tự khi deadlock / serialization
+# failure. Với các lỗi này, chạy lại toàn bộ giao dịch sau một khoảng chờ ngắn
+# (backoff lũy thừa + jitter) là an toàn vì giao dịch đã bị rollback hoàn toàn.
+# ==============================================================================
+_SQLITE_LOCK_MESSAGES = ('database is locked', 'database table is locked', 'database is busy')
+_POSTGRES_RETRY_SQLSTATES = {'40001', '40P01'}  # serialization_failure, deadlock_detected
+
+
+def is_lock_error(exc):
+    """True nếu OperationalError là lỗi khóa/xung đột tạm thời, có thể thử lại."""
+    message = str(exc).lower()
+    if any(text in message for text in _SQLITE_LOCK_MESSAGES):
+        return True
+    cause = exc.__cause__
+    return getattr(cause, 'sqlstate', None) in _POSTGRES_RETRY_SQLSTATES
+
+
+def retry_on_db_lock(retries=3, delay=0.05, using=DEFAULT_DB_ALIAS):
+    """
+    Decorator cho hàm chứa trọn một giao dịch ghi (tự mở transaction.atomic() bên trong).
+    Khi gặp lỗi khóa, chạy lại hàm tối đa `retries` lần, chờ delay * 2^lần_thử (có jitter).
+    Nếu hàm đang được gọi bên trong một atomic() bên ngoài thì KHÔNG thử lại
+    (giao dịch ngoài đã hỏng, phải để lỗi nổi lên cho tầng ngoài xử lý).
+    Hàm được bọc không nên có tác dụng phụ ngoài CSDL (gửi email...) vì có thể chạy lại.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(retries + 1):
+                try:
+                    return func(*args, **kwargs)
+                except OperationalError as exc:
+                    if attempt == retries or not is_lock_error(exc) or connections[using].in_atomic_block:
+                        raise
+                    wait = delay * (2 ** attempt) * (1 + random.random())
+                    logger.warning(
+                        "%s: CSDL đang bị khóa (%s), thử lại lần %d sau %.3fs",
+                        func.__qualname__, exc, attempt + 1, wait,
+                    )
+                    time.sleep(wait)
+        return wrapper
+    return decorator
@@ -0,0 +1,121 @@
+import mimetypes
+import os
+import posixpath
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.encoding import escape_uri_path
+from django.views.static import serve
+from ranged_response import RangedFileReader, RangedFileResponse
+
+# ==============================================================================
+# TẢI XUỐNG TỆP RIÊNG TƯ (tệp đính kèm ticket, ảnh bằng chứng thanh toán)
+# View gọi kiểm tra quyền trước, sau đó dùng protected_file_response() để:
+# - Tự stream theo từng khối và hỗ trợ HTTP Range (mặc định), hoặc
+# - Giao cho web server gửi file (X-Accel-Redirect của Nginx / X-Sendfile của Apache)
+#   khi cấu hình PROTECTED_MEDIA_SERVER.
+# public_media() phục vụ thư mục media/ công khai khi DEBUG (xem fivitel_core/urls.py).
+# ==============================================================================
+PUBLIC_MEDIA_PREFIX = 'media/'
+DOWNLOAD_BLOCK_SIZE = 64 * 1024
+
+
+class StreamingRangedFileReader(RangedFileReader):
+    """
+    RangedFileReader lấy kích thước file bằng seek thay vì đọc toàn bộ nội dung
+    (bản gốc gọi len(f.read()), nạp cả file vào bộ nhớ worker).
+    """
+
+    def __init__(self, file_like, start=0, stop=float('inf'), block_size=None):
+        self.f = file_like
+        self.f.seek(0, os.SEEK_END)
+        self.size = self.f.tell()
+        self.f.seek(0)
+        self.block_size = block_size or DOWNLOAD_BLOCK_SIZE
+        self.start = start
+        self.stop = stop
+
+    def __iter__(self):
+        self.f.seek(self.start)
+        position = self.start
+        while position < self.stop:
+            data = self.f.read(min(self.block_size, self.stop - position))
+            if not data:
+                break
+            yield data
+            position += len(data)
+
+
+class StreamingRangedFileResponse(RangedFileResponse):
+    """RangedFileResponse dùng StreamingRangedFileReader, luôn có Accept-Ranges và Content-Length."""
+
+    def __init__(self, request, file, *args, **kwargs):
+        self.ranged_file = StreamingRangedFileReader(file)
+        FileResponse.__init__(self, self.ranged_file, *args, **kwargs)
+        self._resource_closers.append(file.close)
+        self['Accept-Ranges'] = 'bytes'
+        self['Content-Length'] = self.ranged_file.size
+        if 'HTTP_RANGE' in request.META:
+            self.add_range_headers(request.META['HTTP_RANGE'])
+
+
+def _content_disposition(filename, as_attachment):
+    disposition = 'attachment' if as_attachment else 'inline'
+    try:
+        filename.encode('ascii')
+        return f'{disposition}; filename="{filename}"'
+    except UnicodeEncodeError:
+        return f"{disposition}; filename*=utf-8''{quote(filename)}"
+
+
+def protected_file_response(request, field_file, as_attachment=False):
+    """
+    Trả về response gửi nội dung của một FileField/ImageField (đã kiểm tra quyền ở view).
+    Raise Http404 nếu field trống hoặc file không còn trên đĩa.
+    """
+    if not field_file:
+        raise Http404("Không có tệp.")
+    filename = os.path.basename(field_file.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    offload = getattr(settings, 'PROTECTED_MEDIA_SERVER', '')
+    if offload:
+        # Web server đọc file và tự xử lý Range; Django chỉ trả header
+        response = HttpResponse(content_type=content_type)
+        if offload == 'nginx':
+            internal_url = settings.PROTECTED_MEDIA_INTERNAL_URL.rstrip('/') + '/'
+            response['X-Accel-Redirect'] = escape_uri_path(internal_url + field_file.name)
+        elif offload == 'apache':
+            response['X-Sendfile'] = field_file.path
+        else:
+            raise ImproperlyConfigured(
+                f"PROTECTED_MEDIA_SERVER không hợp lệ: {offload!r} (chỉ nhận '', 'nginx' hoặc 'apache')."
+            )
+        response['Content-Disposition'] = _content_disposition(filename, as_attachment)
+        return response
+
+    try:
+        file = field_file.storage.open(field_file.name, 'rb')
+    except FileNotFoundError:
+        raise Http404("Tệp không tồn tại.")
+    response = StreamingRangedFileResponse(request, file, content_type=content_type)
+    response['Content-Disposition'] = _content_disposition(filename, as_attachment)
+    # Tệp riêng tư: không cho proxy/CDN dùng chung cache
+    response['Cache-Control'] = 'private, max-age=0'
+    return response
+
+
+def public_media(request, path):
+    """
+    Phục vụ tệp công khai trong media/ (chỉ dùng khi DEBUG).
+    Chuẩn hóa đường dẫn trước khi kiểm tra (bỏ '..', '//', './'): chỉ nhận tệp nằm trong media/
+    và không thuộc thư mục riêng tư PROTECTED_MEDIA_PREFIXES (MEDIA_ROOT là thư mục gốc dự án).
+    """
+    normalized = posixpath.normpath(path.replace('\\', '/')).lstrip('/')
+    if not normalized.startswith(PUBLIC_MEDIA_PREFIX) or any(
+        normalized.startswith(prefix) for prefix in settings.PROTECTED_MEDIA_PREFIXES
+    ):
+        raise Http404("Không tìm thấy tệp.")
+    return serve(request, normalized, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,24 @@
+import re
+
+from django.db import connection
+
+# ==============================================================================
+# TIỆN ÍCH TÌM KIẾM TOÀN VĂN DÙNG CHUNG (SQLite FTS5)
+# Dùng cho chỉ mục dịch vụ (services/search.py) và ticket CSKH (crm/search.py).
+# ==============================================================================
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_enabled():
+    """Chỉ dùng FTS5 khi CSDL là SQLite; CSDL khác dùng icontains dự phòng."""
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(text):
+    """
+    Chuyển chuỗi người dùng nhập thành biểu thức MATCH an toàn cho FTS5.
+    Mỗi từ được đặt trong ngoặc kép (tránh lỗi cú pháp) và thêm '*' để khớp tiền tố,
+    ví dụ 'mat xa' -> '"mat"* "xa"*'. Trả về '' nếu không có từ nào.
+    """
+    tokens = _TOKEN_RE.findall(text or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
@@ -0,0 +1,112 @@
+import base64
+from datetime import datetime
+
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+
+def estimate_table_rows(model, using='default'):
+    """
+    Ước lượng số dòng của một bảng từ thống kê của CSDL (không quét bảng).
+    Trả về None nếu CSDL không hỗ trợ hoặc chưa có thống kê (VD: SQLite chưa chạy ANALYZE).
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    vendor = connection.vendor
+
+    if vendor == 'postgresql':
+        sql, params = "SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table]
+    elif vendor == 'mysql':
+        sql, params = "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s", [table]
+    elif vendor == 'sqlite':
+        # Giá trị đầu tiên của cột 'stat' là số dòng ước lượng (có sau khi ANALYZE)
+        sql, params = "SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table]
+    else:
+        return None
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+
+    if not row or row[0] is None:
+        return None
+    try:
+        estimate = int(str(row[0]).split()[0])
+    except (TypeError, ValueError):
+        return None
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator dùng số dòng ước lượng thay cho COUNT(*) khi danh sách không bị lọc
+    và bảng đủ lớn. Danh sách đã lọc (tìm kiếm, bộ lọc) vẫn đếm chính xác.
+    """
+    # Dưới ngưỡng này COUNT(*) đủ nhanh, ưu tiên con số chính xác
+    estimate_threshold = 10000
+
+    @cached_property
+    def count(self):
+        object_list = self.object_list
+        if isinstance(object_list, QuerySet) and not object_list.query.where:
+            estimate = estimate_table_rows(object_list.model, object_list.db)
+            if estimate is not None and estimate >= self.estimate_threshold:
+                return estimate
+        return super().count
+
+
+# ----- Phân trang keyset theo (created_at, id) giảm dần -----
+# Dùng cho hộp thư ticket (crm) và danh sách đơn đặt phòng của lễ tân (booking):
+# mỗi trang chỉ đọc per_page + 1 dòng qua index, không OFFSET và không COUNT(*).
+
+def encode_cursor(obj):
+    """Mã hóa vị trí (created_at, id) của một bản ghi thành chuỗi dùng trên URL."""
+    raw = f"{obj.created_at.isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Giải mã cursor; trả về (created_at, id) hoặc None nếu cursor không hợp lệ."""
+    if not cursor:
+        return None
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeError):
+        return None
+
+
+def paginate_by_keyset(queryset, request, per_page):
+    """
+    Phân trang theo keyset trên (created_at, id) giảm dần, thay cho OFFSET.
+    - ?after=<cursor>: trang cũ hơn cursor; ?before=<cursor>: trang mới hơn cursor.
+    Trả về (danh sách bản ghi của trang, cursor trang cũ hơn, cursor trang mới hơn).
+    """
+    after = decode_cursor(request.GET.get('after'))
+    before = decode_cursor(request.GET.get('before'))
+
+    if before:
+        created_at, pk = before
+        page = list(queryset.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+        ).order_by('created_at', 'pk')[:per_page + 1])
+        has_newer = len(page) > per_page
+        page = page[:per_page][::-1]
+        has_older = True
+    else:
+        if after:
+            created_at, pk = after
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+        page = list(queryset.order_by('-created_at', '-pk')[:per_page + 1])
+        has_older = len(page) > per_page
+        page = page[:per_page]
+        has_newer = after is not None
+
+    older_cursor = encode_cursor(page[-1]) if page and has_older else None
+    newer_cursor = encode_cursor(page[0]) if page and has_newer else None
+    return page, older_cursor, newer_cursor
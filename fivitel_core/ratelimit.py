@@ -0,0 +1,203 @@
+import hashlib
+import math
+import time
+from dataclasses import dataclass
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.shortcuts import render
+
+# ==============================================================================
+# GIỚI HẠN TẦN SUẤT (RATE LIMIT) CHO CÁC VIEW GHI DỮ LIỆU CÔNG KHAI
+# Bộ đếm cửa sổ trượt xấp xỉ: mỗi chính sách giữ 2 bộ đếm cửa sổ cố định trong cache
+# (cửa sổ hiện tại và cửa sổ trước); số yêu cầu ước tính =
+#     trước * (phần cửa sổ trước còn nằm trong khoảng trượt) + hiện tại.
+# Mỗi yêu cầu chỉ tốn 1 lần get_many cho cả nhóm + 1 lần incr mỗi chính sách (O(1)),
+# không lưu danh sách thời điểm như sliding log. Tăng trước rồi mới so với giới hạn (incr
+# nguyên tử) để các yêu cầu đồng thời không cùng lọt qua; bị từ chối thì decr hoàn lại.
+# Chính sách theo từng nhóm view nằm ở settings.RATE_LIMITS, ví dụ:
+#     'consultation': [('ip', '5/10m'), ('user', '10/h')]
+# Khóa: 'ip' (địa chỉ client), 'user' (tài khoản đã đăng nhập),
+#       'post:<tên trường>' (giá trị trường form, ví dụ email nhận mã OTP).
+# ==============================================================================
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@dataclass(frozen=True)
+class RateLimitExceeded:
+    group: str
+    scope: str
+    retry_after: int
+
+
+def parse_rate(rate):
+    """'5/10m' -> (5, 600); '30/h' -> (30, 3600)."""
+    count, period = rate.split('/')
+    unit = period[-1]
+    multiplier = int(period[:-1] or 1)
+    return int(count), multiplier * _PERIODS[unit]
+
+
+def client_ip(request):
+    """
+    Địa chỉ IP của client. Khi chạy sau RATE_LIMIT_PROXY_COUNT reverse proxy tin cậy,
+    lấy địa chỉ tương ứng từ cuối X-Forwarded-For (phần đầu header do client tự đặt được).
+    """
+    proxy_count = getattr(settings, 'RATE_LIMIT_PROXY_COUNT', 0)
+    if proxy_count:
+        forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        if len(forwarded) >= proxy_count:
+            return forwarded[-proxy_count]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def identity_for(request, scope):
+    """Giá trị nhận diện theo khóa của chính sách; None nếu không áp dụng (vd. khách chưa đăng nhập)."""
+    if scope == 'ip':
+        return client_ip(request) or None
+    if scope == 'user':
+        return str(request.user.pk) if request.user.is_authenticated else None
+    if scope.startswith('post:'):
+        value = request.POST.get(scope[5:], '').strip().lower()
+        return value or None
+    raise ValueError(f"Khóa rate limit không hợp lệ: {scope}")
+
+
+def _cache_key(group, scope, identity, period, window):
+    # Băm giá trị nhận diện: khóa cache ngắn, không chứa ký tự đặc biệt hay email thô.
+    # Khóa gồm cả độ dài chu kỳ: 2 chính sách cùng scope (vd. 'ip' 5/10m và 20/d) không dùng chung bộ đếm
+    digest = hashlib.sha256(identity.encode()).hexdigest()[:32]
+    return f'ratelimit:{group}:{scope}:{period}:{digest}:{window}'
+
+
+@dataclass(frozen=True)
+class _Window:
+    """Cặp bộ đếm (cửa sổ hiện tại, cửa sổ trước) của một chính sách tại thời điểm `now`."""
+    scope: str
+    limit: int
+    period: int
+    elapsed: float
+    current_key: str
+    previous_key: str
+
+
+def _window(group, scope, identity, rate, now):
+    limit, period = parse_rate(rate)
+    window = int(now // period)
+    return _Window(
+        scope, limit, period, (now % period) / period,
+        _cache_key(group, scope, identity, period, window), _cache_key(group, scope, identity, period, window - 1),
+    )
+
+
+def _evaluate(window, previous, current):
+    """None nếu được phép, ngược lại số giây cần chờ. `current` đã gồm cả yêu cầu đang xét."""
+    if previous * (1 - window.elapsed) + current > window.limit:
+        return _retry_after(window.limit, window.period, previous, current - 1, window.elapsed)
+    return None
+
+
+def _increment(window):
+    """Tăng bộ đếm cửa sổ hiện tại (nguyên tử trong cache), trả về giá trị sau khi tăng."""
+    # Bộ đếm sống 2 chu kỳ để còn làm "cửa sổ trước" của chu kỳ sau
+    cache.add(window.current_key, 0, window.period * 2)
+    try:
+        return cache.incr(window.current_key)
+    except ValueError:
+        # Khóa vừa hết hạn giữa add và incr
+        cache.set(window.current_key, 1, window.period * 2)
+        return 1
+
+
+def _release(window):
+    """Hoàn lại lượt đã tăng cho yêu cầu bị từ chối."""
+    try:
+        cache.decr(window.current_key)
+    except ValueError:
+        pass  # Khóa đã hết hạn: không còn gì để hoàn lại
+
+
+def hit(group, scope, identity, rate, now=None):
+    """
+    Ghi nhận một yêu cầu theo cửa sổ trượt cho một chính sách.
+    Trả về None nếu được phép, ngược lại số giây cần chờ (yêu cầu bị từ chối không được đếm).
+    """
+    window = _window(group, scope, identity, rate, time.time() if now is None else now)
+    previous = cache.get(window.previous_key, 0)
+    retry_after = _evaluate(window, previous, _increment(window))
+    if retry_after is not None:
+        _release(window)
+    return retry_after
+
+
+def _retry_after(limit, period, previous, current, elapsed):
+    """Số giây tới khi số ước tính giảm đủ để nhận thêm 1 yêu cầu."""
+    if current + 1 > limit:
+        # Cửa sổ hiện tại đã đầy: chờ sang cửa sổ sau, khi đó nó trở thành "cửa sổ trước"
+        needed = 1 - (limit - 1) / current if current else 0
+        seconds = (1 - elapsed) * period + needed * period
+    else:
+        needed = 1 - (limit - current - 1) / previous
+        seconds = (needed - elapsed) * period
+    return max(1, math.ceil(seconds))
+
+
+def check_rate_limits(request, group, now=None):
+    """
+    Kiểm tra lần lượt các chính sách của nhóm; trả về RateLimitExceeded đầu tiên bị vượt hoặc None.
+    Tăng bộ đếm trước rồi so với giá trị incr trả về, nên giới hạn vẫn đúng khi nhiều yêu cầu
+    đến đồng thời; khi bị từ chối, các bộ đếm đã tăng được hoàn lại (yêu cầu bị từ chối không tốn lượt).
+    """
+    if not getattr(settings, 'RATE_LIMIT_ENABLED', True):
+        return None
+    now = time.time() if now is None else now
+    windows = []
+    for scope, rate in getattr(settings, 'RATE_LIMITS', {}).get(group, []):
+        identity = identity_for(request, scope)
+        if identity is not None:
+            windows.append(_window(group, scope, identity, rate, now))
+    if not windows:
+        return None
+
+    # Cửa sổ trước đã đóng (không còn tăng), đọc một lần cho mọi chính sách
+    previous_counts = cache.get_many([window.previous_key for window in windows])
+    counted = []
+    for window in windows:
+        current = _increment(window)
+        counted.append(window)
+        retry_after = _evaluate(window, previous_counts.get(window.previous_key, 0), current)
+        if retry_after is not None:
+            for bumped in counted:
+                _release(bumped)
+            return RateLimitExceeded(group, window.scope, retry_after)
+    return None
+
+
+def rate_limited_response(request, exceeded, json_response=False):
+    message = f"Bạn đã gửi quá nhiều yêu cầu. Vui lòng thử lại sau {exceeded.retry_after} giây."
+    if json_response:
+        response = JsonResponse({'success': False, 'message': message, 'errors': {'__all__': [message]}}, status=429)
+    else:
+        response = render(request, 'ratelimited.html', {'message': message, 'retry_after': exceeded.retry_after}, status=429)
+    response['Retry-After'] = str(exceeded.retry_after)
+    return response
+
+
+def rate_limit(group, methods=('POST',), json_response=False):
+    """
+    Decorator áp dụng chính sách settings.RATE_LIMITS[group] cho view.
+    Chỉ tính các yêu cầu có method trong methods (mặc định chỉ POST: xem form thì không bị giới hạn).
+    Vượt giới hạn -> 429 kèm header Retry-After (JSON nếu json_response, ngược lại trang HTML).
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            if request.method in methods:
+                exceeded = check_rate_limits(request, group)
+                if exceeded:
+                    return rate_limited_response(request, exceeded, json_response)
+            return view_func(request, *args, **kwargs)
+        return _wrapped
+    return decorator
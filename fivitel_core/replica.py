@@ -0,0 +1,126 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections, router
+
+# ==============================================================================
+# ĐỌC TỪ BẢN SAO (READ REPLICA) CHO DASHBOARD / BÁO CÁO
+# - Chỉ các view đọc nặng được đánh dấu (@read_from_replica / ReplicaReadMixin)
+#   mới đọc từ alias 'replica'; mọi thao tác ghi và mọi view khác dùng 'default'.
+# - Read-your-writes: sau một request có ghi dữ liệu, phiên (session) bị "ghim"
+#   vào 'default' trong REPLICA_PIN_SECONDS giây, để nhân viên vừa sửa xong
+#   không thấy dữ liệu cũ do bản sao còn trễ.
+# - Khi settings.DATABASES không có 'replica', router và middleware không làm gì.
+# Cấu hình: REPLICA_DATABASE_URL (xem settings.py). Khi phát triển với SQLite,
+# đồng bộ bản sao bằng lệnh: python manage.py sync_sqlite_replica --interval 2
+# ==============================================================================
+REPLICA_DB_ALIAS = 'replica'
+PIN_SESSION_KEY = 'db_pinned_until'
+
+_use_replica = ContextVar('use_replica', default=False)
+_pinned = ContextVar('replica_pinned', default=False)
+_wrote = ContextVar('replica_wrote', default=False)
+
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+class ReplicaRouter:
+    """Router: đọc từ 'replica' khi đang trong view đọc-bản-sao và phiên không bị ghim."""
+
+    def db_for_read(self, model, **hints):
+        if (
+            _use_replica.get() and not _pinned.get() and replica_configured()
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block  # Giao dịch đang mở phải đọc dữ liệu của chính nó
+        ):
+            return REPLICA_DB_ALIAS
+        # Trả về rõ ràng để Django không "đi theo" _state.db của object đã đọc từ bản sao
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Bản sao nhận schema từ CSDL chính (replication / sync_sqlite_replica), không migrate riêng
+        return False if db == REPLICA_DB_ALIAS else None
+
+
+@contextmanager
+def reading_from_replica():
+    """Các truy vấn đọc trong khối này đi tới bản sao (nếu có và phiên không bị ghim)."""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def read_connection(model):
+    """Kết nối dùng cho truy vấn SQL thô chỉ đọc trên bảng của `model` (theo router)."""
+    return connections[router.db_for_read(model)]
+
+
+def read_from_replica(view_func):
+    """Decorator cho function view chỉ đọc: request GET/HEAD được phục vụ từ bản sao."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view_func(request, *args, **kwargs)
+        with reading_from_replica():
+            return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaReadMixin:
+    """Mixin cho class-based view chỉ đọc (ListView...), tương đương @read_from_replica."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        with reading_from_replica():
+            response = super().dispatch(request, *args, **kwargs)
+            # TemplateResponse render lười: render ngay để truy vấn trong template cũng đọc từ bản sao
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()
+            return response
+
+
+class ReplicaPinningMiddleware:
+    """
+    Ghim phiên vào CSDL chính trong một khoảng ngắn sau mỗi request có ghi dữ liệu
+    (router ghi nhận db_for_write, hoặc method không an toàn như POST).
+    Đặt sau SessionMiddleware.
+    """
+
+    def __init__(self, get_response):
+        if not replica_configured():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+
+    def __call__(self, request):
+        pinned_token = _pinned.set(time.time() < request.session.get(PIN_SESSION_KEY, 0))
+        wrote_token = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            wrote = _wrote.get() or request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+        finally:
+            _pinned.reset(pinned_token)
+            _wrote.reset(wrote_token)
+
+        # Chỉ ghim phiên đã tồn tại (nhân viên đăng nhập), không tạo session mới cho khách vãng lai
+        if wrote and request.session.session_key:
+            request.session[PIN_SESSION_KEY] = time.time() + self.pin_seconds
+        return response
@@ -0,0 +1,146 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('fivitel.sql')
+
+# ==============================================================================
+# ĐO TRUY VẤN SQL THEO TỪNG REQUEST VÀ PHÁT HIỆN N+1
+# - Gắn execute_wrapper vào mọi kết nối CSDL trong lúc view chạy: đếm số truy vấn,
+#   tổng thời gian SQL và số lần lặp lại của từng "dạng" truy vấn (SQL đã bỏ tham số).
+# - Một dạng truy vấn lặp lại >= SQL_N_PLUS_ONE_THRESHOLD lần trong 1 request
+#   được coi là N+1 (thường là truy cập quan hệ trong vòng lặp template).
+# - Nhân viên (is_staff) nhận header X-SQL-Stats, ví dụ:
+#     X-SQL-Stats: queries=14; time=8.2ms; repeated=2; n+1=crm_ticket x11
+# - Số liệu cộng dồn theo view được ghi log (logger 'fivitel.sql') mỗi
+#   SQL_STATS_LOG_INTERVAL giây; request có N+1 được cảnh báo ngay.
+# Bật/tắt bằng SQL_INSTRUMENTATION (mặc định theo DEBUG).
+# ==============================================================================
+_IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+_NUMBER_RE = re.compile(r'\b\d+\b')
+_QUOTED_RE = re.compile(r"'(?:[^']|'')*'")
+_FROM_RE = re.compile(r'\bFROM\s+"?(\w+)"?', re.IGNORECASE)
+
+# Khóa thống kê chung cho request không khớp URL nào (404, quét đường dẫn...):
+# không dùng request.path để số khóa trong view_stats không tăng theo số URL lạ
+UNRESOLVED_VIEW = '<unresolved>'
+
+
+def query_shape(sql):
+    """Chuẩn hóa SQL thành dạng: gộp danh sách IN (...) và thay hằng số/chuỗi bằng '?'."""
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    sql = _QUOTED_RE.sub('?', sql)
+    return _NUMBER_RE.sub('?', sql)
+
+
+def shape_label(shape):
+    """Nhãn ngắn cho header/log: tên bảng đầu tiên trong FROM (hoặc đầu câu SQL)."""
+    match = _FROM_RE.search(shape)
+    return match.group(1) if match else shape[:40]
+
+
+@dataclass
+class RequestQueries:
+    count: int = 0
+    duration: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.shapes[query_shape(sql)] += 1
+
+    def repeated(self):
+        """Các dạng truy vấn chạy nhiều hơn 1 lần, nhiều nhất trước."""
+        return [(shape, times) for shape, times in self.shapes.most_common() if times > 1]
+
+
+@dataclass
+class ViewStats:
+    requests: int = 0
+    queries: int = 0
+    duration: float = 0.0
+    max_queries: int = 0
+    n_plus_one: int = 0
+
+
+class SqlStatsMiddleware:
+    """Middleware đo SQL cho từng request; đặt sau AuthenticationMiddleware."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SQL_INSTRUMENTATION', settings.DEBUG):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'SQL_N_PLUS_ONE_THRESHOLD', 10)
+        self.log_interval = getattr(settings, 'SQL_STATS_LOG_INTERVAL', 60)
+        self.lock = threading.Lock()
+        self.view_stats = {}
+        self.last_flush = time.monotonic()
+
+    def __call__(self, request):
+        queries = RequestQueries()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(queries))
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = (match.view_name or match._func_path) if match else UNRESOLVED_VIEW
+        suspects = [(shape, times) for shape, times in queries.repeated() if times >= self.threshold]
+        if suspects:
+            shape, times = suspects[0]
+            logger.warning(
+                "N+1 nghi vấn ở %s (%s %s): %d truy vấn, dạng lặp %d lần: %s",
+                view_name, request.method, request.path, queries.count, times, shape[:300],
+            )
+        self.record(view_name, queries, bool(suspects))
+
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated and user.is_staff:
+            response['X-SQL-Stats'] = self.format_header(queries, suspects)
+        return response
+
+    def format_header(self, queries, suspects):
+        parts = [
+            f"queries={queries.count}",
+            f"time={queries.duration * 1000:.1f}ms",
+            f"repeated={len(queries.repeated())}",
+        ]
+        if suspects:
+            parts.append("n+1=" + ",".join(f"{shape_label(shape)} x{times}" for shape, times in suspects[:3]))
+        return "; ".join(parts)
+
+    def record(self, view_name, queries, has_n_plus_one):
+        with self.lock:
+            stats = self.view_stats.setdefault(view_name, ViewStats())
+            stats.requests += 1
+            stats.queries += queries.count
+            stats.duration += queries.duration
+            stats.max_queries = max(stats.max_queries, queries.count)
+            stats.n_plus_one += has_n_plus_one
+            if time.monotonic() - self.last_flush < self.log_interval:
+                return
+            view_stats, self.view_stats = self.view_stats, {}
+            self.last_flush = time.monotonic()
+        self.flush(view_stats)
+
+    def flush(self, view_stats):
+        """Ghi 1 dòng log cho mỗi view, view tốn nhiều thời gian SQL nhất trước."""
+        for view_name, stats in sorted(view_stats.items(), key=lambda item: -item[1].duration):
+            logger.info(
+                "%s: %d request, TB %.1f truy vấn (max %d), TB %.1fms SQL, %d request có N+1",
+                view_name, stats.requests, stats.queries / stats.requests, stats.max_queries,
+                stats.duration * 1000 / stats.requests, stats.n_plus_one,
+            )
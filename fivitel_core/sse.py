@@ -0,0 +1,60 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+
+# ==============================================================================
+# TIỆN ÍCH SERVER-SENT EVENTS DÙNG CHUNG
+# Dùng cho bảng trạng thái phòng (booking) và hội thoại ticket (crm).
+# Kết nối chỉ được giữ lâu dài khi chạy qua ASGI (fivitel_core/asgi.py).
+# ==============================================================================
+SSE_POLL_SECONDS = 2      # Chu kỳ kiểm tra thay đổi trong DB
+SSE_MAX_SECONDS = 300     # Đóng kết nối định kỳ, trình duyệt sẽ tự kết nối lại
+SSE_RETRY_MS = 3000       # Thời gian chờ trước khi EventSource kết nối lại
+
+
+def format_sse_event(event, data, event_id=None):
+    """Định dạng một sự kiện theo chuẩn text/event-stream."""
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def poll_event_stream(fetch_changes, cursor, keep_open,
+                            poll_seconds=SSE_POLL_SECONDS, max_seconds=SSE_MAX_SECONDS, retry_ms=SSE_RETRY_MS):
+    """
+    Generator bất đồng bộ: gọi fetch_changes(cursor) -> (danh sách sự kiện đã định dạng, cursor mới),
+    gửi các sự kiện rồi ngủ, lặp lại đến khi hết thời gian.
+    Khi không chạy qua ASGI (keep_open=False) chỉ gửi 1 lượt rồi đóng để không giữ worker.
+    """
+    yield f"retry: {retry_ms}\n\n"
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_seconds
+
+    while True:
+        events, cursor = await sync_to_async(fetch_changes)(cursor)
+        for event in events:
+            yield event
+        if not keep_open or loop.time() >= deadline:
+            break
+        if not events:
+            # Giữ kết nối sống qua proxy
+            yield ": keep-alive\n\n"
+        await asyncio.sleep(poll_seconds)
+
+
+def sse_response(request, fetch_changes, cursor, **options):
+    """Tạo StreamingHttpResponse text/event-stream từ hàm lấy thay đổi và con trỏ ban đầu."""
+    # Chỉ giữ kết nối lâu dài khi chạy qua ASGI
+    keep_open = hasattr(request, 'scope')
+    response = StreamingHttpResponse(
+        poll_event_stream(fetch_changes, cursor, keep_open, **options),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no' # Tắt buffer của Nginx
+    return response
@@ -15,11 +15,11 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from users import views as user_views
 from django.conf import settings
-from django.conf.urls.static import static
 from booking.views import homepage
+from fivitel_core.downloads import public_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -36,4 +36,8 @@ urlpatterns = [
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    # Chỉ phục vụ thư mục media/ công khai (ảnh phòng, dịch vụ...); public_media chuẩn hóa đường dẫn
+    # và chặn tệp riêng tư (PROTECTED_MEDIA_PREFIXES), chỉ tải qua view có kiểm tra quyền
+    urlpatterns += [
+        re_path(r'^(?P<path>media/.+)$', public_media),
+    ]
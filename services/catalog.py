@@ -0,0 +1,177 @@
+import threading
+import uuid
+from dataclasses import dataclass
+from decimal import Decimal
+from types import MappingProxyType
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch
+from django.urls import reverse
+
+# Khóa lưu "phiên bản" hiện tại của danh mục (loại phòng, hạng phòng, dịch vụ...)
+CATALOG_VERSION_KEY = 'catalog_version'
+# Thời gian giữ các fragment đã render; khi danh mục thay đổi, phiên bản mới làm fragment cũ tự hết hiệu lực
+CATALOG_FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+
+def get_catalog_version():
+    """Lấy phiên bản danh mục hiện tại, khởi tạo nếu cache chưa có."""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # add() chỉ ghi khi khóa chưa tồn tại, tránh ghi đè phiên bản do tiến trình khác vừa tạo
+        cache.add(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Đổi sang phiên bản mới: mọi fragment gắn phiên bản cũ không còn được dùng."""
+    cache.set(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def catalog_changed(sender, **kwargs):
+    """
+    Receiver cho post_save / post_delete của các model thuộc danh mục.
+    Chỉ đổi phiên bản sau khi transaction commit, để không render lại dữ liệu chưa được lưu.
+    """
+    transaction.on_commit(bump_catalog_version)
+
+
+def catalog_cache_context():
+    """Biến template dùng cho {% cache %} các fragment danh mục công khai."""
+    return {
+        'catalog_version': get_catalog_version(),
+        'catalog_cache_timeout': CATALOG_FRAGMENT_TIMEOUT,
+    }
+
+
+# ==============================================================================
+# SNAPSHOT DANH MỤC DỊCH VỤ TRONG BỘ NHỚ TIẾN TRÌNH
+# Dựng 1 lần cho mỗi phiên bản danh mục; form đặt phòng, trang danh sách và
+# trang chi tiết dịch vụ đọc từ đây thay vì truy vấn CSDL.
+# ==============================================================================
+@dataclass(frozen=True)
+class GalleryImageEntry:
+    url: str
+    alt_text: str
+
+
+@dataclass(frozen=True)
+class ServiceEntry:
+    id: int
+    category_id: int
+    category_name: str
+    name: str
+    description: str
+    price: Decimal
+    price_unit: str
+    image_url: str
+    url: str
+    highlights: tuple
+    terms: tuple
+    gallery: tuple
+
+    def get_absolute_url(self):
+        return self.url
+
+
+@dataclass(frozen=True)
+class CategoryEntry:
+    id: int
+    name: str
+    description: str
+    image_url: str
+    active_services: tuple
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: str
+    categories: tuple
+    active_services: tuple
+    services_by_id: MappingProxyType
+
+    def get_service(self, service_id):
+        """Tìm một dịch vụ đang hoạt động theo id, trả về None nếu không có."""
+        try:
+            return self.services_by_id.get(int(service_id))
+        except (TypeError, ValueError):
+            return None
+
+
+def _split_lines(text):
+    """Tách văn bản nhiều dòng thành tuple, bỏ các dòng trống (như Service.get_highlights_list)."""
+    return tuple(line.strip() for line in text.splitlines() if line.strip())
+
+
+def build_catalog_snapshot(version):
+    """Dựng snapshot bất biến từ CSDL (3 truy vấn: loại dịch vụ, dịch vụ, ảnh gallery)."""
+    from .models import Service, ServiceCategory
+
+    active_services = Service.objects.filter(
+        status=Service.Status.ACTIVE
+    ).prefetch_related('gallery_images').order_by('id')
+    categories = ServiceCategory.objects.prefetch_related(
+        Prefetch('services', queryset=active_services, to_attr='active_services')
+    ).order_by('id')
+
+    category_entries = []
+    services_by_id = {}
+    for category in categories:
+        service_entries = []
+        for service in category.active_services:
+            entry = ServiceEntry(
+                id=service.id,
+                category_id=category.id,
+                category_name=category.name,
+                name=service.name,
+                description=service.description,
+                price=service.price,
+                price_unit=service.price_unit,
+                image_url=service.image.url if service.image else '',
+                url=reverse('service_detail', kwargs={'pk': service.pk}),
+                highlights=_split_lines(service.highlights),
+                terms=_split_lines(service.terms_conditions),
+                gallery=tuple(
+                    GalleryImageEntry(url=img.image.url, alt_text=img.alt_text)
+                    for img in service.gallery_images.all()
+                ),
+            )
+            service_entries.append(entry)
+            services_by_id[entry.id] = entry
+
+        category_entries.append(CategoryEntry(
+            id=category.id,
+            name=category.name,
+            description=category.description,
+            image_url=category.image.url if category.image else '',
+            active_services=tuple(service_entries),
+        ))
+
+    return CatalogSnapshot(
+        version=version,
+        categories=tuple(category_entries),
+        active_services=tuple(sorted(services_by_id.values(), key=lambda entry: entry.id)),
+        services_by_id=MappingProxyType(services_by_id),
+    )
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_catalog_snapshot():
+    """
+    Trả về snapshot ứng với phiên bản danh mục hiện tại.
+    Mỗi lần gọi chỉ đọc khóa phiên bản trong cache; chỉ dựng lại khi phiên bản đổi.
+    """
+    global _snapshot
+    version = get_catalog_version()
+    snapshot = _snapshot
+    if snapshot is None or snapshot.version != version:
+        with _snapshot_lock:
+            if _snapshot is None or _snapshot.version != version:
+                _snapshot = build_catalog_snapshot(version)
+            snapshot = _snapshot
+    return snapshot
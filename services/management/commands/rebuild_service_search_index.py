@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from services.search import fts_enabled, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Dựng lại chỉ mục tìm kiếm toàn văn (FTS5) của dịch vụ từ dữ liệu hiện có."
+
+    def handle(self, *args, **options):
+        if not fts_enabled():
+            self.stdout.write(self.style.WARNING("CSDL hiện tại không phải SQLite, bỏ qua chỉ mục FTS5."))
+            return
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Đã đánh chỉ mục {count} dịch vụ."))
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # Bảng FTS5 chỉ có trên SQLite; CSDL khác tìm kiếm bằng icontains (xem services/search.py)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS services_service_fts USING fts5("
+        "name, description, highlights, category, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO services_service_fts (rowid, name, description, highlights, category) "
+        "SELECT s.id, s.name, s.description, s.highlights, c.name "
+        "FROM services_service s INNER JOIN services_servicecategory c ON c.id = s.category_id"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS services_service_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0005_service_highlights_service_price_unit_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,107 @@
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, When
+
+from fivitel_core.fts import build_match_query, fts_enabled
+
+from .models import Service
+
+# ==============================================================================
+# TÌM KIẾM TOÀN VĂN DỊCH VỤ (SQLite FTS5)
+# Bảng ảo services_service_fts lưu bản sao tên, mô tả, điểm nổi bật và tên loại
+# của từng dịch vụ (rowid = id dịch vụ). Bảng được tạo ở migration 0006 và được
+# đồng bộ qua signal (xem services/signals.py).
+# ==============================================================================
+FTS_TABLE = 'services_service_fts'
+
+# Trọng số bm25 cho các cột: name, description, highlights, category
+FTS_COLUMN_WEIGHTS = (10.0, 1.0, 3.0, 5.0)
+
+# Số kết quả tối đa trả về cho một truy vấn
+SEARCH_RESULT_LIMIT = 200
+
+
+def search_service_ids(text, limit=SEARCH_RESULT_LIMIT):
+    """
+    Trả về danh sách id dịch vụ khớp với truy vấn, sắp xếp theo độ liên quan (bm25).
+    Với CSDL không phải SQLite (không có bảng FTS), khớp icontains và sắp theo tên.
+    """
+    if not fts_enabled():
+        return _search_service_ids_fallback(text, limit)
+    match = build_match_query(text)
+    if not match:
+        return []
+    weights = ', '.join(str(weight) for weight in FTS_COLUMN_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s',
+            [match, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _search_service_ids_fallback(text, limit):
+    text = (text or '').strip()
+    if not text:
+        return []
+    queryset = Service.objects.filter(Q(name__icontains=text) | Q(category__name__icontains=text)).order_by('name')
+    return list(queryset.values_list('pk', flat=True)[:limit])
+
+
+def search_services(queryset, text):
+    """
+    Lọc queryset dịch vụ theo truy vấn tìm kiếm, giữ thứ tự theo độ liên quan.
+    Với CSDL không phải SQLite, lọc bằng icontains trên tên dịch vụ và tên loại.
+    """
+    if not fts_enabled():
+        return queryset.filter(Q(name__icontains=text) | Q(category__name__icontains=text))
+    ids = search_service_ids(text)
+    if not ids:
+        return queryset.none()
+    rank = Case(*[When(pk=pk, then=position) for position, pk in enumerate(ids)], output_field=IntegerField())
+    return queryset.filter(pk__in=ids).order_by(rank)
+
+
+# ----- Đồng bộ chỉ mục -----
+
+def index_services(services):
+    """Ghi (hoặc ghi đè) các dịch vụ vào chỉ mục. Mỗi dịch vụ cần có sẵn category."""
+    if not fts_enabled():
+        return
+    services = list(services)
+    if not services:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(service.pk,) for service in services],
+        )
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, description, highlights, category) VALUES (%s, %s, %s, %s, %s)',
+            [
+                (service.pk, service.name, service.description, service.highlights, service.category.name)
+                for service in services
+            ],
+        )
+
+
+def remove_services(service_ids):
+    """Xóa các dịch vụ khỏi chỉ mục."""
+    if not fts_enabled() or not service_ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in service_ids])
+
+
+def rebuild_index():
+    """Dựng lại toàn bộ chỉ mục từ bảng dịch vụ. Trả về số dịch vụ đã đánh chỉ mục."""
+    if not fts_enabled():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, description, highlights, category) '
+            'SELECT s.id, s.name, s.description, s.highlights, c.name '
+            'FROM services_service s INNER JOIN services_servicecategory c ON c.id = s.category_id'
+        )
+        return cursor.rowcount
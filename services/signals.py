@@ -0,0 +1,37 @@
+from django.db.models.signals import post_save, post_delete
+
+from .catalog import catalog_changed
+from .models import ServiceCategory, Service, ServiceImage
+from .search import index_services, remove_services
+
+# Mọi thay đổi dịch vụ làm mới phiên bản danh mục (xem services/catalog.py)
+for model in (ServiceCategory, Service, ServiceImage):
+    post_save.connect(catalog_changed, sender=model, dispatch_uid=f'catalog_save_{model.__name__}')
+    post_delete.connect(catalog_changed, sender=model, dispatch_uid=f'catalog_delete_{model.__name__}')
+
+
+# Đồng bộ chỉ mục tìm kiếm toàn văn (xem services/search.py).
+# Ghi trong cùng transaction với thay đổi dữ liệu nên rollback cũng hoàn tác chỉ mục.
+def service_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    index_services([instance])
+
+
+def service_deleted(sender, instance, **kwargs):
+    remove_services([instance.pk])
+
+
+def category_saved(sender, instance, raw=False, **kwargs):
+    # Tên loại là một cột của chỉ mục, nên đánh chỉ mục lại các dịch vụ thuộc loại này
+    if raw:
+        return
+    services = list(instance.services.all())
+    for service in services:
+        service.category = instance
+    index_services(services)
+
+
+post_save.connect(service_saved, sender=Service, dispatch_uid='service_search_save')
+post_delete.connect(service_deleted, sender=Service, dispatch_uid='service_search_delete')
+post_save.connect(category_saved, sender=ServiceCategory, dispatch_uid='service_search_category_save')
@@ -1,14 +1,16 @@
 from django.urls import reverse_lazy, reverse
-from django.db.models import Q, Prefetch
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404
 from django.contrib.auth.decorators import user_passes_test
 from django.db import transaction
 from django.contrib import messages
 
 from .models import Service, ServiceCategory, ServiceImage
+from .catalog import catalog_cache_context, get_catalog_snapshot
 from .forms import ServiceForm, ServiceImageInlineFormSet
+from .search import search_service_ids, search_services
 
 # Hàm kiểm tra user có phải là Admin không
 def is_admin(user):
@@ -29,13 +31,10 @@ class ServiceListView(AdminRequiredMixin, ListView):
     def get_queryset(self):
         """Ghi đè để thêm logic tìm kiếm."""
         queryset = super().get_queryset().select_related('category').order_by('name')
-        query = self.request.GET.get('q')
+        query = self.request.GET.get('q', '').strip()
         if query:
-            # Tìm kiếm theo Tên dịch vụ HOẶC Tên loại dịch vụ
-            queryset = queryset.filter(
-                Q(name__icontains=query) | 
-                Q(category__name__icontains=query)
-            )
+            # Tìm kiếm toàn văn theo tên, mô tả, điểm nổi bật và loại dịch vụ; kết quả xếp theo độ liên quan
+            queryset = search_services(queryset, query)
         return queryset
 
     def get_context_data(self, **kwargs):
@@ -47,35 +46,44 @@ class ServiceListView(AdminRequiredMixin, ListView):
 class PublicServiceListView(ListView):
     """
     View hiển thị danh sách các loại dịch vụ và dịch vụ con cho khách hàng.
+    Dữ liệu đọc từ snapshot danh mục trong bộ nhớ, không truy vấn CSDL.
     """
-    model = ServiceCategory
     template_name = 'services/public_service_list.html'
     context_object_name = 'categories'
 
     def get_queryset(self):
-        # Chỉ lấy các dịch vụ đang hoạt động
-        active_services = Service.objects.filter(status=Service.Status.ACTIVE)
-        
-        # Tải trước các dịch vụ liên quan
-        return ServiceCategory.objects.prefetch_related(
-            Prefetch('services', queryset=active_services, to_attr='active_services')
-        ).all()
+        # Mỗi loại dịch vụ đã kèm sẵn danh sách dịch vụ đang hoạt động (active_services)
+        return get_catalog_snapshot().categories
+
+    def get_context_data(self, **kwargs):
+        # Fragment danh sách dịch vụ vẫn được cache theo phiên bản danh mục
+        context = super().get_context_data(**kwargs)
+        context.update(catalog_cache_context())
+
+        # Tìm kiếm: lấy id theo độ liên quan từ chỉ mục FTS, chỉ giữ các dịch vụ đang hoạt động trong snapshot
+        query = self.request.GET.get('q', '').strip()
+        context['search_query'] = query
+        if query:
+            snapshot = get_catalog_snapshot()
+            results = (snapshot.get_service(service_id) for service_id in search_service_ids(query))
+            context['search_results'] = [service for service in results if service is not None]
+        return context
     
 class ServiceDetailView(DetailView):
     """
     View hiển thị chi tiết một dịch vụ cụ thể.
     """
-    model = Service
     template_name = 'services/service_detail.html' 
     context_object_name = 'service'
 
-    def get_queryset(self):
+    def get_object(self, queryset=None):
         """
-        Lấy dịch vụ và các ảnh gallery liên quan.
+        Lấy dịch vụ đang hoạt động (đã tách sẵn highlights, điều khoản, gallery) từ snapshot.
         """
-        return Service.objects.filter(status=Service.Status.ACTIVE).prefetch_related(
-            'gallery_images'
-        )
+        service = get_catalog_snapshot().get_service(self.kwargs.get('pk'))
+        if service is None:
+            raise Http404("Không tìm thấy dịch vụ.")
+        return service
 
 @user_passes_test(is_admin)
 @transaction.atomic
@@ -0,0 +1,43 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // --- Bảng trạng thái phòng cập nhật trực tiếp qua Server-Sent Events ---
+    const board = document.getElementById('room-status-board');
+    const activityLog = document.getElementById('room-activity-log');
+    if (!board || !window.EventSource) return;
+
+    // Con trỏ ban đầu do server gửi xuống, chỉ nhận các thay đổi sau khi trang được render
+    const streamUrl = board.dataset.streamUrl + '?since=' + encodeURIComponent(board.dataset.streamCursor);
+    const source = new EventSource(streamUrl);
+
+    // Cập nhật 1 dòng phòng khi trạng thái thay đổi
+    source.addEventListener('room', function(event) {
+        const room = JSON.parse(event.data);
+        const row = board.querySelector('tr[data-room-id="' + room.id + '"]');
+        if (!row) return;
+
+        const badge = row.querySelector('[data-role="status-badge"]');
+        badge.className = 'status-badge room-status-' + room.status;
+        badge.textContent = room.status_display;
+
+        const select = row.querySelector('select[name="status"]');
+        if (select && document.activeElement !== select) {
+            select.value = room.status;
+        }
+    });
+
+    // Hiển thị thông báo ngắn khi có khách check-in / check-out
+    source.addEventListener('booking', function(event) {
+        const booking = JSON.parse(event.data);
+        if (!activityLog) return;
+
+        const alert = document.createElement('div');
+        alert.className = 'alert alert-info';
+        const roomNumber = booking.assigned_room__room_number || '---';
+        alert.textContent = 'Đơn #' + booking.id + ' (' + (booking.guest_full_name || 'Khách') + ') - Phòng ' + roomNumber + ': ' + booking.status_display;
+        activityLog.prepend(alert);
+
+        // Giữ tối đa 5 thông báo gần nhất
+        while (activityLog.children.length > 5) {
+            activityLog.removeChild(activityLog.lastChild);
+        }
+    });
+});
@@ -0,0 +1,122 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // --- Hội thoại ticket cập nhật trực tiếp qua Server-Sent Events ---
+    const history = document.querySelector('[data-ticket-chat]');
+    if (!history) return;
+
+    const mode = history.dataset.ticketChat; // 'customer' hoặc 'staff'
+    const viewerId = parseInt(history.dataset.viewerId || '0', 10);
+    const seen = new Set();
+
+    // Tạo khung tin nhắn giống phần server render sẵn
+    function buildBubble(message) {
+        const bubble = document.createElement('div');
+        const meta = document.createElement('span');
+        const body = document.createElement('p');
+        const timestamp = document.createElement('span');
+        timestamp.className = 'timestamp';
+        timestamp.textContent = message.created_display;
+
+        // Giữ xuống dòng như bộ lọc linebreaksbr
+        message.message.split('\n').forEach(function(line, index) {
+            if (index > 0) body.appendChild(document.createElement('br'));
+            body.appendChild(document.createTextNode(line));
+        });
+
+        if (mode === 'customer') {
+            bubble.className = 'response-item ' + (message.responder_id === viewerId ? 'my-response' : 'staff-response');
+            meta.className = 'responder-name';
+            meta.textContent = message.responder_name;
+            bubble.append(meta, body, timestamp);
+        } else {
+            bubble.className = 'chat-bubble ' + (message.is_staff ? 'staff-response' : 'customer-response');
+            meta.className = 'chat-meta';
+            meta.append(message.responder_name + ' - ', timestamp);
+            bubble.append(meta, body);
+        }
+        return bubble;
+    }
+
+    function appendMessage(message) {
+        if (seen.has(message.id)) return;
+        seen.add(message.id);
+        const placeholder = history.querySelector('[data-chat-empty]');
+        if (placeholder) placeholder.remove();
+        history.appendChild(buildBubble(message));
+        history.scrollTop = history.scrollHeight;
+    }
+
+    // Chỉ nhận các tin nhắn có id lớn hơn tin nhắn cuối cùng đã render
+    if (window.EventSource) {
+        const source = new EventSource(history.dataset.streamUrl + '?after=' + encodeURIComponent(history.dataset.cursor));
+        source.addEventListener('message', function(event) {
+            appendMessage(JSON.parse(event.data));
+        });
+    }
+
+    // Gửi trả lời bằng fetch, không tải lại trang
+    const form = document.querySelector('form[data-chat-reply]');
+    if (!form || !window.fetch) return;
+
+    function showErrors(texts) {
+        form.querySelectorAll('.chat-error').forEach(function(el) { el.remove(); });
+        const button = form.querySelector('button[type="submit"]');
+        texts.forEach(function(text) {
+            const error = document.createElement('p');
+            error.className = 'chat-error';
+            error.style.color = '#dc3545';
+            error.textContent = text;
+            button.before(error);
+        });
+    }
+
+    // Gửi form theo cách thông thường (chỉ dùng khi fetch thất bại trước khi request tới server)
+    function submitNormally() {
+        const marker = document.createElement('input');
+        marker.type = 'hidden';
+        marker.name = form.dataset.chatReply;
+        marker.value = '1';
+        form.appendChild(marker);
+        form.submit();
+    }
+
+    form.addEventListener('submit', function(event) {
+        event.preventDefault();
+        const data = new FormData(form);
+        data.append(form.dataset.chatReply, '1');
+        const button = form.querySelector('button[type="submit"]');
+        button.disabled = true;
+
+        fetch(form.action || window.location.href, {
+            method: 'POST',
+            body: data,
+            headers: { 'X-Requested-With': 'XMLHttpRequest' },
+        })
+            .then(function(response) {
+                // Phản hồi không phải JSON (trang lỗi, chuyển hướng đăng nhập, proxy...): server có thể đã
+                // lưu tin nhắn, nên không gửi lại mà báo lỗi ngay trong form
+                const contentType = response.headers.get('Content-Type') || '';
+                if (!contentType.includes('application/json')) {
+                    showErrors(['Không gửi được tin nhắn (lỗi máy chủ ' + response.status + '). Vui lòng tải lại trang để kiểm tra.']);
+                    return;
+                }
+                return response.json().then(function(result) {
+                    if (result.success) {
+                        showErrors([]);
+                        appendMessage(result.message);
+                        form.reset();
+                    } else if (result.errors) {
+                        showErrors(Object.values(result.errors).flat());
+                    } else {
+                        showErrors(['Không gửi được tin nhắn (lỗi máy chủ ' + response.status + ').']);
+                    }
+                });
+            }, function() {
+                // fetch bị từ chối trước khi nhận phản hồi (lỗi mạng): gửi form theo cách thông thường
+                submitNormally();
+            })
+            .catch(function() {
+                showErrors(['Không đọc được phản hồi từ máy chủ. Vui lòng tải lại trang để kiểm tra.']);
+            })
+            .finally(function() { button.disabled = false; });
+    });
+});
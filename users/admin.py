@@ -1,10 +1,16 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from fivitel_core.paginators import EstimatedCountPaginator
 from .models import CustomUser
 
 class CustomUserAdmin(UserAdmin):
     # Các trường hiển thị trong danh sách người dùng
     list_display = ('username', 'email', 'full_name', 'role', 'is_staff')
+    list_filter = UserAdmin.list_filter + ('role',)
+
+    # Bảng khách hàng lớn: dùng số dòng ước lượng và bỏ truy vấn đếm toàn bộ thứ hai
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     # Cấu hình các trường hiển thị trong form chỉnh sửa chi tiết
     fieldsets = (
@@ -0,0 +1,39 @@
+import re
+
+# ==============================================================================
+# KHÓA NHẬN DIỆN KHÁCH HÀNG
+# Email / số điện thoại được chuẩn hóa để ghép các đơn đặt phòng và yêu cầu CSKH
+# của cùng một người (kể cả khi khách gửi với tư cách vãng lai), xem crm/customer360.py.
+# ==============================================================================
+_NON_DIGIT_RE = re.compile(r'\D')
+
+# Số điện thoại có ít chữ số hơn mức này không đủ tin cậy để ghép
+MIN_PHONE_DIGITS = 8
+
+
+def normalize_email_key(email):
+    """Email chữ thường, bỏ khoảng trắng; '' nếu không có."""
+    return (email or '').strip().lower()
+
+
+def normalize_phone_key(phone):
+    """
+    Chỉ giữ chữ số và đưa đầu số quốc tế Việt Nam về dạng nội địa,
+    ví dụ '+84 901-234-567' -> '0901234567'. Trả về '' nếu quá ngắn.
+    """
+    digits = _NON_DIGIT_RE.sub('', phone or '')
+    if digits.startswith('84') and len(digits) >= 11:
+        digits = '0' + digits[2:]
+    return digits if len(digits) >= MIN_PHONE_DIGITS else ''
+
+
+def apply_contact_keys(instance, update_fields=None):
+    """
+    Tính email_key / phone_key từ guest_email / guest_phone_number của instance (Booking, Ticket).
+    Gọi trong save(); trả về update_fields đã bổ sung các cột khóa nếu cần.
+    """
+    instance.email_key = normalize_email_key(instance.guest_email)
+    instance.phone_key = normalize_phone_key(instance.guest_phone_number)
+    if update_fields is not None and {'guest_email', 'guest_phone_number'} & set(update_fields):
+        update_fields = set(update_fields) | {'email_key', 'phone_key'}
+    return update_fields
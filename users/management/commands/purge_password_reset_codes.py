@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from users.otp import purge_expired_codes
+
+
+class Command(BaseCommand):
+    help = "Xóa các mã OTP đặt lại mật khẩu đã hết hạn (nên chạy định kỳ, ví dụ mỗi giờ qua cron)."
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_codes()
+        self.stdout.write(self.style.SUCCESS(f"Đã xóa {deleted} mã hết hạn."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from fivitel_core.fts import fts_enabled
+from users.models import CustomUser
+from users.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Dựng lại chỉ mục tìm kiếm (FTS5) của người dùng: username, email, SĐT, họ tên."
+
+    def handle(self, *args, **options):
+        if not fts_enabled():
+            self.stdout.write(self.style.WARNING("CSDL hiện tại không phải SQLite, bỏ qua chỉ mục FTS5."))
+            return
+        total = rebuild_index(CustomUser.objects.all())
+        self.stdout.write(self.style.SUCCESS(f"Đã đánh chỉ mục {total} người dùng."))
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:11
+
+from django.db import migrations, models
+
+from users.identity import normalize_phone_key
+
+
+def create_search_index(apps, schema_editor):
+    # Bảng FTS5 chỉ có trên SQLite; CSDL khác tìm kiếm bằng icontains (xem users/search.py)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS users_customuser_fts USING fts5("
+        "username, email, phone, full_name, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    CustomUser = apps.get_model('users', 'CustomUser')
+    rows = [
+        [user.pk, user.username, user.email, f"{user.phone_number} {normalize_phone_key(user.phone_number)}".strip(), user.full_name]
+        for user in CustomUser.objects.only('pk', 'username', 'email', 'phone_number', 'full_name').iterator(chunk_size=1000)
+    ]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO users_customuser_fts (rowid, username, email, phone, full_name) VALUES (%s, %s, %s, %s, %s)", rows
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS users_customuser_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0004_alter_customuser_role'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['role', '-date_joined', '-id'], name='user_role_joined_idx'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_customer_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PasswordResetCode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64, unique=True, verbose_name='Token phiên đặt lại')),
+                ('code_hash', models.CharField(max_length=64, verbose_name='HMAC của mã')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Hết hạn lúc')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Số lần nhập mã')),
+                ('verified_at', models.DateTimeField(blank=True, null=True, verbose_name='Xác thực lúc')),
+                ('used_at', models.DateTimeField(blank=True, null=True, verbose_name='Đã dùng lúc')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='password_reset_codes', to=settings.AUTH_USER_MODEL, verbose_name='Người dùng')),
+            ],
+            options={
+                'verbose_name': 'Mã đặt lại mật khẩu',
+                'verbose_name_plural': 'Mã đặt lại mật khẩu',
+            },
+        ),
+    ]
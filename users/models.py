@@ -19,3 +19,32 @@ class CustomUser(AbstractUser):
     date_of_birth = models.DateField(null=True, blank=True, verbose_name="Ngày sinh")
     nationality = CountryField(blank=True, verbose_name="Quốc tịch")
     phone_number = models.CharField(max_length=20, blank=True, verbose_name="Số điện thoại")
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Danh sách khách hàng trong trang quản trị: lọc theo vai trò, mới tham gia trước
+            models.Index(fields=['role', '-date_joined', '-id'], name='user_role_joined_idx'),
+        ]
+
+
+class PasswordResetCode(models.Model):
+    """
+    Mã OTP đặt lại mật khẩu. Chỉ lưu HMAC của mã (không lưu mã gốc), kèm hạn dùng và số lần nhập sai.
+    Phiên đặt lại được nhận diện bằng token ngẫu nhiên (unique) nên xác thực chỉ cần 1 truy vấn theo index.
+    Xem users/otp.py.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='password_reset_codes', verbose_name="Người dùng")
+    token = models.CharField(max_length=64, unique=True, verbose_name="Token phiên đặt lại")
+    code_hash = models.CharField(max_length=64, verbose_name="HMAC của mã")
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Hết hạn lúc")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Số lần nhập mã")
+    verified_at = models.DateTimeField(null=True, blank=True, verbose_name="Xác thực lúc")
+    used_at = models.DateTimeField(null=True, blank=True, verbose_name="Đã dùng lúc")
+
+    class Meta:
+        verbose_name = "Mã đặt lại mật khẩu"
+        verbose_name_plural = "Mã đặt lại mật khẩu"
+
+    def __str__(self):
+        return f"OTP {self.user} ({self.expires_at:%d/%m/%Y %H:%M})"
@@ -0,0 +1,89 @@
+import secrets
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from .models import PasswordResetCode
+
+# ==============================================================================
+# MÃ OTP ĐẶT LẠI MẬT KHẨU
+# - Mã 6 chữ số chỉ được gửi qua email; CSDL lưu HMAC(SECRET_KEY, token + mã).
+# - Session chỉ giữ token của phiên đặt lại (không đổi thời hạn session của người dùng).
+# - Mỗi lần nhập mã trừ 1 lượt (UPDATE có điều kiện, đúng cả khi gửi đồng thời);
+#   hết OTP_MAX_ATTEMPTS lượt thì mã bị vô hiệu, phải yêu cầu mã mới.
+# - Lệnh purge_password_reset_codes xóa mã đã hết hạn (theo index expires_at).
+# ==============================================================================
+OTP_LENGTH = 6
+OTP_TTL = timedelta(minutes=10)
+OTP_MAX_ATTEMPTS = 5
+# Sau khi nhập đúng mã, người dùng còn bấy nhiêu thời gian để đặt mật khẩu mới
+OTP_VERIFIED_TTL = timedelta(minutes=10)
+
+SESSION_TOKEN_KEY = 'password_reset_token'
+
+
+class OtpError(Exception):
+    """Lỗi xác thực mã OTP (thông báo hiển thị cho người dùng)."""
+
+
+def _hash_code(token, code):
+    return salted_hmac('users.otp.password_reset', f'{token}:{code}', algorithm='sha256').hexdigest()
+
+
+def issue_reset_code(user):
+    """Tạo mã mới cho user (vô hiệu các mã chưa dùng trước đó). Trả về (token, mã gốc để gửi email)."""
+    code = f'{secrets.randbelow(10 ** OTP_LENGTH):0{OTP_LENGTH}d}'
+    token = secrets.token_urlsafe(32)
+    PasswordResetCode.objects.filter(user=user, used_at__isnull=True).delete()
+    PasswordResetCode.objects.create(
+        user=user, token=token, code_hash=_hash_code(token, code), expires_at=timezone.now() + OTP_TTL,
+    )
+    return token, code
+
+
+def _active_code(token):
+    """Mã còn hiệu lực theo token (1 truy vấn theo unique index); None nếu không có."""
+    if not token:
+        return None
+    return PasswordResetCode.objects.filter(
+        token=token, used_at__isnull=True, expires_at__gt=timezone.now()
+    ).select_related('user').first()
+
+
+def verify_reset_code(token, code):
+    """Kiểm tra mã người dùng nhập. Trả về PasswordResetCode khi đúng, ngược lại raise OtpError."""
+    otp = _active_code(token)
+    if otp is None:
+        raise OtpError("Mã xác thực đã hết hạn hoặc không hợp lệ. Vui lòng yêu cầu mã mới.")
+    # Trừ lượt trước khi so sánh: các yêu cầu đồng thời không thể vượt quá số lượt cho phép
+    consumed = PasswordResetCode.objects.filter(pk=otp.pk, attempts__lt=OTP_MAX_ATTEMPTS).update(attempts=F('attempts') + 1)
+    if not consumed:
+        raise OtpError("Bạn đã nhập sai quá nhiều lần. Vui lòng yêu cầu mã mới.")
+    if not constant_time_compare(otp.code_hash, _hash_code(token, (code or '').strip())):
+        remaining = OTP_MAX_ATTEMPTS - otp.attempts - 1
+        if remaining <= 0:
+            raise OtpError("Bạn đã nhập sai quá nhiều lần. Vui lòng yêu cầu mã mới.")
+        raise OtpError(f"Mã xác thực không chính xác. Bạn còn {remaining} lần thử.")
+    otp.verified_at = timezone.now()
+    # Gia hạn cho bước đặt mật khẩu mới
+    otp.expires_at = otp.verified_at + OTP_VERIFIED_TTL
+    otp.save(update_fields=['verified_at', 'expires_at'])
+    return otp
+
+
+def get_verified_code(token):
+    """Mã đã xác thực, còn hạn và chưa dùng (bước đặt mật khẩu mới); None nếu không có."""
+    otp = _active_code(token)
+    return otp if otp is not None and otp.verified_at else None
+
+
+def mark_used(otp):
+    PasswordResetCode.objects.filter(pk=otp.pk).update(used_at=timezone.now())
+
+
+def purge_expired_codes(now=None):
+    """Xóa các mã đã hết hạn (kể cả mã đã dùng). Trả về số bản ghi đã xóa."""
+    deleted, _ = PasswordResetCode.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
@@ -0,0 +1,85 @@
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from fivitel_core.fts import build_match_query, fts_enabled
+from .identity import normalize_phone_key
+
+# ==============================================================================
+# TÌM KIẾM NGƯỜI DÙNG (SQLite FTS5)
+# Bảng ảo users_customuser_fts (rowid = id người dùng) lưu username, email, SĐT, họ tên,
+# được tạo ở migration 0005 và đồng bộ qua signal (users/signals.py).
+# Cột phone chứa cả dạng gốc lẫn dạng chuẩn hóa để tìm được '0901...' lẫn '+84 901...'.
+# ==============================================================================
+FTS_TABLE = 'users_customuser_fts'
+
+# Các trường của CustomUser có trong chỉ mục
+INDEXED_FIELDS = {'username', 'email', 'phone_number', 'full_name'}
+
+
+def index_row(user):
+    phone = user.phone_number or ''
+    return [user.pk, user.username, user.email or '', f"{phone} {normalize_phone_key(phone)}".strip(), user.full_name or '']
+
+
+def filter_users(queryset, text):
+    """
+    Lọc queryset người dùng theo chuỗi tìm kiếm (khớp tiền tố từng từ, không phân biệt dấu).
+    Giữ nguyên thứ tự sắp xếp của queryset để phân trang ngay trong CSDL.
+    """
+    text = (text or '').strip()
+    if not text:
+        return queryset
+    if not fts_enabled():
+        return queryset.filter(
+            Q(username__icontains=text) | Q(email__icontains=text)
+            | Q(phone_number__icontains=text) | Q(full_name__icontains=text)
+        )
+    match = build_match_query(text)
+    if not match:
+        return queryset.none()
+    return queryset.filter(pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]))
+
+
+def index_users(users):
+    """Ghi (hoặc ghi đè) các người dùng vào chỉ mục."""
+    if not fts_enabled() or not users:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [[user.pk] for user in users])
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, username, email, phone, full_name) VALUES (%s, %s, %s, %s, %s)',
+            [index_row(user) for user in users],
+        )
+
+
+def remove_users(user_ids):
+    if not fts_enabled() or not user_ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [[user_id] for user_id in user_ids])
+
+
+def rebuild_index(users, batch_size=1000):
+    """Dựng lại toàn bộ chỉ mục từ queryset người dùng. Trả về số người dùng đã đánh chỉ mục."""
+    if not fts_enabled():
+        return 0
+    total = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        rows = users.only('pk', 'username', 'email', 'phone_number', 'full_name').order_by('pk')
+        batch = []
+        for user in rows.iterator(chunk_size=batch_size):
+            batch.append(index_row(user))
+            if len(batch) >= batch_size:
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE} (rowid, username, email, phone, full_name) VALUES (%s, %s, %s, %s, %s)', batch
+                )
+                total += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, username, email, phone, full_name) VALUES (%s, %s, %s, %s, %s)', batch
+            )
+            total += len(batch)
+    return total
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+
+from .models import CustomUser
+from .search import INDEXED_FIELDS, index_users, remove_users
+
+
+# Đồng bộ chỉ mục tìm kiếm người dùng (xem users/search.py).
+# Ghi trong cùng transaction với thay đổi dữ liệu nên rollback cũng hoàn tác chỉ mục.
+def user_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Mỗi lần đăng nhập chỉ cập nhật last_login: không cần đánh chỉ mục lại
+    if raw or (update_fields and not INDEXED_FIELDS.intersection(update_fields)):
+        return
+    index_users([instance])
+
+
+def user_deleted(sender, instance, **kwargs):
+    remove_users([instance.pk])
+
+
+post_save.connect(user_saved, sender=CustomUser, dispatch_uid='user_search_save')
+post_delete.connect(user_deleted, sender=CustomUser, dispatch_uid='user_search_delete')
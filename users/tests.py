@@ -1,3 +1,187 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from fivitel_core.ratelimit import check_rate_limits, hit
+from .models import CustomUser, PasswordResetCode
+from .otp import OTP_MAX_ATTEMPTS, SESSION_TOKEN_KEY, OtpError, get_verified_code, issue_reset_code, verify_reset_code
+
+
+# ==============================================================================
+# GIỚI HẠN TẦN SUẤT (fivitel_core/ratelimit.py)
+# ==============================================================================
+class SlidingWindowTests(TestCase):
+    """Bộ đếm cửa sổ trượt xấp xỉ với thời điểm cố định (now) để kết quả xác định."""
+
+    def setUp(self):
+        cache.clear()
+
+    def fill(self, count, start=0):
+        for offset in range(count):
+            self.assertIsNone(hit('test', 'ip', '10.0.0.1', '5/m', now=start + offset))
+
+    def test_allows_up_to_limit_then_rejects(self):
+        self.fill(5)
+        # Cửa sổ hiện tại đầy: chờ hết cửa sổ (55s) + 20% cửa sổ sau để 5 * 0.8 + 1 <= 5
+        self.assertEqual(hit('test', 'ip', '10.0.0.1', '5/m', now=5), 67)
+
+    def test_rejected_requests_are_not_counted(self):
+        self.fill(5)
+        for _ in range(3):
+            self.assertIsNotNone(hit('test', 'ip', '10.0.0.1', '5/m', now=10))
+        # Sang cửa sổ sau, cửa sổ trước vẫn chỉ có 5 yêu cầu được phép
+        self.assertEqual(hit('test', 'ip', '10.0.0.1', '5/m', now=60), 12)
+
+    def test_previous_window_weight_decays(self):
+        self.fill(5)
+        self.assertEqual(hit('test', 'ip', '10.0.0.1', '5/m', now=60), 12)
+        self.assertIsNone(hit('test', 'ip', '10.0.0.1', '5/m', now=72))
+
+    def test_concurrent_burst_respects_limit(self):
+        # Mọi yêu cầu đồng thời cùng đọc cache trước khi yêu cầu nào kịp ghi: vẫn chỉ 5 yêu cầu lọt qua
+        barrier = threading.Barrier(20)
+
+        class ReadTogetherCache:
+            def __getattr__(self, name):
+                return getattr(cache, name)
+
+            def get(self, *args, **kwargs):
+                value = cache.get(*args, **kwargs)
+                barrier.wait()
+                return value
+
+            def get_many(self, *args, **kwargs):
+                value = cache.get_many(*args, **kwargs)
+                barrier.wait()
+                return value
+
+        results = []
+        with mock.patch('fivitel_core.ratelimit.cache', ReadTogetherCache()):
+            threads = [
+                threading.Thread(target=lambda: results.append(hit('test', 'ip', '10.0.0.1', '5/m', now=1)))
+                for _ in range(20)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(results.count(None), 5)
+        # Các yêu cầu bị từ chối đã được hoàn lại lượt
+        self.assertEqual(hit('test', 'ip', '10.0.0.1', '5/m', now=60), 12)
+
+    def test_counters_are_per_identity(self):
+        self.fill(5)
+        self.assertIsNone(hit('test', 'ip', '10.0.0.2', '5/m', now=5))
+
+    @override_settings(RATE_LIMITS={'test': [('ip', '5/m'), ('post:email', '1/h')]})
+    def test_rejected_policy_does_not_consume_other_policies(self):
+        factory = RequestFactory()
+        self.assertIsNone(check_rate_limits(factory.post('/', {'email': 'a@example.com'}), 'test', now=0))
+        for offset in range(1, 6):
+            exceeded = check_rate_limits(factory.post('/', {'email': 'a@example.com'}), 'test', now=offset)
+            self.assertEqual(exceeded.scope, 'post:email')
+        # Các yêu cầu bị từ chối theo email không tốn lượt của chính sách theo IP
+        for offset in range(6, 10):
+            self.assertIsNone(check_rate_limits(factory.post('/', {'email': f'{offset}@example.com'}), 'test', now=offset))
+        self.assertEqual(check_rate_limits(factory.post('/', {'email': 'b@example.com'}), 'test', now=10).scope, 'ip')
+
+
+@override_settings(RATE_LIMITS={'register': [('ip', '2/h')]})
+class RateLimitedViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_returns_429_with_retry_after(self):
+        url = reverse('register')
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, {}).status_code, 200)
+        response = self.client.post(url, {})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertTemplateUsed(response, 'ratelimited.html')
+
+    def test_get_is_not_limited(self):
+        url = reverse('register')
+        for _ in range(3):
+            self.client.post(url, {})
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+# ==============================================================================
+# MÃ OTP ĐẶT LẠI MẬT KHẨU (users/otp.py)
+# ==============================================================================
+def wrong_code(code):
+    return f'{(int(code) + 1) % 10 ** len(code):0{len(code)}d}'
+
+
+class PasswordResetCodeTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='khach', email='khach@example.com', phone_number='0901234567', password='old-password-123',
+        )
+        self.token, self.code = issue_reset_code(self.user)
+
+    def test_correct_code_verifies(self):
+        otp = verify_reset_code(self.token, self.code)
+        self.assertIsNotNone(otp.verified_at)
+        self.assertEqual(get_verified_code(self.token), otp)
+
+    def test_only_hash_is_stored(self):
+        self.assertNotIn(self.code, PasswordResetCode.objects.get(token=self.token).code_hash)
+
+    def test_attempts_are_exhausted(self):
+        for _ in range(OTP_MAX_ATTEMPTS):
+            with self.assertRaises(OtpError):
+                verify_reset_code(self.token, wrong_code(self.code))
+        # Hết lượt: cả mã đúng cũng bị từ chối
+        with self.assertRaisesMessage(OtpError, "quá nhiều lần"):
+            verify_reset_code(self.token, self.code)
+        self.assertIsNone(get_verified_code(self.token))
+
+    def test_expired_code_is_rejected(self):
+        PasswordResetCode.objects.filter(token=self.token).update(expires_at=timezone.now() - timedelta(seconds=1))
+        with self.assertRaisesMessage(OtpError, "hết hạn"):
+            verify_reset_code(self.token, self.code)
+
+    def test_new_code_invalidates_previous(self):
+        token, code = issue_reset_code(self.user)
+        with self.assertRaises(OtpError):
+            verify_reset_code(self.token, self.code)
+        self.assertIsNotNone(verify_reset_code(token, code))
+
+    def start_session(self):
+        session = self.client.session
+        session[SESSION_TOKEN_KEY] = self.token
+        session.save()
+
+    def test_set_new_password_rejects_unverified_token(self):
+        self.start_session()
+        response = self.client.post(reverse('password_reset_set_new'), {
+            'new_password1': 'new-password-456', 'new_password2': 'new-password-456',
+        })
+        self.assertRedirects(response, reverse('password_reset_request'))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('old-password-123'))
+
+    def test_code_is_single_use(self):
+        verify_reset_code(self.token, self.code)
+        self.start_session()
+        data = {'new_password1': 'new-password-456', 'new_password2': 'new-password-456'}
+        self.assertRedirects(self.client.post(reverse('password_reset_set_new'), data), reverse('login'))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('new-password-456'))
+
+        # Dùng lại token sau khi đã đổi mật khẩu
+        self.assertIsNone(get_verified_code(self.token))
+        with self.assertRaises(OtpError):
+            verify_reset_code(self.token, self.code)
+        self.start_session()
+        data = {'new_password1': 'third-password-789', 'new_password2': 'third-password-789'}
+        self.assertRedirects(self.client.post(reverse('password_reset_set_new'), data), reverse('password_reset_request'))
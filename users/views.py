@@ -6,14 +6,23 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import logout
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from .forms import CustomerRegistrationForm, AdminUserCreationForm, UserUpdateForm, PasswordResetEmailForm, PasswordResetCodeForm, SetNewPasswordForm
 from .models import CustomUser
-import random
+from .otp import OTP_TTL, SESSION_TOKEN_KEY, OtpError, get_verified_code, issue_reset_code, mark_used, verify_reset_code
+from .search import filter_users
+from booking.models import Booking
+from crm.models import Ticket
+from crm.sla import latest_metrics
+from fivitel_core.ratelimit import rate_limit
+from fivitel_core.replica import ReplicaReadMixin, read_from_replica
 
 # ==============================================================================
 # PHẦN 1: VIEWS ĐĂNG KÝ, ĐĂNG NHẬP VÀ XÁC THỰC KHI QUÊN MẬT KHẨU PHÍA NGƯỜI DÙNG
 # ==============================================================================
+@rate_limit('register')
 def register(request):
     """
     View xử lý trang đăng ký công khai cho khách hàng.
@@ -39,10 +48,11 @@ def logout_view(request):
     messages.success(request, "Bạn đã đăng xuất thành công.")
     return redirect('login')
 
-# --- Quy trình Đặt lại Mật khẩu bằng OTP ---
+# --- Quy trình Đặt lại Mật khẩu bằng OTP (mã lưu ở bảng PasswordResetCode, xem users/otp.py) ---
+@rate_limit('password_reset')
 def request_password_reset_code(request):
     """
-    Bước 1: Nhận email, tạo mã OTP, lưu mã vào session, và gửi email.
+    Bước 1: Nhận email, tạo mã OTP (chỉ lưu HMAC của mã), gửi email và ghi token phiên đặt lại vào session.
     """
     if request.method == 'POST':
         form = PasswordResetEmailForm(request.POST)
@@ -50,20 +60,17 @@ def request_password_reset_code(request):
             email = form.cleaned_data['email']
             user = CustomUser.objects.get(email__iexact=email)
             
-            # 1. Tạo mã OTP 6 chữ số
-            code = str(random.randint(100000, 999999))
+            # 1. Tạo mã OTP 6 chữ số (mã cũ chưa dùng của user bị vô hiệu)
+            token, code = issue_reset_code(user)
             
-            # 2. Lưu mã và user_id vào session để kiểm tra ở bước sau
-            request.session['reset_otp_code'] = code
-            request.session['reset_otp_user_id'] = user.id
-            # Đặt thời gian hết hạn (ví dụ: 10 phút)
-            request.session.set_expiry(600) 
+            # 2. Session chỉ giữ token để nhận diện phiên đặt lại ở các bước sau
+            request.session[SESSION_TOKEN_KEY] = token
             
             # 3. Gửi email
             try:
                 send_mail(
                     subject='[Fivitel] Mã xác thực đặt lại mật khẩu của bạn',
-                    message=f'Mã xác thực của bạn là: {code}\n\nMã này sẽ hết hạn trong 10 phút.',
+                    message=f'Mã xác thực của bạn là: {code}\n\nMã này sẽ hết hạn trong {int(OTP_TTL.total_seconds() // 60)} phút.',
                     from_email=settings.DEFAULT_FROM_EMAIL,
                     recipient_list=[email],
                 )
@@ -82,24 +89,23 @@ def request_password_reset_code(request):
 
 def verify_password_reset_code(request):
     """
-    Bước 2: Nhận mã OTP người dùng nhập, so sánh với mã trong session.
+    Bước 2: Nhận mã OTP người dùng nhập, kiểm tra với mã đã lưu (giới hạn số lần nhập sai).
     """
-    if 'reset_otp_user_id' not in request.session:
+    token = request.session.get(SESSION_TOKEN_KEY)
+    if not token:
         messages.error(request, "Phiên đặt lại mật khẩu đã hết hạn hoặc không hợp lệ. Vui lòng thử lại.")
         return redirect('password_reset_request')
 
     if request.method == 'POST':
         form = PasswordResetCodeForm(request.POST)
         if form.is_valid():
-            submitted_code = form.cleaned_data['code']
-            stored_code = request.session.get('reset_otp_code')
-            
-            if submitted_code == stored_code:
-                # Xác thực thành công, đánh dấu trong session và chuyển đến bước 3
-                request.session['reset_otp_verified'] = True
-                return redirect('password_reset_set_new')
+            try:
+                verify_reset_code(token, form.cleaned_data['code'])
+            except OtpError as e:
+                messages.error(request, str(e))
             else:
-                messages.error(request, "Mã xác thực không chính xác.")
+                # Xác thực thành công, chuyển đến bước 3
+                return redirect('password_reset_set_new')
     else:
         form = PasswordResetCodeForm()
         
@@ -109,26 +115,21 @@ def set_new_password(request):
     """
     Bước 3: Người dùng đã xác thực, cho phép đặt mật khẩu mới.
     """
-    user_id = request.session.get('reset_otp_user_id')
-    is_verified = request.session.get('reset_otp_verified')
+    otp = get_verified_code(request.session.get(SESSION_TOKEN_KEY))
     
-    # Kiểm tra xem người dùng đã đi đúng 2 bước trước chưa
-    if not user_id or not is_verified:
+    # Kiểm tra xem người dùng đã đi đúng 2 bước trước chưa (mã đã xác thực, còn hạn, chưa dùng)
+    if otp is None:
         messages.error(request, "Bạn không có quyền truy cập trang này. Vui lòng thử lại.")
         return redirect('password_reset_request')
-        
-    try:
-        user = CustomUser.objects.get(pk=user_id)
-    except CustomUser.DoesNotExist:
-        messages.error(request, "Tài khoản không còn tồn tại.")
-        return redirect('password_reset_request')
+    user = otp.user
 
     if request.method == 'POST':
         form = SetNewPasswordForm(request.POST)
         if form.is_valid():
-            # Đặt mật khẩu mới cho user
+            # Đặt mật khẩu mới cho user và vô hiệu mã đã dùng
             user.set_password(form.cleaned_data['new_password1'])
             user.save()
+            mark_used(otp)
             
             # Xóa toàn bộ session sau khi hoàn tất
             request.session.flush()
@@ -213,6 +214,7 @@ class AdminRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
 # ==============================================================================
 @login_required
 @user_passes_test(is_staff_member)
+@read_from_replica
 def staff_dashboard_view(request):
     """
     Hiển thị trang tổng quan (dashboard) dành riêng cho các nhân viên.
@@ -221,18 +223,36 @@ def staff_dashboard_view(request):
     context = {
         'user': request.user
     }
+    if request.user.role in ['SUPPORT', 'ADMIN']:
+        # Số liệu SLA đã được lệnh sweep_ticket_sla tính sẵn, chỉ đọc bản mới nhất
+        context['sla_metrics'] = latest_metrics()
     return render(request, 'dashboard.html', context)
 
-class UserListView(AdminRequiredMixin, ListView):
+class UserListView(AdminRequiredMixin, ReplicaReadMixin, ListView):
     """
-    View hiển thị danh sách tất cả các tài khoản người dùng.
+    View hiển thị danh sách tài khoản: nhân viên (ít, hiển thị hết) và khách hàng (phân trang).
+    - Khách hàng: tìm theo username, email, SĐT, họ tên qua chỉ mục FTS (users/search.py),
+      phân trang trong CSDL theo index (role, -date_joined).
+    - Số đơn đặt phòng và số yêu cầu CSKH của từng khách lấy bằng subquery trong cùng truy vấn danh sách.
     """
     model = CustomUser
     template_name = 'users/dashboard_user_list.html'
-    context_object_name = 'users'
-    
+    context_object_name = 'customer_users'
+    paginate_by = 25
+
     def get_queryset(self):
-        return CustomUser.objects.order_by('username')
+        customers = CustomUser.objects.filter(is_staff=False, role=CustomUser.Role.CUSTOMER)
+        customers = filter_users(customers, self.request.GET.get('q'))
+        booking_count = Booking.objects.filter(customer=OuterRef('pk')).order_by().values('customer').annotate(
+            total=Count('pk')
+        ).values('total')
+        ticket_count = Ticket.objects.filter(customer=OuterRef('pk')).order_by().values('customer').annotate(
+            total=Count('pk')
+        ).values('total')
+        return customers.annotate(
+            booking_count=Coalesce(Subquery(booking_count), 0),
+            ticket_count=Coalesce(Subquery(ticket_count), 0),
+        ).order_by('-date_joined', '-pk')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -247,22 +267,19 @@ class UserListView(AdminRequiredMixin, ListView):
         valid_roles = [CustomUser.Role.RECEPTION, CustomUser.Role.SUPPORT, CustomUser.Role.ADMIN]
         if role_filter in valid_roles:
             staff_users = staff_users.filter(role=role_filter)
-        
-        # 4. Tạo danh sách KHÁCH HÀNG
-        customer_users = CustomUser.objects.filter(is_staff=False, role=CustomUser.Role.CUSTOMER).order_by('-date_joined')
 
-        # 5. Gửi các lựa chọn filter
+        # 4. Gửi các lựa chọn filter
         context['role_choices'] = [
             (CustomUser.Role.RECEPTION, CustomUser.Role.RECEPTION.label),
             (CustomUser.Role.SUPPORT, CustomUser.Role.SUPPORT.label),
             (CustomUser.Role.ADMIN, CustomUser.Role.ADMIN.label),
         ]
 
-        # 6. Gửi 2 danh sách riêng biệt ra template
+        # 5. Danh sách nhân viên; danh sách khách hàng (trang hiện tại) do ListView cung cấp
         context['staff_users'] = staff_users
-        context['customer_users'] = customer_users
         context['current_filter'] = role_filter
-        
+        context['search_query'] = self.request.GET.get('q', '')
+
         return context
 
 class UserCreateView(AdminRequiredMixin, CreateView):